@@ -0,0 +1,499 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Inference Benchmark
+
+Measures the prediction paths of predict_mental_health.py end to end, with
+assessment payloads sampled from students_mental_health_survey.csv:
+
+- spawn: one interpreter per request, the way the Node controller calls the
+  script today,
+- serve: a resident --serve --socket server (optionally with --workers),
+  driven by closed-loop clients, one Unix socket connection each,
+- batch: --batch scoring of JSON lines from stdin.
+
+For every path and concurrency level the report gives p50/p95/p99 latency
+and throughput; it also records cold-start time (process start to first
+answer) and the RSS of the server and of each worker. The report is JSON,
+tagged with the git commit and the published model version, so two runs
+can be compared with --compare.
+
+Payloads are drawn with replacement from the survey, so with the
+prediction cache on most serve and batch requests are cache hits. The
+servers and batch runs therefore start with --cache-size 0 by default, so
+the model itself is measured; --cache on (or both) adds the cached setting.
+Results are reported under "cache_off" / "cache_on".
+
+Usage:
+    python benchmark_inference.py --output bench.json
+    python benchmark_inference.py --modes serve --workers 0,4 --concurrency 1,8,32
+    python benchmark_inference.py --modes serve,batch --cache both
+    python benchmark_inference.py --output new.json --compare bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import resource
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+PREDICT_SCRIPT = SCRIPT_DIR / "predict_mental_health.py"
+SURVEY_PATH = SCRIPT_DIR / "students_mental_health_survey.csv"
+ARTIFACTS_DIR = SCRIPT_DIR / "model" / "artifacts"
+
+MODES = ('spawn', 'serve', 'batch')
+CACHE_SETTINGS = {'off': ('off',), 'on': ('on',), 'both': ('off', 'on')}
+
+# Features sent by the Node controller, with its parseFloat / parseInt coercions
+PAYLOAD_FEATURES = {
+    'Counseling_Service_Use': str,
+    'Stress_Level': float,
+    'Substance_Use': str,
+    'Age': int,
+    'Course': str,
+    'Financial_Stress': float,
+    'Physical_Activity': str,
+    'Extracurricular_Involvement': str,
+    'Semester_Credit_Load': int,
+    'Family_History': str,
+    'Chronic_Illness': str,
+    'Anxiety_Score': float,
+    'Depression_Score': float
+}
+
+# A metric is reported as a regression by --compare when it grows by more than this factor
+REGRESSION_RATIO = 1.2
+
+def make_payloads(n, csv_path=SURVEY_PATH, seed=42):
+    """
+    Sample realistic prediction requests from the survey.
+
+    Whole survey rows are drawn with replacement, so features keep their
+    joint distribution (and repeated vectors occur as often as in the data).
+
+    Args:
+        n (int): Number of requests
+        csv_path (Path): Survey CSV
+        seed (int): Sampling seed
+
+    Returns:
+        list: Request dicts ({"input_data": ..., "favorite_activities": []})
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path, usecols=list(PAYLOAD_FEATURES)).dropna()
+    rows = df.sample(n, replace=True, random_state=seed)
+    return [
+        {
+            "input_data": {feature: cast(row[feature]) for feature, cast in PAYLOAD_FEATURES.items()},
+            "favorite_activities": []
+        }
+        for _, row in rows.iterrows()
+    ]
+
+def latency_summary(latencies, elapsed=None):
+    """
+    Summarize request latencies.
+
+    Args:
+        latencies (list): Seconds per request
+        elapsed (float, optional): Wall time of the whole run, for the throughput
+
+    Returns:
+        dict: Request count, p50/p95/p99/mean/max in milliseconds and requests per second
+    """
+    ms = np.asarray(latencies, dtype=np.float64) * 1000.0
+    summary = {"requests": int(ms.size)}
+    if ms.size:
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        summary.update({
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "mean_ms": round(float(ms.mean()), 3),
+            "max_ms": round(float(ms.max()), 3)
+        })
+    if elapsed:
+        summary["throughput_rps"] = round(ms.size / elapsed, 2)
+    return summary
+
+def process_rss_mb(pid):
+    """
+    Resident set size of a process.
+
+    Args:
+        pid (int): Process id
+
+    Returns:
+        float: RSS in MiB, or None if the process is gone
+    """
+    try:
+        with open(f"/proc/{pid}/status", encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+def child_pids(pid):
+    """
+    Direct children of a process, found by scanning /proc.
+
+    Args:
+        pid (int): Parent process id
+
+    Returns:
+        list: Child process ids
+    """
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding='utf-8') as f:
+                # The command name may contain spaces: fields restart after the last ')'
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+def bench_spawn(payloads, concurrency_levels):
+    """
+    Benchmark the one-shot path: a fresh interpreter per request.
+
+    Args:
+        payloads (list): Requests, all sent at every concurrency level
+        concurrency_levels (list): Number of requests launched at once
+
+    Returns:
+        dict: Cold start, peak RSS of one process and latency summary per concurrency level
+    """
+    def run_one(payload):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, str(PREDICT_SCRIPT)], input=json.dumps(payload),
+                                   capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        try:
+            response = json.loads(completed.stdout)
+        except ValueError:
+            return elapsed, False
+        return elapsed, completed.returncode == 0 and 'error' not in response
+
+    cold_start, _ = run_one(payloads[0])
+    report = {"cold_start_ms": round(cold_start * 1000.0, 3), "levels": {}}
+
+    for concurrency in concurrency_levels:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(run_one, payloads))
+        elapsed = time.perf_counter() - started
+        summary = latency_summary([latency for latency, _ in results], elapsed)
+        summary["errors"] = sum(1 for _, ok in results if not ok)
+        report["levels"][str(concurrency)] = summary
+
+    # Peak RSS over every one-shot process run so far (the benchmark's own children)
+    report["rss_per_process_mb"] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024.0, 1)
+    return report
+
+class SocketClient:
+    """
+    Newline-delimited JSON client of a --serve --socket server.
+
+    Args:
+        socket_path (str): Server socket
+    """
+
+    def __init__(self, socket_path):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self._stream = self._socket.makefile('rwb')
+
+    def request(self, payload):
+        """
+        Send one request and wait for its response.
+
+        Args:
+            payload (dict): Request
+
+        Returns:
+            dict: Response
+        """
+        self._stream.write((json.dumps(payload) + "\n").encode('utf-8'))
+        self._stream.flush()
+        return json.loads(self._stream.readline())
+
+    def close(self):
+        self._stream.close()
+        self._socket.close()
+
+def start_server(socket_path, probe, workers=0, extra_args=(), timeout=120.0):
+    """
+    Start a resident server and wait for its first answer.
+
+    Args:
+        socket_path (str): Socket the server listens on
+        probe (dict): Request used to detect the first answer
+        workers (int): --workers value
+        extra_args (tuple): Additional server arguments
+        timeout (float): Seconds to wait for the first answer
+
+    Returns:
+        tuple: (process, cold_start_seconds)
+
+    Raises:
+        RuntimeError: If the server does not answer in time
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    command = [sys.executable, str(PREDICT_SCRIPT), '--serve', '--socket', socket_path,
+               '--workers', str(workers), *extra_args]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            client = SocketClient(socket_path)
+        except OSError:
+            time.sleep(0.005)
+            continue
+        try:
+            client.request(probe)
+        finally:
+            client.close()
+        return process, time.perf_counter() - started
+
+    process.terminate()
+    raise RuntimeError(f"Server did not answer within {timeout}s")
+
+def bench_serve(payloads, concurrency_levels, workers=0, extra_args=()):
+    """
+    Benchmark the resident server with closed-loop clients.
+
+    Each client has its own connection and sends its next request as soon
+    as the previous one is answered.
+
+    Args:
+        payloads (list): Requests, all sent at every concurrency level
+        concurrency_levels (list): Number of concurrent clients
+        workers (int): --workers value of the server
+        extra_args (tuple): Additional server arguments
+
+    Returns:
+        dict: Cold start, RSS of the server and its workers and latency summary per concurrency level
+    """
+    socket_path = f"/tmp/mental_health_bench_{os.getpid()}.sock"
+    process, cold_start = start_server(socket_path, payloads[0], workers, extra_args)
+    report = {"workers": workers, "cold_start_ms": round(cold_start * 1000.0, 3), "levels": {}}
+
+    try:
+        for concurrency in concurrency_levels:
+            queue = iter(payloads)
+            queue_lock = threading.Lock()
+            results = []
+
+            def client_loop():
+                client = SocketClient(socket_path)
+                local = []
+                try:
+                    while True:
+                        with queue_lock:
+                            payload = next(queue, None)
+                        if payload is None:
+                            break
+                        started = time.perf_counter()
+                        response = client.request(payload)
+                        local.append((time.perf_counter() - started, 'error' not in response))
+                finally:
+                    client.close()
+                    results.extend(local)
+
+            started = time.perf_counter()
+            threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            summary = latency_summary([latency for latency, _ in results], elapsed)
+            summary["errors"] = sum(1 for _, ok in results if not ok)
+            report["levels"][str(concurrency)] = summary
+
+        report["rss_server_mb"] = round(process_rss_mb(process.pid) or 0.0, 1)
+        report["rss_workers_mb"] = [round(process_rss_mb(pid) or 0.0, 1) for pid in child_pids(process.pid)]
+    finally:
+        process.terminate()
+        process.wait()
+    return report
+
+def bench_batch(payloads, batch_sizes, extra_args=()):
+    """
+    Benchmark --batch scoring of JSON lines, interpreter start included.
+
+    Args:
+        payloads (list): Requests; each run scores the first batch_size of them
+        batch_sizes (list): Number of requests per run
+        extra_args (tuple): Additional arguments of predict_mental_health.py
+
+    Returns:
+        dict: Wall time, per-request cost and throughput per batch size
+    """
+    report = {}
+    for batch_size in batch_sizes:
+        lines = "".join(json.dumps(payload) + "\n" for payload in payloads[:batch_size])
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, str(PREDICT_SCRIPT), '--batch', *extra_args], input=lines,
+                                   capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        responses = [json.loads(line) for line in completed.stdout.splitlines() if line.strip()]
+        n = min(batch_size, len(payloads))
+        report[str(batch_size)] = {
+            "requests": n,
+            "wall_ms": round(elapsed * 1000.0, 3),
+            "per_request_ms": round(elapsed * 1000.0 / n, 4),
+            "throughput_rps": round(n / elapsed, 2),
+            "errors": sum(1 for response in responses if 'error' in response) + (n - len(responses))
+        }
+    return report
+
+def environment():
+    """
+    Describe what was benchmarked.
+
+    Returns:
+        dict: Commit, model version, interpreter and machine
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SCRIPT_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        model_version = (ARTIFACTS_DIR / "CURRENT").read_text(encoding='utf-8').strip()
+    except OSError:
+        model_version = None
+    return {
+        "commit": commit,
+        "model_version": model_version,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+
+def compare_reports(baseline, current, ratio=REGRESSION_RATIO, path=()):
+    """
+    List the latency metrics that got worse between two reports.
+
+    Args:
+        baseline (dict): Earlier report
+        current (dict): New report
+        ratio (float): Growth factor above which a metric is a regression
+        path (tuple): Keys leading to the compared sub-reports
+
+    Returns:
+        list: (metric path, baseline value, current value) for each regression
+    """
+    regressions = []
+    for key, value in current.items():
+        if key not in baseline or key == "environment":
+            continue
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            regressions.extend(compare_reports(baseline[key], value, ratio, path + (key,)))
+        elif key.endswith('_ms') and isinstance(value, (int, float)) and baseline[key]:
+            if value > baseline[key] * ratio:
+                regressions.append(('.'.join(path + (key,)), baseline[key], value))
+    return regressions
+
+def parse_levels(text):
+    levels = [int(level) for level in text.split(',') if level.strip()]
+    if not levels or min(levels) < 0:
+        raise argparse.ArgumentTypeError(f"expected comma-separated non-negative integers, got {text!r}")
+    return levels
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the prediction paths")
+    parser.add_argument('--modes', default=','.join(MODES), help=f"Comma-separated subset of {','.join(MODES)}")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per serve concurrency level")
+    parser.add_argument('--spawn-requests', type=int, default=40,
+                        help="Requests per spawn concurrency level (each starts an interpreter)")
+    parser.add_argument('--concurrency', type=parse_levels, default=[1, 4, 16],
+                        help="Comma-separated concurrency levels (default: 1,4,16)")
+    parser.add_argument('--workers', type=parse_levels, default=[0, 2],
+                        help="Comma-separated --workers values of the benchmarked servers (default: 0,2)")
+    parser.add_argument('--batch-sizes', type=parse_levels, default=[1, 100, 1000, 10000],
+                        help="Comma-separated --batch input sizes (default: 1,100,1000,10000)")
+    parser.add_argument('--cache', choices=CACHE_SETTINGS, default='off',
+                        help="Prediction cache of the serve and batch runs: off (default, --cache-size 0, "
+                             "measures the model), on (mostly cache hits on resampled payloads) or both")
+    parser.add_argument('--seed', type=int, default=42, help="Payload sampling seed")
+    parser.add_argument('--output', help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument('--compare', metavar='BASELINE', help="Report latency regressions against an earlier report")
+    args = parser.parse_args(argv)
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    if not modes or set(modes) - set(MODES):
+        parser.error(f"--modes must be a subset of {','.join(MODES)}")
+    if 0 in args.concurrency or 0 in args.batch_sizes:
+        parser.error("concurrency levels and batch sizes must be positive")
+
+    payloads = make_payloads(max(args.requests, args.spawn_requests, max(args.batch_sizes)), seed=args.seed)
+    report = {"environment": environment()}
+
+    if 'spawn' in modes:
+        print("Benchmarking spawn-per-request...", file=sys.stderr)
+        report["spawn"] = bench_spawn(payloads[:args.spawn_requests], args.concurrency)
+    for cache in CACHE_SETTINGS[args.cache]:
+        extra_args = ('--cache-size', '0') if cache == 'off' else ()
+        if 'serve' in modes:
+            serve = report.setdefault("serve", {})[f"cache_{cache}"] = {}
+            for workers in args.workers:
+                print(f"Benchmarking --serve --workers {workers}, cache {cache}...", file=sys.stderr)
+                serve[f"workers_{workers}"] = bench_serve(payloads[:args.requests], args.concurrency,
+                                                          workers, extra_args)
+        if 'batch' in modes:
+            print(f"Benchmarking --batch, cache {cache}...", file=sys.stderr)
+            report.setdefault("batch", {})[f"cache_{cache}"] = bench_batch(payloads, args.batch_sizes, extra_args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding='utf-8')
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        regressions = compare_reports(baseline, report)
+        for metric, before, after in regressions:
+            print(f"REGRESSION {metric}: {before} -> {after} ms", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No latency regression above x{REGRESSION_RATIO} against {args.compare}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compiled NumPy Scorer
+
+Turns the fitted pipeline saved in model/mental_health_model.pkl
+(StandardScaler + OneHotEncoder(drop='first') + tree, linear or KNN classifier)
+into plain arrays, so a prediction only needs NumPy:
+
+- scaler means and scales as arrays,
+- one-hot categories as dict -> output column maps,
+- the decision tree (or every tree of a random forest) flattened into node
+  arrays that are traversed for all rows at once,
+- or, for linear classifiers (SGDClassifier, LogisticRegression, the
+  incremental model of online_training.py and the linear FastSVC of
+  fast_svm.py), the coefficient matrix and
+  intercepts,
+- or, for KNeighborsClassifier, a neighbour index over its training matrix
+  (neighbor_index.py), so predictions do not scan every training row.
+
+The compiled arrays are persisted as a versioned artifact by
+model_artifact.py.
+
+Usage:
+    python compiled_scorer.py export          # publish a new artifact in model/artifacts/
+    python compiled_scorer.py export --risk-table   # ... with a precomputed risk table (risk_table.py)
+    python compiled_scorer.py export --compact      # ... with tree nodes in compact dtypes
+    python compiled_scorer.py check-parity    # compare with the sklearn pipeline on the survey CSV
+"""
+
+import sys
+import argparse
+from contextlib import nullcontext
+from pathlib import Path
+
+import numpy as np
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+MODEL_DIR = SCRIPT_DIR / "model"
+
+MODEL_PATH = MODEL_DIR / "mental_health_model.pkl"
+SURVEY_PATH = SCRIPT_DIR / "students_mental_health_survey.csv"
+
+# Classifiers scored from X @ coef.T + intercept instead of tree nodes
+# (FastSVC too, with kernel='linear': the link keeps the sign of the decision)
+LINEAR_CLASSIFIERS = ('SGDClassifier', 'LogisticRegression')
+
+def compile_pipeline(model, compact=False):
+    """
+    Extract the arrays needed to score the fitted pipeline without sklearn.
+
+    Args:
+        model (Pipeline): Fitted pipeline with 'preprocessor' and 'classifier' steps
+        compact (bool): Store tree nodes in the smallest dtypes: node indices and
+            features in the narrowest integer type, thresholds and leaf values as
+            float32 (see forest_compression.py)
+
+    Returns:
+        dict: Metadata under "meta" and NumPy arrays under the other keys
+
+    Raises:
+        ValueError: If a step is not one the compiled scorer knows how to evaluate
+    """
+    preprocessor = model.named_steps['preprocessor']
+    classifier = model.named_steps['classifier']
+
+    meta = {
+        "feature_names": [str(f) for f in model.feature_names_in_],
+        "classes": [str(c) for c in classifier.classes_],
+        "numerical_cols": [],
+        "categorical_cols": [],
+        "categories": {},
+        "numerical_offset": 0,
+        "n_outputs": 0
+    }
+    means, scales = [], []
+    n_outputs = 0
+
+    # Output columns follow the order of the fitted transformers
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'remainder' and transformer == 'drop':
+            continue
+        kind = type(transformer).__name__
+        if kind == 'StandardScaler':
+            meta["numerical_cols"] = list(columns)
+            meta["numerical_offset"] = n_outputs
+            mean = transformer.mean_ if transformer.mean_ is not None else np.zeros(len(columns))
+            scale = transformer.scale_ if transformer.scale_ is not None else np.ones(len(columns))
+            means.extend(mean)
+            scales.extend(scale)
+            n_outputs += len(columns)
+        elif kind == 'OneHotEncoder':
+            meta["categorical_cols"] = list(columns)
+            drop_idx = transformer.drop_idx_
+            for j, column in enumerate(columns):
+                dropped = None if drop_idx is None else drop_idx[j]
+                mapping = {}
+                for k, category in enumerate(transformer.categories_[j]):
+                    if dropped is not None and k == dropped:
+                        continue
+                    mapping[str(category)] = n_outputs
+                    n_outputs += 1
+                meta["categories"][column] = mapping
+        else:
+            raise ValueError(f"Unsupported preprocessing step: {kind}")
+
+    kind = type(classifier).__name__
+    meta["classifier"] = kind
+    meta["n_outputs"] = n_outputs
+    arrays = {
+        "scaler_mean": np.asarray(means, dtype=np.float64),
+        "scaler_scale": np.asarray(scales, dtype=np.float64)
+    }
+
+    if kind in LINEAR_CLASSIFIERS or (kind == 'FastSVC' and classifier.kernel == 'linear'):
+        meta["model_type"] = "linear"
+        arrays["coef"] = np.asarray(classifier.coef_, dtype=np.float64)
+        arrays["intercept"] = np.asarray(classifier.intercept_, dtype=np.float64)
+        return {"meta": meta, **arrays}
+    if kind == 'KNeighborsClassifier':
+        # Neighbours are searched in an index over the training matrix instead of a full scan
+        from neighbor_index import index_from_classifier
+        meta["model_type"] = "neighbors"
+        meta["index"], index_arrays = index_from_classifier(classifier)
+        arrays.update({f"index_{name}": array for name, array in index_arrays.items()})
+        return {"meta": meta, **arrays}
+    if kind == 'DecisionTreeClassifier':
+        trees = [classifier.tree_]
+    elif kind == 'RandomForestClassifier':
+        trees = [estimator.tree_ for estimator in classifier.estimators_]
+    else:
+        raise ValueError(f"Unsupported classifier: {kind}")
+    meta["model_type"] = "trees"
+
+    # Flatten every tree into shared node arrays with absolute child indices
+    roots, left, right, feature, threshold, value = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        roots.append(offset)
+        is_leaf = tree.children_left == -1
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        leaf_value = tree.value[:, 0, :]
+        value.append(leaf_value / leaf_value.sum(axis=1, keepdims=True))
+        offset += tree.node_count
+
+    threshold = np.concatenate(threshold).astype(np.float64)
+    if not compact:
+        return {
+            "meta": meta,
+            **arrays,
+            "roots": np.asarray(roots, dtype=np.int64),
+            "children_left": np.concatenate(left).astype(np.int64),
+            "children_right": np.concatenate(right).astype(np.int64),
+            "feature": np.concatenate(feature).astype(np.int64),
+            "threshold": threshold,
+            "value": np.concatenate(value).astype(np.float64)
+        }
+
+    index_dtype = _smallest_int(offset)
+    return {
+        "meta": meta,
+        **arrays,
+        "roots": np.asarray(roots, dtype=index_dtype),
+        "children_left": np.concatenate(left).astype(index_dtype),
+        "children_right": np.concatenate(right).astype(index_dtype),
+        "feature": np.concatenate(feature).astype(_smallest_int(n_outputs)),
+        "threshold": _float32_floor(threshold),
+        "value": np.concatenate(value).astype(np.float32)
+    }
+
+def _smallest_int(max_value):
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def _float32_floor(values):
+    # Largest float32 <= each threshold: for any float32 input x, x <= t and
+    # x <= t32 agree, so the float32 comparison decides like sklearn's
+    narrow = values.astype(np.float32)
+    above = narrow.astype(np.float64) > values
+    narrow[above] = np.nextafter(narrow[above], np.float32(-np.inf))
+    return narrow
+
+class CompiledScorer:
+    """
+    Pandas-free scorer evaluating a compiled pipeline with NumPy.
+
+    Args:
+        compiled (dict): Output of compile_pipeline() or model_artifact.read_artifact()
+    """
+
+    def __init__(self, compiled):
+        self.meta = compiled["meta"]
+        self.feature_names_in_ = self.meta["feature_names"]
+        self.classes_ = np.asarray(self.meta["classes"], dtype=object)
+        self._numerical_cols = self.meta["numerical_cols"]
+        self._numerical_offset = self.meta["numerical_offset"]
+        self._categories = [(column, self.meta["categories"][column]) for column in self.meta["categorical_cols"]]
+        self._mean = compiled["scaler_mean"]
+        self._scale = compiled["scaler_scale"]
+        self._n_outputs = self.meta["n_outputs"]
+        # Artifacts written before linear models were supported only hold trees
+        model_type = self.meta.get("model_type", "trees")
+        self._linear = model_type == "linear"
+        self._index = None
+        if model_type == "neighbors":
+            from neighbor_index import NeighborIndex
+            self._index = NeighborIndex(self.meta["index"], {
+                name[len("index_"):]: array for name, array in compiled.items() if name.startswith("index_")
+            })
+        elif self._linear:
+            self._coef = compiled["coef"]
+            self._intercept = compiled["intercept"]
+        else:
+            self._roots = compiled["roots"]
+            self._left = compiled["children_left"]
+            self._right = compiled["children_right"]
+            self._feature = compiled["feature"]
+            self._threshold = compiled["threshold"]
+            self._value = compiled["value"]
+        self.risk_table = None
+        if "risk_table" in compiled and "risk_table" in self.meta:
+            from risk_table import RiskTable
+            self.risk_table = RiskTable(self.meta["risk_table"], compiled["risk_table"])
+
+    def transform(self, records):
+        """
+        Apply the scaler and one-hot encoder to input dicts.
+
+        Args:
+            records (list): Input data dicts
+
+        Returns:
+            np.ndarray: Preprocessed matrix, same columns as the sklearn preprocessor
+
+        Raises:
+            ValueError: If a feature is missing or a numerical value is not a finite number
+        """
+        missing = {f for f in self.feature_names_in_ if any(f not in record for record in records)}
+        if missing:
+            raise ValueError(f"columns are missing: {missing}")
+
+        X = np.zeros((len(records), self._n_outputs), dtype=np.float64)
+        n_numerical = len(self._numerical_cols)
+        if n_numerical:
+            numbers = np.array([[float(record[c]) for c in self._numerical_cols] for record in records],
+                               dtype=np.float64)
+            if not np.isfinite(numbers).all():
+                raise ValueError("Numerical features must be finite numbers")
+            start = self._numerical_offset
+            X[:, start:start + n_numerical] = (numbers - self._mean) / self._scale
+
+        # Unknown and dropped categories encode as all zeros, like handle_unknown='ignore'
+        for column, mapping in self._categories:
+            for i, record in enumerate(records):
+                value = record[column]
+                index = mapping.get(value) if isinstance(value, str) else None
+                if index is not None:
+                    X[i, index] = 1.0
+        return X
+
+    def predict_proba_transformed(self, X):
+        """
+        Average the leaf class distributions of every tree, apply the
+        logistic link to the linear decision function, or vote among the
+        nearest training rows found by the neighbour index.
+
+        Args:
+            X (np.ndarray): Preprocessed matrix
+
+        Returns:
+            np.ndarray: Class probabilities, shape (n_rows, n_classes)
+        """
+        if self._index is not None:
+            return self._index.predict_proba(X)
+        if self._linear:
+            # Same link as SGDClassifier(loss='log_loss'): sigmoid for two
+            # classes, normalized one-vs-rest sigmoids otherwise
+            decision = X @ self._coef.T + self._intercept
+            positive = 1.0 / (1.0 + np.exp(-decision))
+            if positive.shape[1] == 1:
+                return np.hstack([1.0 - positive, positive])
+            return positive / positive.sum(axis=1, keepdims=True)
+
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X32 = X.astype(np.float32)
+        rows = np.arange(X.shape[0])
+        proba = np.zeros((X.shape[0], self._value.shape[1]), dtype=np.float64)
+
+        for root in self._roots:
+            node = np.full(X.shape[0], root, dtype=np.int64)
+            while True:
+                internal = self._left[node] != -1
+                if not internal.any():
+                    break
+                current = node[internal]
+                go_left = X32[rows[internal], self._feature[current]] <= self._threshold[current]
+                node[internal] = np.where(go_left, self._left[current], self._right[current])
+            proba += self._value[node]
+
+        return proba / len(self._roots)
+
+    def predict(self, records, timings=None):
+        """
+        Predict the risk level for input dicts.
+
+        Inputs inside the precomputed risk table (when the artifact has one)
+        are answered by direct indexing; the others go through the model.
+
+        Args:
+            records (list): Input data dicts
+            timings (RequestTimings, optional): Receives the 'preprocess' and
+                'classifier' stages (the risk table lookup counts as 'classifier')
+
+        Returns:
+            np.ndarray: Predicted class labels
+        """
+        stage = timings.stage if timings is not None else _untimed
+
+        if self.risk_table is not None:
+            with stage('classifier'):
+                indices, found = self.risk_table.lookup(records)
+            if not found.all():
+                rest = np.flatnonzero(~found)
+                with stage('preprocess'):
+                    X = self.transform([records[i] for i in rest])
+                with stage('classifier'):
+                    indices[rest] = np.argmax(self.predict_proba_transformed(X), axis=1)
+            return self.classes_[indices]
+
+        with stage('preprocess'):
+            X = self.transform(records)
+        with stage('classifier'):
+            return self.classes_[np.argmax(self.predict_proba_transformed(X), axis=1)]
+
+def _untimed(name):
+    return nullcontext()
+
+def load_survey_features(csv_path, feature_names):
+    """
+    Read the survey CSV and normalize categoricals the way the training scripts do.
+
+    Args:
+        csv_path (Path): Survey CSV
+        feature_names (list): Model input columns
+
+    Returns:
+        pd.DataFrame: Model input columns for every row
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    for column in feature_names:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = df[column].str.strip().str.lower()
+    return df[feature_names]
+
+def check_parity(model, scorer, csv_path):
+    """
+    Compare the compiled scorer with the sklearn pipeline on every survey row.
+
+    Args:
+        model (Pipeline): Fitted sklearn pipeline
+        scorer (CompiledScorer): Scorer compiled from the same pipeline
+        csv_path (Path): Survey CSV
+
+    Returns:
+        int: Number of rows where the two predictions differ
+    """
+    X = load_survey_features(csv_path, list(scorer.feature_names_in_))
+    expected = model.predict(X)
+    records = X.astype(object).where(X.notna(), None).to_dict('records')
+    actual = scorer.predict(records)
+    mismatches = int((expected != actual).sum())
+    print(f"{len(X)} rows compared, {mismatches} mismatches")
+    return mismatches
+
+def main(argv=None):
+    """
+    Command line entry point for exporting and checking the compiled scorer.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Compiled NumPy scorer for the mental health model")
+    parser.add_argument('command', choices=['export', 'check-parity'])
+    parser.add_argument('--model', default=str(MODEL_PATH), help="Fitted pipeline pickle")
+    parser.add_argument('--csv', default=str(SURVEY_PATH), help="Survey CSV used by check-parity")
+    parser.add_argument('--risk-table', action='store_true',
+                        help="Also precompute the risk table over the input domain of the survey CSV")
+    parser.add_argument('--compact', action='store_true',
+                        help="Store tree nodes in compact dtypes (int8/16/32 indices, float32 thresholds and values)")
+    args = parser.parse_args(argv)
+
+    import joblib
+    model = joblib.load(args.model)
+
+    import model_artifact
+
+    if args.command == 'export':
+        domain_data = None
+        if args.risk_table:
+            domain_data = load_survey_features(args.csv, [str(f) for f in model.feature_names_in_])
+        version = model_artifact.export_artifact(model, source_path=args.model, risk_table_data=domain_data,
+                                                 compact=args.compact)
+        print(f"Artifact {version} published in {model_artifact.ARTIFACTS_DIR}")
+        return 0
+
+    # Check the published artifact when it was exported from this pickle
+    # (online_training.py publishes models of its own), otherwise a fresh compilation
+    scorer = model_artifact.load_current(source_path=args.model)
+    if scorer is None or "source_sha256" not in scorer.meta:
+        scorer = CompiledScorer(compile_pipeline(model))
+    return 1 if check_parity(model, scorer, args.csv) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Fast SVM Training Mode
+
+The SVM family of the training scripts uses SVC(probability=True). Each
+fit then runs libsvm's internal 5-fold Platt calibration on top of the
+fit itself, for every grid point and every outer fold. The metrics only
+use predict(). Kernel SVC training is also quadratic to cubic in the
+number of rows.
+
+FastSVC takes the same C and kernel parameters, so it drops into the
+existing grid, but it trains a linear solver (LinearSVC, primal
+coordinate descent) and skips any calibration:
+
+    kernel='linear'   LinearSVC on the preprocessed features
+    kernel='rbf'      LinearSVC on a kernel approximation of the RBF
+                      feature map: Nystroem (default) or random Fourier
+                      features (approximation='fourier'), with
+                      n_components features and SVC's gamma='scale'
+
+Training time then grows about linearly with the rows. Linear FastSVC
+models have coef_ / intercept_ and are compiled like the other linear
+classifiers (compiled_scorer.py).
+
+The comparison fits both modes over the SVM grid on the training split.
+It reports fit time and test accuracy / F1, and with --scale it also
+reports fit time for training sets grown by jittered resampling.
+
+Usage:
+    python fast_svm.py compare
+    python fast_svm.py compare --scale 20000,80000 --output svm_compare.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+
+APPROXIMATIONS = ('nystroem', 'fourier')
+DEFAULT_COMPONENTS = 300
+MAX_ITER = 5000
+
+class FastSVC(ClassifierMixin, BaseEstimator):
+    """
+    SVM classifier trained by a linear solver, without probability calibration.
+
+    Args:
+        C (float): Regularization parameter, as in SVC
+        kernel (str): 'linear' or 'rbf'
+        gamma (str or float): RBF coefficient; 'scale' is 1 / (n_features * X.var()) like SVC
+        approximation (str): RBF feature map, 'nystroem' or 'fourier'
+        n_components (int): Features of the RBF approximation
+        max_iter (int): Iterations of the linear solver
+        random_state (int): Seed of the approximation and of the solver
+    """
+
+    def __init__(self, C=1.0, kernel='rbf', gamma='scale', approximation='nystroem',
+                 n_components=DEFAULT_COMPONENTS, max_iter=MAX_ITER, random_state=None):
+        self.C = C
+        self.kernel = kernel
+        self.gamma = gamma
+        self.approximation = approximation
+        self.n_components = n_components
+        self.max_iter = max_iter
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        """
+        Fit the feature map (RBF kernel only) and the linear SVM.
+
+        Args:
+            X (np.ndarray): Preprocessed training matrix
+            y (np.ndarray): Labels
+
+        Returns:
+            FastSVC: self
+
+        Raises:
+            ValueError: If the kernel or the approximation is not supported
+        """
+        from sklearn.svm import LinearSVC
+
+        if self.kernel not in ('linear', 'rbf'):
+            raise ValueError(f"Unsupported kernel: {self.kernel}")
+        X = np.asarray(X, dtype=np.float64)
+        self.n_features_in_ = X.shape[1]
+
+        self.feature_map_ = None
+        if self.kernel == 'rbf':
+            if self.approximation not in APPROXIMATIONS:
+                raise ValueError(f"Unknown kernel approximation: {self.approximation}")
+            gamma = self.gamma
+            if gamma == 'scale':
+                variance = X.var()
+                gamma = 1.0 / (X.shape[1] * variance) if variance > 0 else 1.0
+            self.gamma_ = float(gamma)
+            n_components = min(self.n_components, X.shape[0]) if self.approximation == 'nystroem' \
+                else self.n_components
+            if self.approximation == 'nystroem':
+                from sklearn.kernel_approximation import Nystroem
+                self.feature_map_ = Nystroem(kernel='rbf', gamma=self.gamma_, n_components=n_components,
+                                             random_state=self.random_state)
+            else:
+                from sklearn.kernel_approximation import RBFSampler
+                self.feature_map_ = RBFSampler(gamma=self.gamma_, n_components=n_components,
+                                               random_state=self.random_state)
+            X = self.feature_map_.fit_transform(X)
+
+        # Primal solver: more rows than features once mapped
+        self.svm_ = LinearSVC(C=self.C, dual=False, max_iter=self.max_iter, random_state=self.random_state)
+        self.svm_.fit(X, y)
+        self.classes_ = self.svm_.classes_
+        return self
+
+    def decision_function(self, X):
+        """
+        Signed distances to the separating hyperplane(s).
+
+        Args:
+            X (np.ndarray): Preprocessed matrix
+
+        Returns:
+            np.ndarray: Shape (n_rows,) for two classes, (n_rows, n_classes) otherwise
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.feature_map_ is not None:
+            X = self.feature_map_.transform(X)
+        return self.svm_.decision_function(X)
+
+    def predict(self, X):
+        """
+        Predict class labels.
+
+        Args:
+            X (np.ndarray): Preprocessed matrix
+
+        Returns:
+            np.ndarray: Predicted labels
+        """
+        decision = self.decision_function(X)
+        if decision.ndim == 1:
+            return self.classes_[(decision > 0).astype(int)]
+        return self.classes_[np.argmax(decision, axis=1)]
+
+    @property
+    def coef_(self):
+        # Only meaningful on the input features for the linear kernel
+        if self.kernel != 'linear':
+            raise AttributeError("coef_ is only available with kernel='linear'")
+        return self.svm_.coef_
+
+    @property
+    def intercept_(self):
+        if self.kernel != 'linear':
+            raise AttributeError("intercept_ is only available with kernel='linear'")
+        return self.svm_.intercept_
+
+def grow_rows(X, y, size, rng, jitter=0.05):
+    """
+    Emulate a larger training set by resampling rows with Gaussian jitter.
+
+    Args:
+        X (np.ndarray): Preprocessed training matrix
+        y (np.ndarray): Labels
+        size (int): Rows wanted
+        rng (np.random.Generator): Random generator
+        jitter (float): Standard deviation of the noise added to resampled rows
+
+    Returns:
+        tuple: (X, y)
+    """
+    if size <= len(X):
+        keep = rng.choice(len(X), size, replace=False)
+        return X[keep], y[keep]
+    extra = rng.integers(0, len(X), size - len(X))
+    return np.vstack([X, X[extra] + rng.normal(0.0, jitter, (len(extra), X.shape[1]))]), \
+        np.concatenate([y, y[extra]])
+
+def _fit_and_score(classifier, X_fit, y_fit, X_test, y_test):
+    from sklearn.metrics import accuracy_score, f1_score
+
+    start = time.perf_counter()
+    classifier.fit(X_fit, y_fit)
+    fit_s = time.perf_counter() - start
+    predicted = classifier.predict(X_test)
+    return {
+        "fit_s": round(fit_s, 3),
+        "accuracy": round(float(accuracy_score(y_test, predicted)), 4),
+        "f1_weighted": round(float(f1_score(y_test, predicted, average='weighted')), 4)
+    }
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Compare SVC(probability=True) with the fast SVM mode")
+    parser.add_argument('command', choices=['compare'])
+    parser.add_argument('--approximation', choices=APPROXIMATIONS, default='nystroem',
+                        help="RBF kernel approximation of the fast mode")
+    parser.add_argument('--n-components', type=int, default=DEFAULT_COMPONENTS,
+                        help="Features of the RBF approximation")
+    parser.add_argument('--scale', default='',
+                        help="Comma-separated training set sizes timed for C=1 (exact SVC is skipped "
+                             "above 20000 rows)")
+    parser.add_argument('--output', default=None, help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    from imblearn.over_sampling import SMOTE
+    from sklearn.model_selection import ParameterGrid, train_test_split
+    from sklearn.svm import SVC
+    from model_definitions import get_definition, make_preprocessor
+    from training_orchestrator import load_training_data
+
+    # Preprocessed and resampled like the SVM pipelines of the training scripts
+    X, y = load_training_data()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    preprocessor = make_preprocessor().fit(X_train)
+    X_fit, y_fit = SMOTE(random_state=42).fit_resample(preprocessor.transform(X_train), y_train)
+    X_fit, y_fit = np.asarray(X_fit, dtype=np.float64), np.asarray(y_fit)
+    X_eval = preprocessor.transform(X_test)
+
+    def fast(**params):
+        return FastSVC(approximation=args.approximation, n_components=args.n_components, random_state=42,
+                       **params)
+
+    grid = get_definition('svm')['param_grid']
+    results = {"grid": [], "scale": []}
+    print(f"{'C':>6} {'kernel':<8}{'SVC fit s':>11}{'SVC F1':>9}{'fast fit s':>12}{'fast F1':>9}{'speed-up':>10}")
+    for point in ParameterGrid(grid):
+        params = {k.split('__', 1)[1]: v for k, v in point.items()}
+        exact = _fit_and_score(SVC(probability=True, random_state=42, **params), X_fit, y_fit, X_eval, y_test)
+        quick = _fit_and_score(fast(**params), X_fit, y_fit, X_eval, y_test)
+        results["grid"].append({**params, "svc": exact, "fast": quick})
+        print(f"{params['C']:>6} {params['kernel']:<8}{exact['fit_s']:>11.2f}{exact['f1_weighted']:>9.4f}"
+              f"{quick['fit_s']:>12.2f}{quick['f1_weighted']:>9.4f}{exact['fit_s'] / max(quick['fit_s'], 1e-6):>9.1f}x")
+
+    rng = np.random.default_rng(42)
+    sizes = [int(s) for s in args.scale.split(',') if s.strip()]
+    if sizes:
+        print(f"\n{'rows':>8} {'kernel':<8}{'SVC fit s':>11}{'fast fit s':>12}")
+    for size in sizes:
+        X_big, y_big = grow_rows(X_fit, y_fit, size, rng)
+        for kernel in grid['classifier__kernel']:
+            row = {"rows": size, "kernel": kernel,
+                   "fast": _fit_and_score(fast(C=1, kernel=kernel), X_big, y_big, X_eval, y_test)}
+            if size <= 20000:
+                row["svc"] = _fit_and_score(SVC(C=1, kernel=kernel, probability=True, random_state=42),
+                                            X_big, y_big, X_eval, y_test)
+            results["scale"].append(row)
+            exact_s = f"{row['svc']['fit_s']:>11.2f}" if "svc" in row else f"{'-':>11}"
+            print(f"{size:>8} {kernel:<8}{exact_s}{row['fast']['fit_s']:>12.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,647 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Random Forest Compression
+
+The full training script exports a RandomForestClassifier of 200 trees
+grown without a depth limit: a large pickle, slow to unpickle and slow to
+traverse. This module shrinks a fitted forest after training while its
+accuracy and weighted F1 stay within a tolerance of the uncompressed
+forest:
+
+1. depth pruning: every node deeper than a cap becomes a leaf predicting
+   its own class distribution, as if the tree had stopped growing there;
+2. greedy ensemble selection: trees are added one at a time, each time the
+   one that maximizes the weighted F1 of the averaged probabilities, up to
+   the first prefix that is within tolerance;
+3. compact dtypes: the compiled artifact (compile_pipeline(compact=True))
+   stores node indices and features in the smallest integer type, and
+   thresholds and leaf values as float32.
+
+Every depth cap is tried, from the deepest down, until no selection is
+within tolerance any more; the candidate with the fewest nodes that also
+fits the optional size and latency budgets is kept. The result is a regular
+fitted pipeline, pickled and exported like the original one.
+
+Selection never looks at the held-out test set: every tree is scored on
+its out-of-bag rows, the rows of the (SMOTE-resampled) training matrix its
+bootstrap sample left out, and an ensemble is scored on each row by the
+selected trees that did not see it. The test set is only used afterwards,
+to check that the chosen forest is still within tolerance of the original
+one; when it is not, the original forest is kept.
+
+Usage:
+    python forest_compression.py --model forest.pkl                        # print the report only
+    python forest_compression.py --model forest.pkl --output model/mental_health_model.pkl --export
+    python forest_compression.py --model forest.pkl --tolerance 0.002 --max-latency-ms 1
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+MODEL_DIR = SCRIPT_DIR / "model"
+
+MODEL_PATH = MODEL_DIR / "mental_health_model.pkl"
+REPORT_PATH = MODEL_DIR / "compression_report.json"
+
+DEFAULT_TOLERANCE = 0.005
+
+# Rows timed one at a time for the per-row latency
+LATENCY_ROWS = 100
+
+def transform_features(model, X):
+    """
+    Apply the preprocessing steps of a fitted pipeline, as the classifier sees them.
+
+    Args:
+        model (Pipeline): Fitted pipeline
+        X (pd.DataFrame): Model input columns
+
+    Returns:
+        np.ndarray: float32 matrix (trees compare float32 inputs)
+    """
+    for _, step in model.steps[:-1]:
+        # Samplers (SMOTE) only act while fitting
+        if step is None or step == 'passthrough' or hasattr(step, 'fit_resample'):
+            continue
+        X = step.transform(X)
+    return np.asarray(X, dtype=np.float32)
+
+def training_matrix(model, X_train, y_train):
+    """
+    Rebuild the matrix the classifier of a fitted pipeline was trained on.
+
+    The fitted samplers (SMOTE) are run again on the preprocessed training
+    rows; with their fixed random_state they produce the same rows, in the
+    same order, as during the fit.
+
+    Args:
+        model (Pipeline): Fitted pipeline
+        X_train (pd.DataFrame): Training input columns the pipeline was fitted on
+        y_train (pd.Series): Training labels
+
+    Returns:
+        tuple: (X, y) float32 matrix and labels
+    """
+    X, y = X_train, y_train
+    for _, step in model.steps[:-1]:
+        if step is None or step == 'passthrough':
+            continue
+        if hasattr(step, 'fit_resample'):
+            X, y = step.fit_resample(X, y)
+        else:
+            X = step.transform(X)
+    return np.asarray(X, dtype=np.float32), np.asarray(y)
+
+def out_of_bag_rows(classifier, n_rows):
+    """
+    Training rows left out of the bootstrap sample of every tree of a forest.
+
+    Args:
+        classifier (RandomForestClassifier): Fitted forest
+        n_rows (int): Rows of its training matrix
+
+    Returns:
+        list: One array of row indices per tree
+
+    Raises:
+        ValueError: If the classifier was not fitted on bootstrap samples
+    """
+    from sklearn.ensemble._forest import _generate_unsampled_indices, _get_n_samples_bootstrap
+
+    if type(classifier).__name__ != 'RandomForestClassifier' or not classifier.bootstrap:
+        raise ValueError("Compression needs a random forest fitted on bootstrap samples "
+                         "(its out-of-bag rows are the selection set)")
+    # Same draws as sklearn's fit
+    n_bootstrap = _get_n_samples_bootstrap(n_rows, classifier.max_samples)
+    return [_generate_unsampled_indices(estimator.random_state, n_rows, n_bootstrap)
+            for estimator in classifier.estimators_]
+
+def node_depths(tree):
+    """
+    Depth of every node of a fitted sklearn tree (the root is at depth 0).
+
+    Args:
+        tree (sklearn.tree._tree.Tree): Fitted tree structure
+
+    Returns:
+        np.ndarray: One depth per node
+    """
+    depth = np.zeros(tree.node_count, dtype=np.int64)
+    frontier = np.array([0])
+    level = 0
+    while frontier.size:
+        depth[frontier] = level
+        internal = frontier[tree.children_left[frontier] != -1]
+        frontier = np.concatenate([tree.children_left[internal], tree.children_right[internal]])
+        level += 1
+    return depth
+
+def _path_nodes(tree, X):
+    # Node reached by every row after 0, 1, ... max_depth levels (rows stay on their leaf)
+    rows = np.arange(X.shape[0])
+    node = np.zeros(X.shape[0], dtype=np.int64)
+    path = np.empty((tree.max_depth + 1, X.shape[0]), dtype=np.int64)
+    for level in range(tree.max_depth + 1):
+        path[level] = node
+        left = tree.children_left[node]
+        internal = left != -1
+        go_left = X[rows, np.where(internal, tree.feature[node], 0)] <= tree.threshold[node]
+        node = np.where(internal, np.where(go_left, left, tree.children_right[node]), node)
+    return path
+
+def prune_tree(estimator, max_depth):
+    """
+    Copy a fitted DecisionTreeClassifier with every node deeper than max_depth removed.
+
+    Internal nodes at max_depth become leaves; their stored class
+    distribution is what a tree grown with that max_depth would predict
+    there, without refitting.
+
+    Args:
+        estimator (DecisionTreeClassifier): Fitted tree (left unchanged)
+        max_depth (int): Depth cap
+
+    Returns:
+        DecisionTreeClassifier: Pruned copy
+    """
+    from sklearn.tree._tree import Tree
+
+    tree = estimator.tree_
+    if tree.max_depth <= max_depth:
+        return estimator
+
+    state = tree.__getstate__()
+    depth = node_depths(tree)
+    # Nodes are numbered parents first, so the kept ones keep their relative order
+    kept = np.flatnonzero(depth <= max_depth)
+    renumber = np.full(tree.node_count, -1, dtype=np.int64)
+    renumber[kept] = np.arange(kept.size)
+
+    nodes = state['nodes'][kept].copy()
+    internal = nodes['left_child'] != -1
+    cut = internal & (depth[kept] == max_depth)
+    internal &= ~cut
+    nodes['left_child'][internal] = renumber[nodes['left_child'][internal]]
+    nodes['right_child'][internal] = renumber[nodes['right_child'][internal]]
+    # Same markers as the leaves written by sklearn (TREE_LEAF, TREE_UNDEFINED)
+    nodes['left_child'][cut] = -1
+    nodes['right_child'][cut] = -1
+    nodes['feature'][cut] = -2
+    nodes['threshold'][cut] = -2.0
+    nodes['missing_go_to_left'][cut] = 0
+
+    pruned_tree = Tree(tree.n_features, tree.n_classes, tree.n_outputs)
+    pruned_tree.__setstate__({
+        'max_depth': max_depth,
+        'node_count': kept.size,
+        'nodes': nodes,
+        'values': np.ascontiguousarray(state['values'][kept])
+    })
+    pruned = copy.copy(estimator)
+    pruned.tree_ = pruned_tree
+    return pruned
+
+def _scores(predicted, y, n_classes, scored=None):
+    # Accuracy and weighted F1 (same as sklearn's) of several prediction rows at
+    # once, each over its own scored rows (all of them by default)
+    if scored is None:
+        scored = np.ones(predicted.shape, dtype=bool)
+    rows = np.maximum(np.count_nonzero(scored, axis=1), 1)
+    accuracy = np.count_nonzero((predicted == y) & scored, axis=1) / rows
+    f1 = np.zeros(predicted.shape[0])
+    for c in range(n_classes):
+        actual = (y == c) & scored
+        support = np.count_nonzero(actual, axis=1)
+        hits = (predicted == c) & scored
+        true_positives = np.count_nonzero(hits & actual, axis=1)
+        denominator = np.count_nonzero(hits, axis=1) + support
+        f1 += support / rows * np.divide(2.0 * true_positives, denominator,
+                                         out=np.zeros(f1.shape), where=denominator > 0)
+    return accuracy, f1
+
+def greedy_selection(proba, y, accuracy_floor, f1_floor, votes=None):
+    """
+    Forward ensemble selection without replacement.
+
+    Each step adds the tree giving the best weighted F1 (then accuracy) to
+    the average of the trees already selected, and stops at the first
+    ensemble reaching both floors.
+
+    Args:
+        proba (np.ndarray): Per-tree class probabilities, shape (n_trees, n_rows, n_classes)
+        y (np.ndarray): True class indices
+        accuracy_floor (float): Minimum accuracy
+        f1_floor (float): Minimum weighted F1
+        votes (np.ndarray, optional): Which trees may score which rows, shape
+            (n_trees, n_rows) (their out-of-bag rows); an ensemble is scored on
+            the rows at least one of its trees may score. Default: every row
+
+    Returns:
+        tuple: (order, accuracy, f1) selected tree indices, in selection order,
+            and the scores of the selection; order is None when even every
+            tree together stays below the floors
+    """
+    n_classes = proba.shape[2]
+    if votes is None:
+        votes = np.ones(proba.shape[:2], dtype=bool)
+    remaining = np.arange(proba.shape[0])
+    total = np.zeros(proba.shape[1:])
+    covered = np.zeros(proba.shape[1], dtype=bool)
+    order = []
+    for _ in range(proba.shape[0]):
+        candidates = total + proba[remaining] * votes[remaining][:, :, None]
+        scored = covered | votes[remaining]
+        accuracy, f1 = _scores(candidates.argmax(axis=2), y, n_classes, scored)
+        # Best F1, then best accuracy, then the lowest tree index
+        best = np.lexsort((-accuracy, -f1))[0]
+        order.append(int(remaining[best]))
+        total = candidates[best]
+        covered = scored[best]
+        if accuracy[best] >= accuracy_floor and f1[best] >= f1_floor:
+            return order, float(accuracy[best]), float(f1[best])
+        remaining = np.delete(remaining, best)
+    return None, None, None
+
+def _estimators(classifier):
+    kind = type(classifier).__name__
+    if kind != 'RandomForestClassifier':
+        raise ValueError(f"Only random forests can be compressed, not {kind}")
+    return list(classifier.estimators_)
+
+def _build(model, estimators):
+    # Same pipeline object graph with the classifier replaced by the selected trees
+    replacement = copy.copy(model.steps[-1][1])
+    replacement.estimators_ = estimators
+    replacement.n_estimators = len(estimators)
+    compressed = copy.copy(model)
+    compressed.steps = model.steps[:-1] + [(model.steps[-1][0], replacement)]
+    return compressed
+
+def select_compression(model, X_train, y_train, accuracy_tolerance=DEFAULT_TOLERANCE,
+                       f1_tolerance=DEFAULT_TOLERANCE):
+    """
+    List the depth cap / tree selection candidates within tolerance, scored out of bag.
+
+    Args:
+        model (Pipeline): Fitted pipeline ending with a RandomForestClassifier
+        X_train (pd.DataFrame): Training input columns the pipeline was fitted on
+        y_train (pd.Series): Training labels
+        accuracy_tolerance (float): Accepted accuracy loss
+        f1_tolerance (float): Accepted weighted F1 loss
+
+    Returns:
+        tuple: (reference, candidates) out-of-bag scores of the uncompressed
+            forest, and one dict per depth cap (depth_cap, trees, nodes,
+            oob_accuracy, oob_f1_weighted), fewest nodes first
+
+    Raises:
+        ValueError: If the classifier is not a forest fitted on bootstrap samples
+    """
+    classifier = model.steps[-1][1]
+    estimators = _estimators(classifier)
+    X, y = training_matrix(model, X_train, y_train)
+    oob = out_of_bag_rows(classifier, X.shape[0])
+    y = np.searchsorted(classifier.classes_, y)
+    n_classes = len(classifier.classes_)
+
+    votes = np.zeros((len(estimators), X.shape[0]), dtype=bool)
+    depths, paths, values = [], [], []
+    for i, (estimator, rows) in enumerate(zip(estimators, oob)):
+        tree = estimator.tree_
+        votes[i, rows] = True
+        depths.append(node_depths(tree))
+        # Only the rows the tree may score are traversed
+        paths.append(_path_nodes(tree, X[rows]).astype(np.int32))
+        value = tree.value[:, 0, :]
+        values.append(value / value.sum(axis=1, keepdims=True))
+
+    def probabilities(cap):
+        proba = np.zeros((len(estimators), X.shape[0], n_classes))
+        for i, (value, path, rows) in enumerate(zip(values, paths, oob)):
+            proba[i, rows] = value[path[min(cap, path.shape[0] - 1)]]
+        return proba
+
+    # Full depth: the out-of-bag prediction of the whole forest
+    max_depth = int(max(estimator.tree_.max_depth for estimator in estimators))
+    full = probabilities(max_depth).sum(axis=0)
+    accuracy, f1 = _scores(full.argmax(axis=1)[None, :], y, n_classes, votes.any(axis=0)[None, :])
+    reference = {
+        "trees": len(estimators),
+        "nodes": int(sum(depth.size for depth in depths)),
+        "max_depth": max_depth,
+        "oob_rows": int(votes.any(axis=0).sum()),
+        "oob_accuracy": float(accuracy[0]),
+        "oob_f1_weighted": float(f1[0])
+    }
+    accuracy_floor = reference["oob_accuracy"] - accuracy_tolerance
+    f1_floor = reference["oob_f1_weighted"] - f1_tolerance
+
+    candidates = []
+    # Shallower caps only lose information: stop at the first one out of tolerance
+    for cap in range(max_depth, 0, -1):
+        order, accuracy, f1 = greedy_selection(probabilities(cap), y, accuracy_floor, f1_floor, votes)
+        if order is None:
+            break
+        candidates.append({
+            "depth_cap": cap,
+            "trees": order,
+            "nodes": int(sum(np.count_nonzero(depths[i] <= cap) for i in order)),
+            "oob_accuracy": accuracy,
+            "oob_f1_weighted": f1
+        })
+    candidates.sort(key=lambda c: (c["nodes"], -c["depth_cap"]))
+    return reference, candidates
+
+def build_compressed(model, candidate):
+    """
+    Build the compressed pipeline of a selection candidate.
+
+    Args:
+        model (Pipeline): Fitted pipeline (left unchanged)
+        candidate (dict): Entry returned by select_compression()
+
+    Returns:
+        Pipeline: Pipeline sharing the preprocessing steps, with the selected trees pruned
+    """
+    estimators = _estimators(model.steps[-1][1])
+    return _build(model, [prune_tree(estimators[i], candidate["depth_cap"]) for i in candidate["trees"]])
+
+def _records(X):
+    return X.astype(object).where(X.notna(), None).to_dict('records')
+
+def _row_latency(predict, rows):
+    durations = []
+    for row in rows:
+        start = time.perf_counter()
+        predict(row)
+        durations.append(time.perf_counter() - start)
+    durations = np.asarray(durations) * 1000.0
+    return {"p50_ms": round(float(np.median(durations)), 4), "mean_ms": round(float(durations.mean()), 4)}
+
+def _artifact_bytes(compiled):
+    return int(sum(value.nbytes for key, value in compiled.items() if key != "meta"))
+
+def measure(model, X_test, compact=False, rows=LATENCY_ROWS, repeat=3):
+    """
+    Size, load time and per-row latency of a pipeline, as a pickle and as a compiled artifact.
+
+    Args:
+        model (Pipeline): Fitted tree pipeline
+        X_test (pd.DataFrame): Rows timed one at a time (the first `rows`)
+        compact (bool): Compile with compact dtypes
+        rows (int): Number of rows timed
+        repeat (int): Loads timed (the median is reported)
+
+    Returns:
+        dict: "pickle" and "artifact" entries with bytes, load_ms and row latency
+    """
+    import joblib
+    from compiled_scorer import compile_pipeline, CompiledScorer
+    from model_artifact import write_artifact, read_artifact
+
+    sample = X_test.iloc[:rows]
+    frames = [sample.iloc[[i]] for i in range(len(sample))]
+    records = [[record] for record in _records(sample)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "model.pkl"
+        joblib.dump(model, path)
+        size = path.stat().st_size
+        loads = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            joblib.load(path)
+            loads.append(time.perf_counter() - start)
+        pickle_entry = {
+            "bytes": size,
+            "load_ms": round(float(np.median(loads)) * 1000.0, 3),
+            "row_latency": _row_latency(model.predict, frames)
+        }
+
+        compiled = compile_pipeline(model, compact=compact)
+        version = write_artifact(compiled, Path(tmp) / "artifacts", publish=False)
+        loads = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scorer = CompiledScorer(read_artifact(Path(tmp) / "artifacts" / version))
+            loads.append(time.perf_counter() - start)
+        artifact_entry = {
+            "bytes": sum(f.stat().st_size for f in (Path(tmp) / "artifacts" / version).iterdir()),
+            "load_ms": round(float(np.median(loads)) * 1000.0, 3),
+            "row_latency": _row_latency(scorer.predict, records)
+        }
+        del scorer
+    return {"pickle": pickle_entry, "artifact": artifact_entry}
+
+def compress_forest(model, X_train, y_train, X_test, y_test, accuracy_tolerance=DEFAULT_TOLERANCE,
+                    f1_tolerance=DEFAULT_TOLERANCE, max_artifact_kb=None, max_row_latency_ms=None):
+    """
+    Compress a fitted forest pipeline and report the gains.
+
+    Candidates within tolerance out of bag are tried fewest nodes first; the
+    first one whose compact artifact fits max_artifact_kb and whose compiled
+    per-row latency (median) fits max_row_latency_ms is kept. When none fits
+    the budgets, the smallest candidate is kept and the report says so. The
+    held-out rows then only check the result: if its test accuracy or F1 is
+    not within tolerance of the original forest, the original is returned
+    and the report has "applied": false.
+
+    Args:
+        model (Pipeline): Fitted pipeline ending with a RandomForestClassifier (left unchanged)
+        X_train (pd.DataFrame): Training input columns the pipeline was fitted on
+        y_train (pd.Series): Training labels
+        X_test (pd.DataFrame): Held-out input columns
+        y_test (pd.Series): Held-out labels
+        accuracy_tolerance (float): Accepted accuracy loss
+        f1_tolerance (float): Accepted weighted F1 loss
+        max_artifact_kb (float, optional): Budget for the compact artifact arrays
+        max_row_latency_ms (float, optional): Budget for the compiled per-row latency
+
+    Returns:
+        tuple: (compressed, report) the compressed pipeline (or model itself when
+            the test check fails) and a JSON-serializable report (selection,
+            budgets, test check, size / load time / latency before and after)
+
+    Raises:
+        ValueError: If the classifier is not a forest fitted on bootstrap samples
+    """
+    from compiled_scorer import compile_pipeline, CompiledScorer
+
+    start = time.perf_counter()
+    reference, candidates = select_compression(model, X_train, y_train, accuracy_tolerance, f1_tolerance)
+    records = _records(X_test)
+    timed = [[record] for record in records[:LATENCY_ROWS]]
+
+    chosen, compressed, budget_met = None, None, True
+    for candidate in candidates:
+        pipeline = build_compressed(model, candidate)
+        compiled = compile_pipeline(pipeline, compact=True)
+        fits = max_artifact_kb is None or _artifact_bytes(compiled) / 1024.0 <= max_artifact_kb
+        if fits and max_row_latency_ms is not None:
+            latency = _row_latency(CompiledScorer(compiled).predict, timed)
+            fits = latency["p50_ms"] <= max_row_latency_ms
+        if fits:
+            chosen, compressed = candidate, pipeline
+            break
+    if chosen is None:
+        # Nothing fits the budgets: the smallest model within tolerance
+        budget_met = False
+        chosen = candidates[0]
+        compressed = build_compressed(model, chosen)
+    selection_s = time.perf_counter() - start
+
+    # Final check on the held-out rows, which played no part in the selection
+    classifier = model.steps[-1][1]
+    y = np.searchsorted(classifier.classes_, np.asarray(y_test))
+    predictions = np.stack([np.searchsorted(classifier.classes_, pipeline.predict(X_test))
+                            for pipeline in (model, compressed)])
+    accuracy, f1 = _scores(predictions, y, len(classifier.classes_))
+    applied = bool(accuracy[1] >= accuracy[0] - accuracy_tolerance and f1[1] >= f1[0] - f1_tolerance)
+
+    # Agreement of the compact artifact with the compressed pickle on every held-out row
+    scorer = CompiledScorer(compile_pipeline(compressed, compact=True))
+    mismatches = int((scorer.predict(records) != compressed.predict(X_test)).sum())
+
+    after = {
+        "trees": len(chosen["trees"]),
+        "nodes": chosen["nodes"],
+        "max_depth": chosen["depth_cap"],
+        "oob_accuracy": chosen["oob_accuracy"],
+        "oob_f1_weighted": chosen["oob_f1_weighted"],
+        "accuracy": float(accuracy[1]),
+        "f1_weighted": float(f1[1]),
+        **measure(compressed, X_test, compact=True)
+    }
+    report = {
+        "tolerance": {"accuracy": accuracy_tolerance, "f1_weighted": f1_tolerance},
+        "budgets": {"max_artifact_kb": max_artifact_kb, "max_row_latency_ms": max_row_latency_ms, "met": budget_met},
+        "selection_rows": reference["oob_rows"],
+        "test_rows": len(X_test),
+        "applied": applied,
+        "selection_s": round(selection_s, 3),
+        "selected_trees": chosen["trees"],
+        "candidates": [dict(candidate, trees=len(candidate["trees"])) for candidate in candidates],
+        "artifact_mismatches": mismatches,
+        "before": {**reference, "accuracy": float(accuracy[0]), "f1_weighted": float(f1[0]), **measure(model, X_test)},
+        "after": after
+    }
+    return (compressed if applied else model), report
+
+def summary(report):
+    """
+    Before / after table for the console.
+
+    Args:
+        report (dict): Report returned by compress_forest()
+
+    Returns:
+        str: Text table
+    """
+    rows = [
+        ("trees", "trees", "{:d}"),
+        ("nodes", "nodes", "{:d}"),
+        ("max depth", "max_depth", "{:d}"),
+        ("accuracy", "accuracy", "{:.4f}"),
+        ("F1 (weighted)", "f1_weighted", "{:.4f}")
+    ]
+    lines = [f"{'':<28}{'before':>14}{'after':>14}"]
+    for label, key, fmt in rows:
+        lines.append(f"{label:<28}{fmt.format(report['before'][key]):>14}{fmt.format(report['after'][key]):>14}")
+    for kind in ("pickle", "artifact"):
+        before, after = report["before"][kind], report["after"][kind]
+        lines.append(f"{kind + ' KB':<28}{before['bytes'] / 1024:>14.1f}{after['bytes'] / 1024:>14.1f}")
+        lines.append(f"{kind + ' load ms':<28}{before['load_ms']:>14.2f}{after['load_ms']:>14.2f}")
+        lines.append(f"{kind + ' row p50 ms':<28}{before['row_latency']['p50_ms']:>14.3f}"
+                     f"{after['row_latency']['p50_ms']:>14.3f}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Compress a fitted random forest within an accuracy/F1 tolerance")
+    parser.add_argument('--model', default=str(MODEL_PATH), help="Fitted pipeline pickle")
+    parser.add_argument('--csv', default=None, help="Survey CSV (default: the training survey)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Accepted accuracy and weighted F1 loss, out of bag for the selection "
+                             "and on the held-out split for the final check")
+    parser.add_argument('--max-kb', type=float, default=None, help="Budget for the compact artifact arrays")
+    parser.add_argument('--max-latency-ms', type=float, default=None,
+                        help="Budget for the compiled per-row latency (median)")
+    parser.add_argument('--output', default=None, help="Write the compressed pipeline pickle here")
+    parser.add_argument('--export', action='store_true',
+                        help="Publish the compressed pipeline as a compact artifact (requires --output)")
+    parser.add_argument('--report', default=str(REPORT_PATH), help="JSON report path")
+    args = parser.parse_args(argv)
+    if args.export and not args.output:
+        parser.error("--export requires --output")
+
+    import joblib
+    from sklearn.model_selection import train_test_split
+    from model_artifact import make_readable
+    from training_orchestrator import load_training_data
+
+    # Same split as the training scripts: the forest was fitted on X_train
+    X, y = load_training_data(args.csv) if args.csv else load_training_data()
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    model = joblib.load(args.model)
+    try:
+        compressed, report = compress_forest(model, X_train, y_train, X_test, y_test, args.tolerance,
+                                             args.tolerance, args.max_kb, args.max_latency_ms)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(summary(report))
+    if not report["budgets"]["met"]:
+        print("No candidate within tolerance fits the budgets: the smallest one was kept")
+    if not report["applied"]:
+        print("The compressed forest is not within tolerance on the held-out split: nothing written")
+        return 1
+
+    if args.output:
+        # Written next to the destination and renamed, so readers never see a partial pickle
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{output.name}.", dir=output.parent)
+        os.close(fd)
+        try:
+            joblib.dump(compressed, tmp_path)
+            make_readable(tmp_path)
+            os.replace(tmp_path, output)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        print(f"Compressed model written to {output}")
+        if args.export:
+            import model_artifact
+            version = model_artifact.export_artifact(
+                compressed, source_path=output, compact=True,
+                training_metrics={"accuracy": report["after"]["accuracy"],
+                                  "f1_weighted": report["after"]["f1_weighted"],
+                                  "compression": {"trees": report["after"]["trees"],
+                                                  "max_depth": report["after"]["max_depth"]}})
+            print(f"Artifact {version} published in {model_artifact.ARTIFACTS_DIR}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Inference Hot-path Instrumentation
+
+Splits the time of a prediction into stages:
+
+    model_load     getting the model from the registry (a real load only on
+                   the first request and after a retrain)
+    validate       feature presence check and input normalization
+    cache_lookup   prediction cache lookup
+    frame          DataFrame construction (sklearn pipeline only)
+    preprocess     scaler + one-hot encoder
+    classifier     classifier predict (or risk table lookup)
+    recommend      recommendation generation
+    serialize      JSON serialization of the response
+
+RequestTimings collects the stages of one prediction pass (a request, or a
+micro-batch) and the exceptions raised in them; it is a plain object so
+pool workers can send it back with their result. UNTIMED stands in for it
+when the caller does not want timings and costs nothing. InferenceMetrics
+aggregates passes into counters and histograms and renders them in the
+Prometheus text exposition format.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+STAGES = ('model_load', 'validate', 'cache_lookup', 'frame', 'preprocess', 'classifier', 'recommend', 'serialize')
+
+# Histogram upper bounds in seconds (+Inf is implicit)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRIC_PREFIX = "mental_health_inference"
+
+class RequestTimings:
+    """
+    Stage durations and errors of one prediction pass.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.errors = []
+
+    def stage(self, name):
+        """
+        Time a stage; durations of a stage entered several times add up.
+
+        An exception raised inside the stage is recorded with the stage
+        name and re-raised.
+
+        Args:
+            name (str): Stage name, one of STAGES
+
+        Returns:
+            context manager
+        """
+        return _Stage(self, name)
+
+    def add(self, name, seconds):
+        """
+        Add a duration measured outside stage().
+
+        Args:
+            name (str): Stage name
+            seconds (float): Duration
+        """
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def error(self, name, error_type):
+        """
+        Record an error that did not come from an exception (e.g. invalid input).
+
+        Args:
+            name (str): Stage where it happened
+            error_type (str): Error class name
+        """
+        self.errors.append((name, error_type))
+
+    def as_dict(self, total=None, **extra):
+        """
+        Timing block included in a response.
+
+        Args:
+            total (float, optional): End-to-end seconds, defaults to the time since creation
+            **extra: Seconds of stages measured after the pass (e.g. serialize=...)
+
+        Returns:
+            dict: Milliseconds per stage in pipeline order, then "total"
+        """
+        stages = dict(self.stages)
+        for name, seconds in extra.items():
+            stages[name] = stages.get(name, 0.0) + seconds
+        block = {name: round(stages[name] * 1000.0, 3) for name in STAGES if name in stages}
+        block.update((name, round(seconds * 1000.0, 3)) for name, seconds in stages.items()
+                     if name not in block)
+        if total is None:
+            total = time.perf_counter() - self.started
+        block["total"] = round(total * 1000.0, 3)
+        return block
+
+class _Stage:
+    # Plain class rather than @contextmanager: this runs several times per request
+    __slots__ = ('timings', 'name', 'started')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, traceback):
+        stages = self.timings.stages
+        stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self.started
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.timings.errors.append((self.name, exc_type.__name__))
+        return False
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+_NO_STAGE = _NoStage()
+
+class _Untimed:
+    """
+    RequestTimings stand-in that records nothing.
+    """
+
+    __slots__ = ()
+
+    def stage(self, name):
+        return _NO_STAGE
+
+    def add(self, name, seconds):
+        pass
+
+    def error(self, name, error_type):
+        pass
+
+    @property
+    def errors(self):
+        return []
+
+UNTIMED = _Untimed()
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, as exposed by Prometheus.
+
+    Args:
+        buckets (tuple): Sorted upper bounds
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Add one observation.
+
+        Args:
+            value (float): Observed value
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-quantile (None if empty or above the last bucket).
+
+        Args:
+            q (float): Quantile in [0, 1]
+
+        Returns:
+            float: Bucket upper bound in the observed unit
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class InferenceMetrics:
+    """
+    Thread-safe counters and histograms of the prediction hot path.
+
+    Args:
+        buckets (tuple): Histogram upper bounds in seconds
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._requests = Histogram(self.buckets)
+        self._outcomes = {}
+        self._errors = {}
+        self._passes = 0
+
+    def record(self, timings):
+        """
+        Aggregate one prediction pass.
+
+        Args:
+            timings (RequestTimings): Stages and errors of the pass
+        """
+        with self._lock:
+            self._passes += 1
+            for name, seconds in timings.stages.items():
+                self._stage(name).observe(seconds)
+            for key in timings.errors:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def observe(self, stage, seconds):
+        """
+        Aggregate a single stage duration (e.g. serialization, measured by the server).
+
+        Args:
+            stage (str): Stage name
+            seconds (float): Duration
+        """
+        with self._lock:
+            self._stage(stage).observe(seconds)
+
+    def observe_request(self, seconds, outcome):
+        """
+        Aggregate the end-to-end latency and outcome of an answered request.
+
+        Args:
+            seconds (float): From reception to serialized response
+            outcome (str): 'ok', 'error' or 'busy'
+        """
+        with self._lock:
+            self._requests.observe(seconds)
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+    def _stage(self, name):
+        histogram = self._stages.get(name)
+        if histogram is None:
+            histogram = self._stages[name] = Histogram(self.buckets)
+        return histogram
+
+    def stats(self):
+        """
+        Summarize the metrics for the JSON "stats" command.
+
+        Returns:
+            dict: Request outcomes, errors by stage, and count / mean / p50 / p99
+                bucket bound in milliseconds per stage
+        """
+        def summary(histogram):
+            return {
+                "count": histogram.count,
+                "mean_ms": histogram.sum / histogram.count * 1000.0 if histogram.count else 0.0,
+                "p50_le_ms": _ms(histogram.quantile(0.5)),
+                "p99_le_ms": _ms(histogram.quantile(0.99))
+            }
+
+        with self._lock:
+            stages = {name: summary(self._stages[name]) for name in self._ordered_stages()}
+            return {
+                "requests": dict(self._outcomes),
+                "passes": self._passes,
+                "errors": [{"stage": stage, "type": error_type, "count": count}
+                           for (stage, error_type), count in sorted(self._errors.items())],
+                "latency": summary(self._requests),
+                "stages": stages
+            }
+
+    def _ordered_stages(self):
+        return [name for name in STAGES if name in self._stages] + \
+               sorted(name for name in self._stages if name not in STAGES)
+
+    def render(self, extra=()):
+        """
+        Render every metric in the Prometheus text exposition format (version 0.0.4).
+
+        Args:
+            extra (iterable): Additional (name, type, help, value) samples,
+                e.g. cache and model registry counters
+
+        Returns:
+            str: Exposition text, ending with a newline
+        """
+        lines = []
+
+        def header(name, metric_type, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        def histogram(name, value, labels=()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), value.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value.sum)}")
+            lines.append(f"{name}_count{_labels(labels)} {value.count}")
+
+        with self._lock:
+            name = f"{METRIC_PREFIX}_requests_total"
+            header(name, "counter", "Answered prediction requests by outcome.")
+            for outcome, count in sorted(self._outcomes.items()):
+                lines.append(f"{name}{_labels((('outcome', outcome),))} {count}")
+
+            name = f"{METRIC_PREFIX}_request_duration_seconds"
+            header(name, "histogram", "End-to-end request latency, from reception to serialized response.")
+            histogram(name, self._requests)
+
+            name = f"{METRIC_PREFIX}_passes_total"
+            header(name, "counter", "Prediction passes (single requests or micro-batches).")
+            lines.append(f"{name} {self._passes}")
+
+            name = f"{METRIC_PREFIX}_stage_duration_seconds"
+            header(name, "histogram", "Time spent per prediction pass in each stage of the hot path.")
+            for stage in self._ordered_stages():
+                histogram(name, self._stages[stage], (('stage', stage),))
+
+            name = f"{METRIC_PREFIX}_errors_total"
+            header(name, "counter", "Prediction errors by stage and error type.")
+            for (stage, error_type), count in sorted(self._errors.items()):
+                lines.append(f"{name}{_labels((('stage', stage), ('type', error_type)))} {count}")
+
+        for name, metric_type, help_text, value in extra:
+            if value is None:
+                continue
+            header(name, metric_type, help_text)
+            lines.append(f"{name} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+def _ms(seconds):
+    return None if seconds is None else seconds * 1000.0
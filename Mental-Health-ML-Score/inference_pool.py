@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Pre-forked Inference Worker Pool
+
+The parent process loads the model once, then forks the workers so the
+fitted pipeline is shared copy-on-write instead of being unpickled again
+in every process. Each worker keeps using the process-wide model it
+inherited and reloads it on its own when model/ changes.
+
+Requests are tagged with their id and answered as soon as a worker
+finishes, so responses may come back out of order.
+
+When the number of in-flight requests reaches the configured limit, new
+requests are rejected immediately with a "busy" response instead of being
+queued without bound.
+
+If a worker dies (OOM kill, segfault), every request still in flight
+fails with BrokenProcessPool, so their slots are given back, and the
+workers are forked again on the next request.
+"""
+
+import os
+import sys
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# State inherited by the forked workers (set in the parent before forking)
+_worker_state = {}
+
+def _predict_in_worker(input_data, favorite_activities):
+    """
+    Run one prediction inside a worker.
+
+    Args:
+        input_data (dict): Input data for prediction
+        favorite_activities (list): User's favorite activities
+
+    Returns:
+        dict: Prediction result with recommendations
+    """
+    return _worker_state['predict'](input_data, favorite_activities)
+
+def _notify(callback, value):
+    try:
+        callback(value)
+    except Exception as e:
+        print(f"Inference pool callback failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+class InferencePool:
+    """
+    Fixed-size pool of forked prediction workers with bounded in-flight requests.
+
+    Args:
+        predict_fn (callable): predict(input_data, favorite_activities) -> result function; whatever
+            model it uses should be loaded before the pool is created
+        size (int): Number of worker processes
+        max_inflight (int, optional): Maximum requests submitted but not yet answered
+            (defaults to 4 per worker)
+    """
+
+    def __init__(self, predict_fn, size, max_inflight=None):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        self.size = size
+        self.max_inflight = max_inflight or 4 * size
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self._lock = threading.Lock()
+
+        _worker_state['predict'] = predict_fn
+        self._executor = self._fork()
+
+    def _fork(self):
+        executor = ProcessPoolExecutor(max_workers=self.size, mp_context=multiprocessing.get_context('fork'))
+        # The first submit forks every worker: do it now so they start from the already loaded model
+        executor.submit(os.getpid)
+        return executor
+
+    def _submit(self, *args):
+        with self._lock:
+            try:
+                return self._executor.submit(_predict_in_worker, *args)
+            except BrokenProcessPool:
+                # A worker died since the last request: start a new set of workers
+                print("Inference pool broken by a dead worker, forking new workers", file=sys.stderr)
+                self._executor.shutdown(wait=False)
+                self._executor = self._fork()
+                return self._executor.submit(_predict_in_worker, *args)
+
+    def submit(self, input_data, favorite_activities, callback, error_callback):
+        """
+        Queue a prediction without blocking.
+
+        Args:
+            input_data (dict): Input data for prediction
+            favorite_activities (list): User's favorite activities
+            callback (callable): Called with what predict_fn returned, from a pool thread
+            error_callback (callable): Called with the exception if the worker failed
+                (BrokenProcessPool if it died)
+
+        Returns:
+            bool: False if the pool is saturated and the request was not queued
+        """
+        if not self._slots.acquire(blocking=False):
+            return False
+
+        # Runs in the pool's manager thread: if a user callback raised
+        # there, the pool would stop answering every later request
+        def on_done(future):
+            self._slots.release()
+            error = future.exception()
+            if error is None:
+                _notify(callback, future.result())
+            else:
+                _notify(error_callback, error)
+
+        try:
+            future = self._submit(input_data, favorite_activities)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(on_done)
+        return True
+
+    def close(self):
+        """
+        Finish the queued requests and stop the workers.
+        """
+        self._executor.shutdown(wait=True)
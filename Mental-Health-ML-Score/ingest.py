@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Chunked Survey Ingestion
+
+The training scripts used to read the whole survey CSV into object
+columns and clean the full frame (drop_duplicates, fillna, str.strip /
+str.lower). ingest_csv() does the same cleaning while streaming the file,
+so exports from every campus can be ingested without holding them as
+Python strings:
+
+- rows are read in chunks with fixed dtypes (sniffed from the first chunk),
+- duplicates are dropped with a set of 64-bit row hashes (8 bytes per
+  distinct row, kept as sorted NumPy runs), keeping the first occurrence
+  like drop_duplicates(),
+- the median / mode used for imputation come from value counts merged
+  chunk after chunk, so they are exact (pandas median() and mode()[0]),
+- each cleaned chunk is stored with category dtypes and float32 when exact,
+  and integral columns are downcast to the smallest integer type at the end.
+
+Peak memory is one raw chunk plus the compact result and the hash set,
+whatever the size of the file.
+
+Usage:
+    python ingest.py [students_mental_health_survey.csv] [--chunksize N] [--out cleaned.parquet]
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+SURVEY_PATH = SCRIPT_DIR / "students_mental_health_survey.csv"
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Imputation of the training scripts
+MEDIAN_IMPUTED = ('CGPA',)
+MODE_IMPUTED = ('Substance_Use',)
+
+class HashedRowSet:
+    """
+    Set of 64-bit row hashes stored as a few sorted NumPy runs.
+
+    New hashes form a run; runs of similar size are merged, so there are
+    O(log n) runs and every hash is re-sorted O(log n) times.
+    """
+
+    def __init__(self):
+        self._runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    def add(self, hashes):
+        """
+        Add hashes and report which ones were new.
+
+        Args:
+            hashes (np.ndarray): uint64 row hashes
+
+        Returns:
+            np.ndarray: Boolean mask, True for the first occurrence of a hash never added before
+        """
+        new = np.zeros(len(hashes), dtype=bool)
+        new[np.unique(hashes, return_index=True)[1]] = True
+        for run in self._runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            new &= run[positions] != hashes
+
+        run = np.sort(hashes[new])
+        while self._runs and len(self._runs[-1]) <= 2 * len(run):
+            run = np.sort(np.concatenate([self._runs.pop(), run]))
+        if len(run):
+            self._runs.append(run)
+        return new
+
+def _merge_counts(total, chunk_counts):
+    return chunk_counts if total is None else total.add(chunk_counts, fill_value=0)
+
+def median_from_counts(counts):
+    """
+    Median of the values described by their counts, like Series.median().
+
+    Args:
+        counts (pd.Series): Count per distinct value
+
+    Returns:
+        float: Median, or NaN if there are no values
+    """
+    counts = counts[counts > 0].sort_index()
+    n = int(counts.sum())
+    if n == 0:
+        return np.nan
+    cumulative = np.cumsum(counts.to_numpy())
+    values = counts.index.to_numpy(dtype=np.float64)
+    lower = values[np.searchsorted(cumulative, (n - 1) // 2, side='right')]
+    upper = values[np.searchsorted(cumulative, n // 2, side='right')]
+    return (lower + upper) / 2
+
+def mode_from_counts(counts):
+    """
+    Most frequent value, the smallest one on ties, like Series.mode()[0].
+
+    Args:
+        counts (pd.Series): Count per distinct value
+
+    Returns:
+        object: Mode, or None if there are no values
+    """
+    counts = counts[counts > 0]
+    if counts.empty:
+        return None
+    return min(counts.index[counts == counts.max()])
+
+def _compact_chunk(chunk, string_cols):
+    compact = {}
+    for column in chunk.columns:
+        values = chunk[column]
+        if column in string_cols:
+            compact[column] = values.astype('category')
+        else:
+            narrow = values.astype(np.float32)
+            exact = (narrow.astype(np.float64) == values) | values.isna()
+            compact[column] = narrow if exact.all() else values
+    return pd.DataFrame(compact, index=chunk.index)
+
+def _concat_chunks(chunks, dtypes, string_cols):
+    if not chunks:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+    index = pd.concat([chunk.iloc[:, :0] for chunk in chunks]).index
+    return pd.DataFrame({
+        column: pd.Series(pd.api.types.union_categoricals([chunk[column] for chunk in chunks]), index=index)
+        if column in string_cols else pd.concat([chunk[column] for chunk in chunks])
+        for column in dtypes
+    })
+
+def _normalize_categories(values):
+    # str.strip().str.lower() applied once per category instead of once per row;
+    # categories that become equal are merged
+    normalized = values.cat.categories.str.strip().str.lower()
+    categories = normalized.unique()
+    codes = values.cat.codes.to_numpy()
+    remapped = np.where(codes >= 0, categories.get_indexer(normalized)[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(remapped, categories), index=values.index)
+
+def _downcast(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.remove_unused_categories()
+    if values.isna().any() or not (values == np.floor(values)).all():
+        return values
+    return pd.to_numeric(values.astype(np.int64), downcast='integer')
+
+def ingest_csv(path=SURVEY_PATH, chunksize=DEFAULT_CHUNKSIZE, normalize_cols=None,
+               median_cols=MEDIAN_IMPUTED, mode_cols=MODE_IMPUTED):
+    """
+    Stream and clean a survey CSV like the training scripts do.
+
+    Equivalent to read_csv + drop_duplicates + fillna(median / mode) +
+    dropna + str.strip().str.lower(), with compact dtypes.
+
+    Args:
+        path (Path): Survey CSV
+        chunksize (int): Rows parsed at once
+        normalize_cols (list, optional): String columns stripped and lower-cased
+            after imputation (default: every string column)
+        median_cols (tuple): Numerical columns whose missing values get the median
+        mode_cols (tuple): Columns whose missing values get the mode
+
+    Returns:
+        tuple: (df, report) where df is the cleaned DataFrame (category and
+            downcast numeric dtypes, original row labels) and report a dict
+            of row counts, missing values and imputed values
+    """
+    sniffed = pd.read_csv(path, nrows=chunksize)
+    string_cols = [c for c in sniffed.columns if not pd.api.types.is_numeric_dtype(sniffed[c])]
+    dtypes = {c: (object if c in string_cols else np.float64) for c in sniffed.columns}
+    normalize_cols = string_cols if normalize_cols is None else [c for c in normalize_cols if c in string_cols]
+    del sniffed
+
+    seen = HashedRowSet()
+    counts = {column: None for column in (*median_cols, *mode_cols)}
+    missing = pd.Series(0, index=list(dtypes), dtype=np.int64)
+    chunks = []
+    rows_read = 0
+
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=dtypes):
+        rows_read += len(chunk)
+        chunk = chunk[seen.add(pd.util.hash_pandas_object(chunk, index=False).to_numpy())]
+        missing += chunk.isna().sum()
+        for column in counts:
+            counts[column] = _merge_counts(counts[column], chunk[column].value_counts())
+        chunks.append(_compact_chunk(chunk, string_cols))
+
+    df = _concat_chunks(chunks, dtypes, string_cols)
+    del chunks
+
+    imputed = {}
+    for column in median_cols:
+        imputed[column] = median_from_counts(counts[column]) if counts[column] is not None else np.nan
+    for column in mode_cols:
+        imputed[column] = mode_from_counts(counts[column]) if counts[column] is not None else None
+    for column, value in imputed.items():
+        if missing[column] and value is not None and not pd.isna(value):
+            if column in string_cols and value not in df[column].cat.categories:
+                df[column] = df[column].cat.add_categories([value])
+            df[column] = df[column].fillna(value)
+
+    deduplicated = len(df)
+    df = df.dropna()
+
+    for column in normalize_cols:
+        df[column] = _normalize_categories(df[column])
+    for column in df.columns:
+        df[column] = _downcast(df[column])
+
+    report = {
+        "rows_read": rows_read,
+        "duplicates": rows_read - deduplicated,
+        "missing": {column: int(n) for column, n in missing.items()},
+        "imputed": {column: (value.item() if hasattr(value, 'item') else value) for column, value in imputed.items()},
+        "rows_dropped": deduplicated - len(df),
+        "rows": len(df)
+    }
+    return df, report
+
+def main(argv=None):
+    """
+    Command line entry point: ingest a CSV and print the cleaning report.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    import json
+    import resource
+
+    parser = argparse.ArgumentParser(description="Stream and clean a survey CSV")
+    parser.add_argument('csv', nargs='?', default=str(SURVEY_PATH), help="Survey CSV")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Rows parsed at once")
+    parser.add_argument('--out', help="Write the cleaned data (.parquet needs pyarrow, anything else is a pickle)")
+    args = parser.parse_args(argv)
+    if args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+
+    df, report = ingest_csv(args.csv, args.chunksize)
+    report["memory_bytes"] = int(df.memory_usage(deep=True).sum())
+    report["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.out:
+        if args.out.endswith('.parquet'):
+            df.to_parquet(args.out)
+        else:
+            df.to_pickle(args.out)
+        print(f"Cleaned data written to {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
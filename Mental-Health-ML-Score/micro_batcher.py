@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Micro-batching Scheduler
+
+Coalesces single prediction requests that arrive close together into one
+batched model call. The first request of a batch opens a short window;
+everything that arrives before the window closes (or until the batch is
+full) is scored together and each caller is answered individually.
+
+The scheduler keeps the batch size distribution and the queueing delay it
+adds, so the window can be tuned against real traffic.
+"""
+
+import sys
+import queue
+import threading
+import time
+from collections import Counter, deque
+
+# Number of recent queueing delays kept for percentiles
+DELAY_SAMPLES = 10000
+
+def _notify(callback, value):
+    # A failing callback (e.g. a client that disconnected) must not stop the
+    # batcher thread: every other queued request would never be answered
+    try:
+        callback(value)
+    except Exception as e:
+        print(f"Micro-batcher callback failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+class MicroBatcher:
+    """
+    Background thread that groups requests into batches.
+
+    Args:
+        predict_batch_fn (callable): predict_batch(inputs, favorite_activities_list) -> list of results
+        window_ms (float): How long the first request of a batch waits for others
+        max_batch_size (int): Batch is scored as soon as it reaches this many requests
+    """
+
+    def __init__(self, predict_batch_fn, window_ms=3.0, max_batch_size=64):
+        if max_batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._predict_batch = predict_batch_fn
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._delays = deque(maxlen=DELAY_SAMPLES)
+        self._requests = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, input_data, favorite_activities, callback, error_callback):
+        """
+        Queue a prediction for the next batch.
+
+        Args:
+            input_data (dict): Input data for prediction
+            favorite_activities (list): User's favorite activities
+            callback (callable): Called with the result dict from the batcher thread
+            error_callback (callable): Called with the exception if the batch failed
+        """
+        self._queue.put((time.perf_counter(), input_data, favorite_activities, (callback, error_callback)))
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = first[0] + self.window
+        while len(batch) < self.max_batch_size:
+            # Once the window has closed, still take whatever is already waiting
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Score what we have, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._requests += len(batch)
+                self._delays.extend(started - enqueued for enqueued, _, _, _ in batch)
+
+            try:
+                results = self._predict_batch(
+                    [input_data for _, input_data, _, _ in batch],
+                    [favorite_activities for _, _, favorite_activities, _ in batch]
+                )
+            except Exception as e:
+                for _, _, _, (_, error_callback) in batch:
+                    _notify(error_callback, e)
+                continue
+
+            for (_, _, _, (callback, _)), result in zip(batch, results):
+                _notify(callback, result)
+
+    def stats(self):
+        """
+        Summarize batching behaviour since startup.
+
+        Returns:
+            dict: Request and batch counts, batch size histogram and
+                queueing delay percentiles in milliseconds
+        """
+        with self._stats_lock:
+            sizes = dict(sorted(self._batch_sizes.items()))
+            delays = sorted(self._delays)
+            requests = self._requests
+
+        batches = sum(sizes.values())
+        summary = {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": requests / batches if batches else 0,
+            "batch_size_histogram": {str(size): count for size, count in sizes.items()},
+            "queue_delay_ms": {}
+        }
+        if delays:
+            def percentile(p):
+                return delays[min(len(delays) - 1, int(p / 100.0 * len(delays)))] * 1000.0
+            summary["queue_delay_ms"] = {
+                "mean": sum(delays) / len(delays) * 1000.0,
+                "p50": percentile(50),
+                "p95": percentile(95),
+                "p99": percentile(99),
+                "max": delays[-1] * 1000.0
+            }
+        return summary
+
+    def close(self):
+        """
+        Score the requests already queued and stop the batcher thread.
+        """
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Versioned Model Artifacts
+
+Stores a compiled model (see compiled_scorer.py) as a directory made of a
+JSON manifest and plain .npy arrays instead of a joblib pickle:
+
+    model/artifacts/
+        CURRENT                     # name of the version being served
+        <version>/manifest.json     # features, classes, sklearn version, metrics, array index
+        <version>/*.npy             # scaler params, category vocabularies, tree node tables
+        <version>/risk_table.npy    # optional precomputed risk table (risk_table.py)
+
+Arrays are opened with np.load(mmap_mode='r'), so loading takes
+milliseconds, executes no pickled code, and every worker process maps the
+same page-cache pages instead of holding its own copy.
+
+A new version is written to a temporary directory, renamed into place, and
+only then published by atomically replacing CURRENT, so readers never see
+a half-written artifact.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+MODEL_DIR = SCRIPT_DIR / "model"
+
+MODEL_PATH = MODEL_DIR / "mental_health_model.pkl"
+ARTIFACTS_DIR = MODEL_DIR / "artifacts"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+FORMAT_NAME = "mental-health-model"
+FORMAT_VERSION = 1
+
+def file_sha256(path):
+    """
+    Hash a file so an artifact can be matched with the pickle it came from.
+
+    Args:
+        path (Path): File to hash
+
+    Returns:
+        str: Hex digest
+    """
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def make_readable(path):
+    """
+    Give a file or directory written through tempfile the permissions a plain
+    open() / mkdir() would have: tempfile creates them 0600 / 0700, which a
+    server running as another user than the training job cannot read.
+
+    Args:
+        path (Path): File or directory to publish
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, (0o755 if os.path.isdir(path) else 0o644) & ~umask)
+
+def write_artifact(compiled, root=ARTIFACTS_DIR, metadata=None, publish=True, keep=3):
+    """
+    Write a compiled model as a new artifact version.
+
+    Args:
+        compiled (dict): Output of compile_pipeline(), "meta" plus NumPy arrays
+        root (Path): Directory holding the artifact versions
+        metadata (dict, optional): Extra manifest fields (e.g. training_metrics)
+        publish (bool): Point CURRENT at the new version
+        keep (int): Number of most recent versions kept on disk
+
+    Returns:
+        str: Version name of the written artifact
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    meta = dict(compiled["meta"])
+    arrays = {key: np.ascontiguousarray(value) for key, value in compiled.items() if key != "meta"}
+
+    # Category vocabularies become arrays too, ordered by output column
+    categories = meta.pop("categories", {})
+    for j, column in enumerate(meta.get("categorical_cols", [])):
+        mapping = categories[column]
+        values = sorted(mapping, key=mapping.get)
+        arrays[f"vocab_{j}"] = np.asarray(values, dtype=str)
+        arrays[f"vocab_{j}_columns"] = np.asarray([mapping[v] for v in values], dtype=np.int64)
+
+    digest = hashlib.sha256(json.dumps(meta, sort_keys=True).encode('utf-8'))
+    for name in sorted(arrays):
+        digest.update(name.encode('utf-8'))
+        digest.update(arrays[name].tobytes())
+    created_at = datetime.now(timezone.utc)
+    version = f"{created_at:%Y%m%dT%H%M%SZ}-{digest.hexdigest()[:12]}"
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "created_at": created_at.isoformat(),
+        **meta,
+        **(metadata or {}),
+        "arrays": {}
+    }
+
+    staging = Path(tempfile.mkdtemp(prefix=f".{version}.", dir=root))
+    try:
+        for name, array in arrays.items():
+            np.save(staging / f"{name}.npy", array, allow_pickle=False)
+            manifest["arrays"][name] = {
+                "file": f"{name}.npy",
+                "dtype": str(array.dtype),
+                "shape": list(array.shape)
+            }
+        with open(staging / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        make_readable(staging)
+        os.rename(staging, root / version)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if publish:
+        publish_version(version, root)
+        prune_versions(root, keep)
+    return version
+
+def publish_version(version, root=ARTIFACTS_DIR):
+    """
+    Atomically make a written version the one being served.
+
+    Args:
+        version (str): Version name (directory under root)
+        root (Path): Directory holding the artifact versions
+    """
+    root = Path(root)
+    if not (root / version / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"No artifact version {version} in {root}")
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{CURRENT_FILE}.", dir=root)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(version + "\n")
+    make_readable(tmp_path)
+    os.replace(tmp_path, root / CURRENT_FILE)
+
+def current_version(root=ARTIFACTS_DIR):
+    """
+    Name of the published version.
+
+    Args:
+        root (Path): Directory holding the artifact versions
+
+    Returns:
+        str: Version name, or None if nothing is published
+    """
+    try:
+        return (Path(root) / CURRENT_FILE).read_text(encoding='utf-8').strip() or None
+    except FileNotFoundError:
+        return None
+
+def prune_versions(root=ARTIFACTS_DIR, keep=3):
+    """
+    Delete old versions, never the published one.
+
+    Args:
+        root (Path): Directory holding the artifact versions
+        keep (int): Number of most recent versions kept
+    """
+    root = Path(root)
+    current = current_version(root)
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith('.'))
+    for path in versions[:-keep] if keep > 0 else versions:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+def read_artifact(path):
+    """
+    Open an artifact version with memory-mapped arrays.
+
+    Args:
+        path (Path): Version directory
+
+    Returns:
+        dict: Compiled model ("meta" plus read-only memory-mapped arrays),
+            in the shape CompiledScorer expects
+
+    Raises:
+        ValueError: If the manifest is not a supported artifact format
+    """
+    path = Path(path)
+    with open(path / MANIFEST_FILE, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get("format") != FORMAT_NAME or manifest.get("format_version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format in {path}")
+
+    arrays = {
+        name: np.load(path / entry["file"], mmap_mode='r', allow_pickle=False)
+        for name, entry in manifest["arrays"].items()
+    }
+
+    meta = {key: value for key, value in manifest.items() if key != "arrays"}
+    meta["categories"] = {}
+    for j, column in enumerate(meta.get("categorical_cols", [])):
+        values = arrays.pop(f"vocab_{j}")
+        columns = arrays.pop(f"vocab_{j}_columns")
+        meta["categories"][column] = {str(v): int(c) for v, c in zip(values, columns)}
+
+    return {"meta": meta, **arrays}
+
+def load_current(root=ARTIFACTS_DIR, source_path=MODEL_PATH):
+    """
+    Load the published artifact as a CompiledScorer.
+
+    Args:
+        root (Path): Directory holding the artifact versions
+        source_path (Path, optional): Pickle the artifact must have been exported
+            from; artifacts recording a different hash are treated as stale
+
+    Returns:
+        CompiledScorer: Scorer, or None if nothing is published or it is stale
+    """
+    from compiled_scorer import CompiledScorer
+
+    version = current_version(root)
+    if version is None:
+        return None
+
+    compiled = read_artifact(Path(root) / version)
+    expected = compiled["meta"].get("source_sha256")
+    if source_path is not None and expected is not None:
+        if not Path(source_path).exists() or expected != file_sha256(source_path):
+            return None
+    return CompiledScorer(compiled)
+
+def export_artifact(model, root=ARTIFACTS_DIR, source_path=MODEL_PATH, training_metrics=None,
+                    risk_table_data=None, compact=False):
+    """
+    Compile a fitted pipeline and publish it as a new artifact version.
+
+    Args:
+        model (Pipeline): Fitted pipeline
+        root (Path): Directory holding the artifact versions
+        source_path (Path, optional): Pickle of the same pipeline, hashed into the manifest
+        training_metrics (dict, optional): Evaluation results recorded in the manifest
+        risk_table_data (pd.DataFrame, optional): Training inputs; when given, a
+            precomputed risk table covering their domain is stored with the artifact
+            (tree models only: other models are exported without one, with a note)
+        compact (bool): Store tree nodes in compact dtypes (see compile_pipeline())
+
+    Returns:
+        str: Published version name
+    """
+    import sklearn
+    from compiled_scorer import compile_pipeline
+
+    metadata = {
+        "sklearn_version": sklearn.__version__,
+        "training_metrics": training_metrics or {}
+    }
+    if source_path is not None:
+        metadata["source_sha256"] = file_sha256(source_path)
+
+    compiled = compile_pipeline(model, compact=compact)
+    if risk_table_data is not None and compiled["meta"]["model_type"] != "trees":
+        print(f"No risk table for {compiled['meta']['classifier']}: only tree models have one", file=sys.stderr)
+    elif risk_table_data is not None:
+        from risk_table import build_risk_table
+        metadata["risk_table"], compiled["risk_table"] = build_risk_table(model, risk_table_data)
+    return write_artifact(compiled, root, metadata)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Model Definitions
+
+The single source of what the training paths train: the input features,
+the preprocessor, the classifier and parameter grid of each model family,
+and the rule that picks the model to ship. students_mental_health.py,
+students_mental_health_simplified.py and training_orchestrator.py import
+them from here so they cannot drift apart.
+
+The shipped model is the family with the best cross-validated F1-Score
+(the mean over the CV folds of its best grid point); the test split only
+reports how it does on held-out rows.
+"""
+
+import numpy as np
+
+SELECTED_FEATURES = [
+    'Counseling_Service_Use', 'Stress_Level', 'Substance_Use', 'Age', 'Course',
+    'Financial_Stress', 'Physical_Activity', 'Extracurricular_Involvement',
+    'Semester_Credit_Load', 'Family_History', 'Chronic_Illness'
+]
+CATEGORICAL_COLS = [
+    'Counseling_Service_Use', 'Substance_Use', 'Course', 'Physical_Activity',
+    'Extracurricular_Involvement', 'Family_History', 'Chronic_Illness'
+]
+NUMERICAL_COLS = ['Stress_Level', 'Age', 'Financial_Stress', 'Semester_Credit_Load']
+
+def make_classifier(key):
+    """
+    Create the unfitted classifier of a model family.
+
+    Args:
+        key (str): Model key from MODEL_DEFINITIONS (or FAST_SVM_DEFINITION)
+
+    Returns:
+        estimator: Unfitted classifier
+    """
+    if key == 'knn':
+        from sklearn.neighbors import KNeighborsClassifier
+        # Brute force cannot predict string labels with the manhattan metric in
+        # sklearn 1.6; the KD-tree finds the same neighbours (and is what neighbor_index.py serves)
+        return KNeighborsClassifier(algorithm='kd_tree')
+    if key == 'svm':
+        from sklearn.svm import SVC
+        return SVC(probability=True, random_state=42)
+    if key == 'svm_fast':
+        from fast_svm import FastSVC
+        return FastSVC(random_state=42)
+    if key == 'dt':
+        from sklearn.tree import DecisionTreeClassifier
+        return DecisionTreeClassifier(random_state=42)
+    if key == 'rf':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_estimators=200, random_state=42)
+    raise ValueError(f"Unknown model: {key}")
+
+# Grids and display names of the four families; 'cost' only orders the
+# queue of training_orchestrator.py (most expensive families first)
+MODEL_DEFINITIONS = [
+    {
+        'key': 'knn',
+        'name': 'KNN Classifier',
+        'param_grid': {
+            'classifier__n_neighbors': list(range(3, 21, 2)),
+            'classifier__metric': ['euclidean', 'manhattan']
+        },
+        'cost': 2
+    },
+    {
+        'key': 'svm',
+        'name': 'SVM Classifier',
+        'param_grid': {
+            'classifier__C': [0.1, 1, 10],
+            'classifier__kernel': ['linear', 'rbf']
+        },
+        'cost': 4
+    },
+    {
+        'key': 'dt',
+        'name': 'Arbre de Décision Classifier',
+        'param_grid': {
+            'classifier__max_depth': [3, 5, 7, None],
+            'classifier__min_samples_split': [2, 5, 10]
+        },
+        'cost': 1
+    },
+    {
+        'key': 'rf',
+        'name': 'RandomForest Classifier',
+        'param_grid': {
+            'classifier__max_depth': [10, 20, None],
+            'classifier__min_samples_split': [2, 5, 10]
+        },
+        'cost': 3
+    }
+]
+
+# --fast-svm replaces the SVM family: same grid, no probability calibration,
+# linear solver (fast_svm.py)
+FAST_SVM_DEFINITION = {
+    'key': 'svm_fast',
+    'name': 'SVM Classifier',
+    'param_grid': next(d['param_grid'] for d in MODEL_DEFINITIONS if d['key'] == 'svm'),
+    'cost': 1
+}
+
+def get_definition(key):
+    """
+    Look up a model family.
+
+    Args:
+        key (str): Model key from MODEL_DEFINITIONS or FAST_SVM_DEFINITION
+
+    Returns:
+        dict: The family's key, display name, parameter grid and cost
+
+    Raises:
+        ValueError: If the key is unknown
+    """
+    for definition in MODEL_DEFINITIONS + [FAST_SVM_DEFINITION]:
+        if definition['key'] == key:
+            return definition
+    raise ValueError(f"Unknown model: {key}")
+
+def make_preprocessor():
+    """
+    Create the unfitted preprocessor shared by every model family.
+
+    Returns:
+        ColumnTransformer: Scaler for numerical columns, one-hot encoder for categoricals
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+    return ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), NUMERICAL_COLS),
+            ('cat', OneHotEncoder(drop='first', sparse_output=False, handle_unknown='ignore'), CATEGORICAL_COLS)
+        ])
+
+def make_pipeline(key):
+    """
+    Create the full preprocessing + SMOTE + classifier pipeline of a model family.
+
+    Args:
+        key (str): Model key from MODEL_DEFINITIONS
+
+    Returns:
+        ImbPipeline: Unfitted pipeline
+    """
+    from imblearn.over_sampling import SMOTE
+    from imblearn.pipeline import Pipeline as ImbPipeline
+
+    return ImbPipeline(steps=[
+        ('preprocessor', make_preprocessor()),
+        ('smote', SMOTE(random_state=42)),
+        ('classifier', make_classifier(key))
+    ])
+
+def select_best(cv_scores):
+    """
+    Pick the model to ship: the highest cross-validated score. The first
+    candidate wins ties and failed candidates (NaN) rank last.
+
+    Args:
+        cv_scores (list): Cross-validated score of each candidate
+
+    Returns:
+        int: Index of the selected candidate
+    """
+    scores = np.nan_to_num(np.asarray(cv_scores, dtype=float), nan=-np.inf)
+    return int(scores.argmax())
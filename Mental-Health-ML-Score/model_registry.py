@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Process-wide Model Registry
+
+Keeps the loaded model in memory for the life of the process and reloads it
+when the training scripts rewrite the files in model/. The files are
+checked with a cheap stat() at most once per interval; when their
+mtime/size change, the first request to notice loads the new model while
+concurrent requests keep using the old one, and the new model is swapped
+in with a single reference assignment. Requests that already hold the
+previous model finish with it.
+
+If loading fails (for example while a training script is still writing
+the pickle), the current model is kept and the load is retried at the next
+check.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+class ModelRegistry:
+    """
+    Lazily loaded, hot-reloadable model shared by every caller in the process.
+
+    Args:
+        loader (callable): Returns a freshly loaded model
+        watched_paths (list): Files whose changes trigger a reload
+        check_interval (float): Minimum seconds between two stat() checks
+    """
+
+    def __init__(self, loader, watched_paths, check_interval=1.0):
+        self.check_interval = check_interval
+        self._loader = loader
+        self._watched_paths = list(watched_paths)
+        self._reload_lock = threading.Lock()
+        # (model, version, signature), replaced as a whole on reload
+        self._current = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.loaded_at = None
+        self.load_seconds = None
+
+    def _signature(self):
+        signature = []
+        for path in self._watched_paths:
+            try:
+                stat = os.stat(path)
+                signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((str(path), None, None))
+        return tuple(signature)
+
+    def _version(self):
+        digest = hashlib.sha256()
+        for path in self._watched_paths:
+            try:
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            except FileNotFoundError:
+                digest.update(b'missing')
+        return digest.hexdigest()[:12]
+
+    def _load(self, signature):
+        started = time.perf_counter()
+        model = self._loader()
+        self._current = (model, self._version(), signature)
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+
+    def get(self):
+        """
+        Return the current model, reloading it first if its files changed.
+
+        Returns:
+            object: Model returned by the loader
+        """
+        return self.get_versioned()[0]
+
+    def get_versioned(self):
+        """
+        Return the current model together with its version, reloading it first if its files changed.
+
+        Returns:
+            tuple: (model, version) taken from the same load
+        """
+        current = self._current
+        now = time.monotonic()
+        if current is not None and now < self._next_check:
+            return current[0], current[1]
+
+        # Only one caller reloads; the others keep serving the current model
+        if current is not None and not self._reload_lock.acquire(blocking=False):
+            return current[0], current[1]
+        if current is None:
+            self._reload_lock.acquire()
+
+        try:
+            current = self._current
+            self._next_check = time.monotonic() + self.check_interval
+            signature = self._signature()
+            if current is None:
+                self._load(signature)
+            elif signature != current[2]:
+                try:
+                    self._load(signature)
+                    self.reloads += 1
+                except Exception:
+                    self.failed_reloads += 1
+            return self._current[0], self._current[1]
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def version(self):
+        """
+        Short hash of the watched files for the model currently served, or None before the first load.
+        """
+        current = self._current
+        return current[1] if current is not None else None
+
+    def stats(self):
+        """
+        Describe the model currently served.
+
+        Returns:
+            dict: Version, load time and duration, and reload counters
+        """
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads
+        }
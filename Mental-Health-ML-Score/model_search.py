@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Fold-cached Hyperparameter Search
+
+The training scripts tune several models with the same preprocessor, the
+same SMOTE settings and the same 5 stratified folds. A plain GridSearchCV
+on the full pipeline refits the ColumnTransformer and reruns SMOTE for
+every (model, grid point, fold).
+
+run_search() computes each fold once instead: the preprocessor is fitted
+on the fold's training rows, SMOTE resamples them, and the fold's
+validation rows are transformed. The result is kept for the whole process,
+so every grid point of every model reuses it. The folds are stacked in one
+matrix with explicit train/validation index splits and the search only
+tunes the classifier, which gives the same scores as searching the full
+pipeline. The best parameters are then refitted on the whole training set
+as the full pipeline, exactly like GridSearchCV(refit=True).
+
+The stacked fold targets are class indices rather than the 'High' / 'Low'
+labels: sklearn 1.6 cannot predict string labels with a brute-force
+KNeighborsClassifier on the manhattan metric (ArgKminClassMode casts the
+classes to integers), which left those grid points scored NaN. The scores
+do not depend on the encoding, and the refit uses the original labels.
+
+Environment variables:
+    MENTAL_HEALTH_SEARCH    'grid' (default, exhaustive) or 'halving'
+                            (HalvingGridSearchCV: every candidate is scored
+                            on a subsample and only the best third moves on
+                            to the next, larger round)
+"""
+
+import os
+
+import numpy as np
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV, check_cv
+from sklearn.pipeline import Pipeline
+
+SEARCH_STRATEGIES = ('grid', 'halving')
+
+# (preprocessor, resampler, data, folds) fingerprint -> stacked fold data
+_fold_cache = {}
+
+def make_search(estimator, param_grid, strategy=None, cv=5, scoring='f1_weighted', n_jobs=-1,
+                refit=True, random_state=42):
+    """
+    Create the hyperparameter search for an estimator.
+
+    Args:
+        estimator (estimator): Estimator to tune
+        param_grid (dict): Parameter grid
+        strategy (str, optional): 'grid' or 'halving'; defaults to MENTAL_HEALTH_SEARCH
+        cv (int or iterable): Number of folds or explicit (train, validation) splits
+        scoring (str): Scoring used to rank candidates
+        n_jobs (int): Parallel jobs
+        refit (bool): Refit the best candidate on the whole data
+        random_state (int): Seed for the halving subsamples
+
+    Returns:
+        BaseSearchCV: Unfitted search
+
+    Raises:
+        ValueError: If the strategy is unknown
+    """
+    strategy = strategy or os.environ.get('MENTAL_HEALTH_SEARCH', 'grid')
+    if strategy == 'grid':
+        return GridSearchCV(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs, refit=refit)
+    if strategy == 'halving':
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV
+        return HalvingGridSearchCV(estimator, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs, refit=refit,
+                                   factor=3, random_state=random_state)
+    raise ValueError(f"Unknown search strategy: {strategy} (expected one of {SEARCH_STRATEGIES})")
+
+def get_fold_data(preprocessor, resampler, X_train, y_train, cv=5):
+    """
+    Preprocess and resample every CV fold once, and reuse the result afterwards.
+
+    Args:
+        preprocessor (ColumnTransformer): Unfitted (or fitted, its state is ignored) preprocessor
+        resampler (SMOTE): Resampler applied to the training rows of each fold
+        X_train (pd.DataFrame): Training features
+        y_train (pd.Series): Training target
+        cv (int): Number of stratified folds
+
+    Returns:
+        tuple: (X_folds, y_folds, splits, classes) where the rows of every fold
+            are stacked in X_folds / y_folds, y_folds holding indices into
+            classes (the sorted labels), and splits lists the (train, validation)
+            row indices of each fold
+    """
+    import joblib
+
+    key = joblib.hash((clone(preprocessor), clone(resampler), X_train, y_train, cv))
+    if key in _fold_cache:
+        return _fold_cache[key]
+
+    blocks, targets, splits = [], [], []
+    offset = 0
+    for train_idx, test_idx in check_cv(cv, y_train, classifier=True).split(X_train, y_train):
+        fold_preprocessor = clone(preprocessor)
+        X_fit = fold_preprocessor.fit_transform(X_train.iloc[train_idx], y_train.iloc[train_idx])
+        X_resampled, y_resampled = clone(resampler).fit_resample(X_fit, y_train.iloc[train_idx])
+        X_test = fold_preprocessor.transform(X_train.iloc[test_idx])
+
+        n_fit, n_test = X_resampled.shape[0], X_test.shape[0]
+        splits.append((np.arange(offset, offset + n_fit), np.arange(offset + n_fit, offset + n_fit + n_test)))
+        blocks.extend([X_resampled, X_test])
+        targets.extend([np.asarray(y_resampled), np.asarray(y_train.iloc[test_idx])])
+        offset += n_fit + n_test
+
+    stack = sparse.vstack if any(sparse.issparse(block) for block in blocks) else np.vstack
+    classes, y_folds = np.unique(np.concatenate(targets), return_inverse=True)
+    _fold_cache[key] = (stack(blocks), y_folds, splits, classes)
+    return _fold_cache[key]
+
+def run_search(pipeline, param_grid, X_train, y_train, strategy=None, cv=5, scoring='f1_weighted', n_jobs=-1):
+    """
+    Tune the classifier of a preprocessor + SMOTE + classifier pipeline on cached folds.
+
+    Args:
+        pipeline (ImbPipeline): Pipeline with 'preprocessor', 'smote' and 'classifier' steps
+        param_grid (dict): Grid over 'classifier__*' parameters
+        X_train (pd.DataFrame): Training features
+        y_train (pd.Series): Training target
+        strategy (str, optional): 'grid' or 'halving'; defaults to MENTAL_HEALTH_SEARCH
+        cv (int): Number of stratified folds
+        scoring (str): Scoring used to rank candidates
+        n_jobs (int): Parallel jobs
+
+    Returns:
+        BaseSearchCV: Fitted search whose best_estimator_ is the full pipeline
+            refitted on X_train with best_params_
+    """
+    steps = pipeline.named_steps
+    X_folds, y_folds, splits, _ = get_fold_data(steps['preprocessor'], steps['smote'], X_train, y_train, cv)
+
+    search = make_search(Pipeline([('classifier', steps['classifier'])]), param_grid, strategy,
+                         cv=splits, scoring=scoring, n_jobs=n_jobs, refit=False)
+    search.fit(X_folds, y_folds)
+
+    # Back to the original labels: best_estimator_ is fitted on y_train
+    search.best_estimator_ = clone(pipeline).set_params(**search.best_params_).fit(X_train, y_train)
+    return search
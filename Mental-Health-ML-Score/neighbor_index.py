@@ -0,0 +1,465 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Nearest-Neighbour Index
+
+KNeighborsClassifier answers each prediction by scanning its whole
+training set (the preprocessed, SMOTE-resampled matrix), so its latency
+grows linearly with the number of training rows. This module indexes that
+matrix so the KNN candidate can be served without full scans:
+
+    kd_tree, ball_tree   exact: sklearn's KDTree / BallTree, rebuilt from
+                         the stored vectors when the index is opened
+                         (milliseconds for the survey)
+    ivf                  approximate, for large training sets: a k-means
+                         coarse quantizer groups the vectors into inverted
+                         lists of their nearest centroid; a query only
+                         scans the n_probe lists closest to it
+    brute                exact full scan, the reference
+
+compile_pipeline() stores the index with the compiled model (model_type
+"neighbors"), so a fitted KNN pipeline is exported as a versioned artifact
+(memory-mapped .npy vectors, labels and inverted lists) and served by
+CompiledScorer like the tree models.
+
+The benchmark fits the KNN pipeline on the training split and measures,
+for every kind of index and for training sets grown by jittered
+resampling (--sizes), build and load time (the exact trees are built when
+the index is opened, so their cost shows as load time), index size, recall@k against
+the exact neighbours, agreement of the predicted labels, and single-query
+p50 / p99 and batch latency on the test split.
+
+Usage:
+    python neighbor_index.py benchmark
+    python neighbor_index.py benchmark --sizes 0,100000,1000000 --probes 1,2,4,8,16 --output knn_bench.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+
+KINDS = ('brute', 'kd_tree', 'ball_tree', 'ivf')
+METRICS = ('euclidean', 'manhattan')
+
+LEAF_SIZE = 40
+# 'auto' switches from an exact tree to the approximate index above this many rows
+IVF_MIN_ROWS = 200000
+# Rows used to fit the k-means coarse quantizer, per list
+IVF_TRAINING_ROWS_PER_LIST = 256
+# Largest query x vector x feature block computed at once by full scans
+SCAN_BLOCK = 1 << 24
+
+def index_from_classifier(classifier, kind='auto', n_lists=None, n_probe=None):
+    """
+    Index the training matrix of a fitted KNeighborsClassifier.
+
+    Args:
+        classifier (KNeighborsClassifier): Fitted classifier (its training set is
+            the preprocessed, resampled matrix)
+        kind (str): One of KINDS, or 'auto'
+        n_lists (int, optional): IVF inverted lists
+        n_probe (int, optional): IVF lists scanned per query
+
+    Returns:
+        tuple: (spec, arrays) as returned by build_index()
+
+    Raises:
+        ValueError: If the metric or the weights are not supported
+    """
+    if not isinstance(classifier.weights, str):
+        raise ValueError("Callable KNN weights cannot be indexed")
+    return build_index(classifier._fit_X, classifier._y, len(classifier.classes_),
+                       classifier.effective_metric_, classifier.n_neighbors, classifier.weights,
+                       kind, n_lists, n_probe)
+
+def build_index(vectors, labels, n_classes, metric='euclidean', n_neighbors=5, weights='uniform', kind='auto',
+                n_lists=None, n_probe=None, random_state=42):
+    """
+    Build a neighbour index.
+
+    Args:
+        vectors (np.ndarray): Training matrix, shape (n_rows, n_features)
+        labels (np.ndarray): Class index of every row
+        n_classes (int): Number of classes
+        metric (str): 'euclidean' or 'manhattan'
+        n_neighbors (int): Neighbours voting for a prediction
+        weights (str): 'uniform' or 'distance', as in KNeighborsClassifier
+        kind (str): One of KINDS, or 'auto'
+        n_lists (int, optional): IVF inverted lists (default: sqrt of the rows)
+        n_probe (int, optional): IVF lists scanned per query (default: 1/8 of the lists)
+        random_state (int): Seed of the IVF coarse quantizer
+
+    Returns:
+        tuple: (spec, arrays) JSON-serializable description and NumPy arrays
+            ("vectors", "labels", plus "centroids" and "list_offsets" for ivf)
+
+    Raises:
+        ValueError: If the kind, metric or weights are not supported
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unsupported KNN metric: {metric}")
+    if weights not in ('uniform', 'distance'):
+        raise ValueError(f"Unsupported KNN weights: {weights}")
+    vectors = np.asarray(vectors, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+    if kind == 'auto':
+        kind = 'ivf' if len(vectors) >= IVF_MIN_ROWS else 'kd_tree'
+    if kind not in KINDS:
+        raise ValueError(f"Unknown index kind: {kind}")
+
+    spec = {
+        "kind": kind,
+        "metric": metric,
+        "n_neighbors": int(n_neighbors),
+        "weights": weights,
+        "n_classes": int(n_classes),
+        "rows": int(len(vectors))
+    }
+    if kind in ('brute', 'kd_tree', 'ball_tree'):
+        if kind != 'brute':
+            spec["leaf_size"] = LEAF_SIZE
+        label_dtype = np.uint8 if n_classes <= 256 else np.int64
+        return spec, {"vectors": vectors, "labels": labels.astype(label_dtype)}
+
+    from sklearn.cluster import MiniBatchKMeans
+
+    n_lists = int(n_lists or max(1, round(np.sqrt(len(vectors)))))
+    n_lists = min(n_lists, len(vectors))
+    rng = np.random.default_rng(random_state)
+    sample_size = min(len(vectors), n_lists * IVF_TRAINING_ROWS_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    quantizer = MiniBatchKMeans(n_clusters=n_lists, n_init=1, batch_size=4096, random_state=random_state)
+    quantizer.fit(sample.astype(np.float32))
+    centroids = quantizer.cluster_centers_.astype(np.float32)
+
+    # Vectors sorted by list: list j holds rows list_offsets[j]:list_offsets[j + 1]
+    assignment = np.concatenate([_nearest_centroids(block, centroids, 1)[:, 0]
+                                 for block in np.array_split(vectors.astype(np.float32),
+                                                             max(1, len(vectors) // 65536))])
+    order = np.argsort(assignment, kind='stable')
+    offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assignment, minlength=n_lists), out=offsets[1:])
+
+    spec["n_lists"] = n_lists
+    spec["n_probe"] = int(min(n_probe or max(1, n_lists // 8), n_lists))
+    return spec, {
+        "vectors": vectors[order].astype(np.float32),
+        "labels": labels[order].astype(np.uint8 if n_classes <= 256 else np.int64),
+        "centroids": centroids,
+        "list_offsets": offsets
+    }
+
+def _nearest_centroids(X, centroids, n_probe):
+    # Squared L2 distances through the dot product, as k-means assigns rows
+    distances = (np.einsum('ij,ij->i', X, X)[:, None] - 2.0 * X @ centroids.T
+                 + np.einsum('ij,ij->i', centroids, centroids)[None, :])
+    if n_probe >= centroids.shape[0]:
+        return np.argsort(distances, axis=1)
+    nearest = np.argpartition(distances, n_probe - 1, axis=1)[:, :n_probe]
+    return np.take_along_axis(nearest, np.argsort(np.take_along_axis(distances, nearest, axis=1), axis=1), axis=1)
+
+def _distances(X, vectors, metric):
+    if metric == 'manhattan':
+        return np.abs(X[:, None, :] - vectors[None, :, :]).sum(axis=2)
+    squared = (np.einsum('ij,ij->i', X, X)[:, None] - 2.0 * X @ vectors.T
+               + np.einsum('ij,ij->i', vectors, vectors)[None, :])
+    return np.sqrt(np.maximum(squared, 0.0))
+
+def _smallest(distances, k):
+    # The k smallest distances of every row, sorted (ties by position)
+    k = min(k, distances.shape[1])
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k] if k < distances.shape[1] else \
+        np.broadcast_to(np.arange(distances.shape[1]), distances.shape).copy()
+    selected = np.take_along_axis(distances, nearest, axis=1)
+    order = np.lexsort((nearest, selected), axis=1)
+    return np.take_along_axis(selected, order, axis=1), np.take_along_axis(nearest, order, axis=1)
+
+class NeighborIndex:
+    """
+    k-nearest-neighbour search and KNN voting over an indexed training matrix.
+
+    Args:
+        spec (dict): Description returned by build_index()
+        arrays (dict): Arrays returned by build_index() (may be memory-mapped)
+    """
+
+    def __init__(self, spec, arrays):
+        self.spec = spec
+        self.kind = spec["kind"]
+        self.metric = spec["metric"]
+        self.n_neighbors = spec["n_neighbors"]
+        self._vectors = arrays["vectors"]
+        self._labels = arrays["labels"]
+        self._tree = None
+        if self.kind == 'kd_tree':
+            from sklearn.neighbors import KDTree
+            self._tree = KDTree(self._vectors, leaf_size=spec["leaf_size"], metric=self.metric)
+        elif self.kind == 'ball_tree':
+            from sklearn.neighbors import BallTree
+            self._tree = BallTree(self._vectors, leaf_size=spec["leaf_size"], metric=self.metric)
+        elif self.kind == 'ivf':
+            self._centroids = arrays["centroids"]
+            self._offsets = arrays["list_offsets"]
+            self.n_probe = spec["n_probe"]
+
+    def query(self, X, k=None, n_probe=None):
+        """
+        Find the nearest training rows of every query.
+
+        Args:
+            X (np.ndarray): Preprocessed queries, shape (n_queries, n_features)
+            k (int, optional): Neighbours per query (default: n_neighbors)
+            n_probe (int, optional): IVF lists scanned (default: the index's n_probe)
+
+        Returns:
+            tuple: (distances, indices) sorted by distance, shape (n_queries, k);
+                indices are rows of the stored vectors
+        """
+        k = k or self.n_neighbors
+        X = np.asarray(X, dtype=np.float64)
+        if self._tree is not None:
+            return self._tree.query(X, k=k)
+        if self.kind == 'brute':
+            return self._scan(X, k)
+        return self._probe(X, k, n_probe or self.n_probe)
+
+    def _scan(self, X, k):
+        step = max(1, SCAN_BLOCK // max(1, self._vectors.shape[0] * (self._vectors.shape[1]
+                                                                       if self.metric == 'manhattan' else 1)))
+        distances, indices = [], []
+        for start in range(0, X.shape[0], step):
+            d, i = _smallest(_distances(X[start:start + step], self._vectors, self.metric), k)
+            distances.append(d)
+            indices.append(i)
+        return np.vstack(distances), np.vstack(indices)
+
+    def _probe(self, X, k, n_probe):
+        X32 = X.astype(np.float32)
+        lists = _nearest_centroids(X32, self._centroids, min(n_probe, self._centroids.shape[0]))
+        distances = np.full((X.shape[0], k), np.inf)
+        indices = np.zeros((X.shape[0], k), dtype=np.int64)
+        for q in range(X.shape[0]):
+            candidates = np.concatenate([np.arange(self._offsets[j], self._offsets[j + 1]) for j in lists[q]])
+            if candidates.size == 0:
+                continue
+            d, i = _smallest(_distances(X32[q:q + 1], self._vectors[candidates], self.metric), k)
+            found = d.shape[1]
+            distances[q, :found] = d[0]
+            indices[q, :found] = candidates[i[0]]
+        return distances, indices
+
+    def predict_proba(self, X):
+        """
+        Class probabilities from the votes of the nearest neighbours, like
+        KNeighborsClassifier.predict_proba().
+
+        Args:
+            X (np.ndarray): Preprocessed queries
+
+        Returns:
+            np.ndarray: Shape (n_queries, n_classes)
+        """
+        distances, indices = self.query(X)
+        found = np.isfinite(distances)
+        labels = np.asarray(self._labels)[indices]
+        if self.spec["weights"] == 'distance':
+            with np.errstate(divide='ignore'):
+                weights = 1.0 / distances
+            # Exact matches take all the weight, as in sklearn
+            exact = distances == 0
+            has_exact = exact.any(axis=1)
+            weights[has_exact] = exact[has_exact]
+        else:
+            weights = np.ones_like(distances)
+        weights = np.where(found, weights, 0.0)
+
+        proba = np.zeros((X.shape[0], self.spec["n_classes"]))
+        np.add.at(proba, (np.repeat(np.arange(X.shape[0]), labels.shape[1]), labels.ravel()), weights.ravel())
+        totals = proba.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        return proba / totals
+
+    def nbytes(self):
+        """
+        Bytes of the stored arrays (the sklearn trees built at load are not counted).
+
+        Returns:
+            int: Size of the persisted index
+        """
+        arrays = [self._vectors, self._labels]
+        if self.kind == 'ivf':
+            arrays += [self._centroids, self._offsets]
+        return int(sum(array.nbytes for array in arrays))
+
+def _latency(function, queries, rows):
+    durations = []
+    for q in range(min(rows, len(queries))):
+        start = time.perf_counter()
+        function(queries[q:q + 1])
+        durations.append(time.perf_counter() - start)
+    durations = np.asarray(durations) * 1000.0
+    return {"p50_ms": round(float(np.percentile(durations, 50)), 4),
+            "p99_ms": round(float(np.percentile(durations, 99)), 4)}
+
+def grow_training_set(vectors, labels, size, rng, jitter=0.05):
+    """
+    Emulate a larger training set by resampling rows with Gaussian jitter.
+
+    Args:
+        vectors (np.ndarray): Training matrix
+        labels (np.ndarray): Class index of every row
+        size (int): Rows wanted (at most the original ones are kept as is)
+        rng (np.random.Generator): Random generator
+        jitter (float): Standard deviation of the noise added to resampled rows
+
+    Returns:
+        tuple: (vectors, labels)
+    """
+    if size <= len(vectors):
+        return vectors[:size], labels[:size]
+    extra = rng.integers(0, len(vectors), size - len(vectors))
+    noise = rng.normal(0.0, jitter, (len(extra), vectors.shape[1]))
+    return np.vstack([vectors, vectors[extra] + noise]), np.concatenate([labels, labels[extra]])
+
+def benchmark(vectors, labels, n_classes, queries, metric, n_neighbors, weights='uniform', sizes=(0,),
+              probes=(1, 2, 4, 8, 16, 32), kinds=KINDS, latency_rows=200, random_state=42):
+    """
+    Recall / latency comparison of the index kinds.
+
+    Args:
+        vectors (np.ndarray): Training matrix of the fitted KNN
+        labels (np.ndarray): Its class indices
+        n_classes (int): Number of classes
+        queries (np.ndarray): Preprocessed query rows (the test split)
+        metric (str): KNN metric
+        n_neighbors (int): KNN k
+        weights (str): KNN weights
+        sizes (tuple): Training set sizes; 0 keeps the original one
+        probes (tuple): IVF n_probe values
+        kinds (tuple): Index kinds measured
+        latency_rows (int): Queries timed one at a time
+        random_state (int): Seed of the resampling and of the IVF quantizer
+
+    Returns:
+        list: One result dict per size, kind and n_probe
+    """
+    from model_artifact import write_artifact, read_artifact
+    import tempfile
+
+    rng = np.random.default_rng(random_state)
+    results = []
+    for size in sizes:
+        train, train_labels = grow_training_set(vectors, labels, size or len(vectors), rng)
+        exact = None
+        for kind in kinds:
+            start = time.perf_counter()
+            spec, arrays = build_index(train, train_labels, n_classes, metric, n_neighbors, weights, kind,
+                                       random_state=random_state)
+            build_s = time.perf_counter() - start
+
+            with tempfile.TemporaryDirectory() as tmp:
+                # Persisted like a compiled model: JSON manifest + memory-mapped arrays
+                version = write_artifact({"meta": {"index": spec}, **arrays}, tmp, publish=False)
+                start = time.perf_counter()
+                stored = read_artifact(Path(tmp) / version)
+                index = NeighborIndex(stored["meta"]["index"], stored)
+                load_s = time.perf_counter() - start
+
+                for n_probe in (probes if kind == 'ivf' else (None,)):
+                    start = time.perf_counter()
+                    distances, _ = index.query(queries, n_probe=n_probe)
+                    batch_s = time.perf_counter() - start
+                    predicted = np.argmax(_proba(index, queries, n_probe), axis=1)
+                    if exact is None:
+                        # The first kind is the reference (brute by default)
+                        exact = (distances[:, -1], predicted)
+                    # A neighbour is a hit when it is no farther than the exact k-th
+                    # neighbour (IVF stores the vectors in list order, and ties make
+                    # row identities ambiguous anyway)
+                    tolerance = 1e-4 * np.maximum(1.0, exact[0])[:, None]
+                    recall = np.mean(distances <= exact[0][:, None] + tolerance)
+                    results.append({
+                        "rows": len(train),
+                        "kind": kind,
+                        "n_probe": n_probe,
+                        "build_s": round(build_s, 4),
+                        "load_ms": round(load_s * 1000.0, 3),
+                        "index_bytes": index.nbytes(),
+                        "recall_at_k": round(float(recall), 4),
+                        "label_agreement": round(float(np.mean(predicted == exact[1])), 4),
+                        "batch_ms_per_query": round(batch_s * 1000.0 / len(queries), 4),
+                        **_latency(lambda q: index.query(q, n_probe=n_probe), queries, latency_rows)
+                    })
+                del index, stored
+    return results
+
+def _proba(index, queries, n_probe):
+    if index.kind != 'ivf' or n_probe is None:
+        return index.predict_proba(queries)
+    default, index.n_probe = index.n_probe, n_probe
+    try:
+        return index.predict_proba(queries)
+    finally:
+        index.n_probe = default
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Nearest-neighbour index for the KNN model family")
+    parser.add_argument('command', choices=['benchmark'])
+    parser.add_argument('--n-neighbors', type=int, default=5, help="KNN k")
+    parser.add_argument('--metric', choices=METRICS, default='euclidean', help="KNN metric")
+    parser.add_argument('--sizes', default='0',
+                        help="Comma-separated training set sizes; 0 is the SMOTE-resampled training split")
+    parser.add_argument('--probes', default='1,2,4,8,16,32', help="Comma-separated IVF n_probe values")
+    parser.add_argument('--kinds', default=','.join(KINDS), help="Comma-separated index kinds, brute first")
+    parser.add_argument('--latency-rows', type=int, default=200, help="Queries timed one at a time")
+    parser.add_argument('--output', default=None, help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    from sklearn.model_selection import train_test_split
+    from model_definitions import make_pipeline
+    from training_orchestrator import load_training_data
+    from forest_compression import transform_features
+
+    # KNN fitted on the same split as the training scripts
+    X, y = load_training_data()
+    X_train, X_test, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    pipeline = make_pipeline('knn')
+    pipeline.set_params(classifier__n_neighbors=args.n_neighbors, classifier__metric=args.metric)
+    pipeline.fit(X_train, y_train)
+    classifier = pipeline.steps[-1][1]
+    queries = transform_features(pipeline, X_test).astype(np.float64)
+
+    results = benchmark(classifier._fit_X, classifier._y, len(classifier.classes_), queries,
+                        classifier.effective_metric_, classifier.n_neighbors, classifier.weights,
+                        sizes=[int(s) for s in args.sizes.split(',')],
+                        probes=[int(p) for p in args.probes.split(',')],
+                        kinds=args.kinds.split(','), latency_rows=args.latency_rows)
+
+    print(f"{'rows':>9} {'kind':<10}{'probe':>6}{'build s':>9}{'load ms':>9}{'MB':>8}{'recall':>8}"
+          f"{'labels':>8}{'p50 ms':>9}{'p99 ms':>9}{'batch ms':>10}")
+    for r in results:
+        print(f"{r['rows']:>9} {r['kind']:<10}{r['n_probe'] or '-':>6}{r['build_s']:>9.3f}{r['load_ms']:>9.2f}"
+              f"{r['index_bytes'] / 1e6:>8.2f}{r['recall_at_k']:>8.4f}{r['label_agreement']:>8.4f}"
+              f"{r['p50_ms']:>9.3f}{r['p99_ms']:>9.3f}{r['batch_ms_per_query']:>10.4f}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"n_neighbors": args.n_neighbors, "metric": args.metric, "queries": len(queries),
+                       "results": results}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,497 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Incremental Model Updates
+
+Every assessment stored by submitAssessment (MentalHealth collection) is
+labelled data: its stress, anxiety and depression scores give the
+Mental_Health_Risk target exactly as the training scripts define it.
+Instead of retraining on the survey plus every stored record, this script
+keeps an incrementally trainable model and updates it with the records it
+has not seen yet, one chunk at a time:
+
+- numerical columns are standardized with running mean/variance
+  (StandardScaler.partial_fit); when the statistics move, the linear
+  coefficients are rewritten so the model's decision function is unchanged,
+- one-hot vocabularies grow when a new category shows up: it gets the next
+  output column, and the coefficient matrix a new zero column,
+- an SGDClassifier(loss='log_loss') learns from each chunk with
+  partial_fit, with sample weights balancing the classes seen so far (the
+  streaming counterpart of the SMOTE step of the batch pipelines).
+
+The first run seeds the model with the survey CSV. The model state is kept
+in model/online_model.pkl, together with a createdAt watermark so records
+already learnt from are skipped when the same collection is exported
+again. Each update publishes a new artifact version (linear model scored
+by compiled_scorer.py) without rebuilding anything else.
+
+Each chunk is scored before the model learns from it; the resulting
+prequential accuracy is recorded in the artifact manifest.
+
+Usage:
+    mongoexport --collection mentalhealths --out assessments.jsonl
+    python online_training.py update assessments.jsonl [--chunk-size 500] [--no-publish]
+    python online_training.py status
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model_definitions import SELECTED_FEATURES, CATEGORICAL_COLS, NUMERICAL_COLS
+from training_orchestrator import SURVEY_PATH, load_training_data
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+MODEL_DIR = SCRIPT_DIR / "model"
+
+STATE_PATH = MODEL_DIR / "online_model.pkl"
+ARTIFACTS_DIR = MODEL_DIR / "artifacts"
+
+CLASSES = ['High', 'Low']
+
+# MentalHealth document fields (camelCase, as saved by submitAssessment) -> model columns
+ASSESSMENT_FIELDS = {
+    'counselingServiceUse': 'Counseling_Service_Use',
+    'stressLevel': 'Stress_Level',
+    'substanceUse': 'Substance_Use',
+    'age': 'Age',
+    'course': 'Course',
+    'financialStress': 'Financial_Stress',
+    'physicalActivity': 'Physical_Activity',
+    'extracurricularInvolvement': 'Extracurricular_Involvement',
+    'semesterCreditLoad': 'Semester_Credit_Load',
+    'familyHistory': 'Family_History',
+    'chronicIllness': 'Chronic_Illness',
+    'anxietyScore': 'Anxiety_Score',
+    'depressionScore': 'Depression_Score'
+}
+
+def risk_target(frame):
+    """
+    Derive Mental_Health_Risk like the training scripts.
+
+    Args:
+        frame (pd.DataFrame): Rows with the stress, anxiety and depression scores
+
+    Returns:
+        np.ndarray: 'High' or 'Low' per row
+    """
+    return np.where(
+        (frame['Stress_Level'] >= 3) | (frame['Depression_Score'] >= 3) | (frame['Anxiety_Score'] >= 3),
+        'High', 'Low'
+    )
+
+class OnlineModel:
+    """
+    Streaming scaler + growing one-hot encoder + SGD logistic regression.
+
+    Args:
+        alpha (float): L2 regularization of the SGDClassifier
+        random_state (int): Seed of the SGDClassifier
+    """
+
+    def __init__(self, alpha=1e-4, random_state=42):
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+
+        self.scaler = StandardScaler()
+        self.classifier = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+        # Numerical columns come first; categories get the next free column when first seen
+        self.vocabularies = {column: {} for column in CATEGORICAL_COLS}
+        self.n_outputs = len(NUMERICAL_COLS)
+        self.class_counts = np.zeros(len(CLASSES), dtype=np.int64)
+        self.records_seen = 0
+        self.updates = 0
+        self.prequential = {"scored": 0, "correct": 0}
+        # Latest createdAt learnt from, and the record ids sharing it
+        self.watermark = {"created_at": None, "ids": []}
+
+    @property
+    def is_fitted(self):
+        return hasattr(self.classifier, 'coef_')
+
+    def transform(self, X):
+        """
+        Standardize numerical columns and one-hot encode categoricals.
+
+        Args:
+            X (pd.DataFrame): Model input columns
+
+        Returns:
+            np.ndarray: Encoded matrix; unknown categories encode as all zeros
+        """
+        encoded = np.zeros((len(X), self.n_outputs), dtype=np.float64)
+        encoded[:, :len(NUMERICAL_COLS)] = self.scaler.transform(X[NUMERICAL_COLS].to_numpy(dtype=np.float64))
+        rows = np.arange(len(X))
+        for column, vocabulary in self.vocabularies.items():
+            columns = X[column].map(vocabulary).to_numpy(dtype=np.float64, na_value=np.nan)
+            known = ~np.isnan(columns)
+            encoded[rows[known], columns[known].astype(np.int64)] = 1.0
+        return encoded
+
+    def predict(self, X):
+        """
+        Predict risk levels.
+
+        Args:
+            X (pd.DataFrame): Model input columns
+
+        Returns:
+            np.ndarray: Predicted class labels
+        """
+        return self.classifier.predict(self.transform(X))
+
+    def partial_fit(self, X, y, score=True):
+        """
+        Update the scaler, the vocabularies and the classifier with one chunk.
+
+        Args:
+            X (pd.DataFrame): Model input columns
+            y (np.ndarray): Risk levels
+            score (bool): Score the chunk before learning from it (prequential accuracy)
+        """
+        if score and self.is_fitted:
+            self.prequential["scored"] += len(X)
+            self.prequential["correct"] += int((self.predict(X) == y).sum())
+
+        for column, vocabulary in self.vocabularies.items():
+            for value in X[column].unique():
+                if value not in vocabulary:
+                    vocabulary[value] = self.n_outputs
+                    self.n_outputs += 1
+
+        numbers = X[NUMERICAL_COLS].to_numpy(dtype=np.float64)
+        if self.is_fitted:
+            old_mean, old_scale = self.scaler.mean_.copy(), self.scaler.scale_.copy()
+            self.scaler.partial_fit(numbers)
+            self._rebase(old_mean, old_scale)
+        else:
+            self.scaler.partial_fit(numbers)
+
+        self.class_counts += np.array([(y == c).sum() for c in CLASSES])
+        seen = np.maximum(self.class_counts, 1)
+        weights = (self.class_counts.sum() / (len(CLASSES) * seen))[np.searchsorted(CLASSES, y)]
+
+        self.classifier.partial_fit(self.transform(X), y, classes=CLASSES, sample_weight=weights)
+        self.records_seen += len(X)
+        self.updates += 1
+
+    def _rebase(self, old_mean, old_scale):
+        # w * (x - m0) / s0 == (w * s1 / s0) * (x - m1) / s1 + w * (m1 - m0) / s0,
+        # so the decision function survives the new scaler statistics; new
+        # categories start with a zero weight
+        classifier = self.classifier
+        n_numerical = len(NUMERICAL_COLS)
+        weights = classifier.coef_[:, :n_numerical]
+        classifier.intercept_ = classifier.intercept_ + (weights * (self.scaler.mean_ - old_mean) / old_scale).sum(axis=1)
+        weights *= self.scaler.scale_ / old_scale
+        if classifier.coef_.shape[1] < self.n_outputs:
+            padding = np.zeros((classifier.coef_.shape[0], self.n_outputs - classifier.coef_.shape[1]))
+            classifier.coef_ = np.hstack([classifier.coef_, padding])
+            classifier.n_features_in_ = self.n_outputs
+
+    def compile(self):
+        """
+        Export the model in the format of compiled_scorer.compile_pipeline().
+
+        Returns:
+            dict: Metadata under "meta" and NumPy arrays under the other keys
+        """
+        meta = {
+            "feature_names": list(SELECTED_FEATURES),
+            "classes": [str(c) for c in self.classifier.classes_],
+            "numerical_cols": list(NUMERICAL_COLS),
+            "categorical_cols": list(CATEGORICAL_COLS),
+            "categories": {column: {str(v): int(c) for v, c in vocabulary.items()}
+                           for column, vocabulary in self.vocabularies.items()},
+            "numerical_offset": 0,
+            "n_outputs": self.n_outputs,
+            "classifier": type(self.classifier).__name__,
+            "model_type": "linear"
+        }
+        return {
+            "meta": meta,
+            "scaler_mean": np.asarray(self.scaler.mean_, dtype=np.float64),
+            "scaler_scale": np.asarray(self.scaler.scale_, dtype=np.float64),
+            "coef": np.asarray(self.classifier.coef_, dtype=np.float64),
+            "intercept": np.asarray(self.classifier.intercept_, dtype=np.float64)
+        }
+
+    def metrics(self):
+        """
+        Summary recorded in the artifact manifest.
+
+        Returns:
+            dict: Training counters and prequential accuracy
+        """
+        scored = self.prequential["scored"]
+        return {
+            "model": "SGDClassifier (online)",
+            "records_seen": self.records_seen,
+            "updates": self.updates,
+            "class_counts": dict(zip(CLASSES, self.class_counts.tolist())),
+            "prequential_records": scored,
+            "prequential_accuracy": self.prequential["correct"] / scored if scored else None,
+            "watermark": self.watermark["created_at"]
+        }
+
+def bootstrap(model, csv_path=SURVEY_PATH, chunk_size=500, epochs=5, random_state=42):
+    """
+    Seed a new model with the survey CSV.
+
+    Args:
+        model (OnlineModel): Unfitted model
+        csv_path (Path): Survey CSV
+        chunk_size (int): Rows per partial_fit call
+        epochs (int): Passes over the (reshuffled) survey
+        random_state (int): Seed of the shuffles
+    """
+    X, y = load_training_data(csv_path)
+    y = y.to_numpy()
+    rng = np.random.default_rng(random_state)
+    for _ in range(epochs):
+        order = rng.permutation(len(X))
+        for start in range(0, len(X), chunk_size):
+            rows = order[start:start + chunk_size]
+            model.partial_fit(X.iloc[rows], y[rows], score=False)
+
+def _plain(value):
+    # mongoexport writes ObjectIds, dates and (in canonical mode) numbers as
+    # {"$oid": ...}, {"$date": ...}, {"$numberInt": ...}
+    while isinstance(value, dict) and len(value) == 1 and next(iter(value)).startswith('$'):
+        value = next(iter(value.values()))
+    return value
+
+def _parse_date(value):
+    value = _plain(value)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def parse_assessment(document):
+    """
+    Turn one stored assessment into model columns.
+
+    Args:
+        document (dict): MentalHealth document (camelCase fields) or a row
+            already keyed by model column names
+
+    Returns:
+        dict: Model columns plus the target scores, or None if a value is
+            missing or invalid
+    """
+    row = {}
+    for field, column in ASSESSMENT_FIELDS.items():
+        value = _plain(document.get(field, document.get(column)))
+        if column in CATEGORICAL_COLS:
+            if not isinstance(value, str) or not value.strip():
+                return None
+            row[column] = value.strip().lower()
+        else:
+            try:
+                row[column] = float(value)
+            except (TypeError, ValueError):
+                return None
+            if not np.isfinite(row[column]):
+                return None
+    return row
+
+def read_assessments(paths, watermark, chunk_size=500):
+    """
+    Stream new assessments from JSONL exports in chunks.
+
+    Records at or before the watermark are skipped (those with the
+    watermark timestamp only if their id was already learnt from); records
+    without createdAt are always used.
+
+    Args:
+        paths (list): JSONL files, one MentalHealth document per line
+        watermark (dict): OnlineModel.watermark
+        chunk_size (int): Records per chunk
+
+    Yields:
+        tuple: (X, y, keys) where keys lists the (createdAt, id) of each record
+    """
+    since = _parse_date(watermark["created_at"]) if watermark["created_at"] else None
+    learnt = set(watermark["ids"])
+    rows, keys = [], []
+    skipped = 0
+
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                document = json.loads(line)
+                created_at = _parse_date(document['createdAt']) if 'createdAt' in document else None
+                record_id = str(_plain(document.get('_id', '')))
+                if since is not None and created_at is not None:
+                    if created_at < since or (created_at == since and record_id in learnt):
+                        continue
+                row = parse_assessment(document)
+                if row is None:
+                    skipped += 1
+                    continue
+                rows.append(row)
+                keys.append((created_at, record_id))
+                if len(rows) >= chunk_size:
+                    yield _chunk(rows, keys)
+                    rows, keys = [], []
+    if rows:
+        yield _chunk(rows, keys)
+    if skipped:
+        print(f"{skipped} invalid records skipped", file=sys.stderr)
+
+def _chunk(rows, keys):
+    frame = pd.DataFrame(rows)
+    return frame[SELECTED_FEATURES], risk_target(frame), keys
+
+def advance_watermark(watermark, keys):
+    """
+    Move the watermark past the records of a chunk.
+
+    Args:
+        watermark (dict): OnlineModel.watermark, updated in place
+        keys (list): (createdAt, id) of the records learnt from
+    """
+    dated = [(created_at, record_id) for created_at, record_id in keys if created_at is not None]
+    if not dated:
+        return
+    latest = max(created_at for created_at, _ in dated)
+    current = _parse_date(watermark["created_at"]) if watermark["created_at"] else None
+    ids = [record_id for created_at, record_id in dated if created_at == latest]
+    if current is None or latest > current:
+        watermark["created_at"], watermark["ids"] = latest.isoformat(), ids
+    elif latest == current:
+        watermark["ids"] = sorted(set(watermark["ids"]) | set(ids))
+
+def load_state(path=STATE_PATH):
+    """
+    Load the online model state.
+
+    Args:
+        path (Path): State pickle
+
+    Returns:
+        OnlineModel: Saved model, or None if there is none yet
+    """
+    import joblib
+
+    if not Path(path).exists():
+        return None
+    model = OnlineModel.__new__(OnlineModel)
+    model.__dict__.update(joblib.load(path))
+    return model
+
+def save_state(model, path=STATE_PATH):
+    """
+    Atomically replace the online model state.
+
+    The attributes are saved as a plain dict, so the state can be loaded
+    whether this file runs as a script or is imported.
+
+    Args:
+        model (OnlineModel): Model to save
+        path (Path): State pickle
+    """
+    import joblib
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    os.close(fd)
+    try:
+        joblib.dump(dict(vars(model)), tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def update(paths, state_path=STATE_PATH, artifacts_dir=ARTIFACTS_DIR, chunk_size=500, publish=True,
+           bootstrap_epochs=5):
+    """
+    Learn from new assessments and publish the updated model.
+
+    Nothing is published or saved when no new record was learnt from,
+    unless the model was just seeded with the survey.
+
+    Args:
+        paths (list): JSONL exports of the MentalHealth collection
+        state_path (Path): Online model state
+        artifacts_dir (Path): Directory holding the artifact versions
+        chunk_size (int): Records per partial_fit call
+        publish (bool): Publish a new artifact version
+        bootstrap_epochs (int): Passes over the survey when there is no state yet
+
+    Returns:
+        OnlineModel: Updated model
+    """
+    model = load_state(state_path)
+    seeded = model is None
+    if seeded:
+        model = OnlineModel()
+        bootstrap(model, chunk_size=chunk_size, epochs=bootstrap_epochs)
+        print(f"Online model seeded with the survey ({model.records_seen} rows over {bootstrap_epochs} epochs)")
+
+    before = model.records_seen
+    for X, y, keys in read_assessments(paths, model.watermark, chunk_size):
+        model.partial_fit(X, y)
+        advance_watermark(model.watermark, keys)
+    print(f"{model.records_seen - before} new records learnt from")
+    if model.records_seen == before and not seeded:
+        # Same weights as the served version: publishing would only add a copy
+        return model
+
+    if publish:
+        from model_artifact import write_artifact
+        version = write_artifact(model.compile(), artifacts_dir, {"training_metrics": model.metrics()})
+        print(f"Artifact {version} published in {artifacts_dir}")
+    save_state(model, state_path)
+    return model
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Incrementally update the mental health model")
+    parser.add_argument('command', choices=['update', 'status'])
+    parser.add_argument('paths', nargs='*', help="JSONL exports of the MentalHealth collection")
+    parser.add_argument('--state', default=str(STATE_PATH), help="Online model state")
+    parser.add_argument('--artifacts', default=str(ARTIFACTS_DIR), help="Artifact directory")
+    parser.add_argument('--chunk-size', type=int, default=500, help="Records per partial_fit call")
+    parser.add_argument('--bootstrap-epochs', type=int, default=5,
+                        help="Passes over the survey CSV when no state exists yet")
+    parser.add_argument('--no-publish', action='store_true', help="Only update the saved state")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    if args.command == 'status':
+        model = load_state(args.state)
+        if model is None:
+            print(f"No online model in {args.state}")
+            return 1
+        print(json.dumps(model.metrics(), indent=2))
+        return 0
+
+    update(args.paths, args.state, args.artifacts, args.chunk_size, not args.no_publish, args.bootstrap_epochs)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
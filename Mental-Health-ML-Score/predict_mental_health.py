@@ -6,16 +6,34 @@ Mental Health Prediction Script
 
 This script loads the trained mental health model and makes predictions
 based on input data received from Node.js.
+
+Usage:
+    python predict_mental_health.py                 # one-shot: one JSON request on stdin
+    python predict_mental_health.py --serve         # resident: newline-delimited JSON on stdin/stdout
+    python predict_mental_health.py --serve --socket /tmp/mental_health.sock
+    python predict_mental_health.py --serve --workers 4 --max-inflight 32
+    python predict_mental_health.py --serve --batch-window-ms 3 --max-batch-size 64
+    python predict_mental_health.py --serve --socket /tmp/mental_health.sock --metrics-port 9464
+    python predict_mental_health.py --batch < requests.jsonl > results.jsonl
+    python predict_mental_health.py --serve --rules  # distilled rule set (rule_distillation.py)
+    python predict_mental_health.py --self-check-startup
 """
 
 import sys
 import json
 import os
-import pandas as pd
-import numpy as np
-import joblib
+import time
+import argparse
 from pathlib import Path
 
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from inference_metrics import InferenceMetrics, RequestTimings, UNTIMED
+
+# pandas, numpy, joblib (and sklearn/imblearn when unpickling) are imported
+# inside the functions that need them, so that startup, invalid input and
+# the compiled-scorer path do not pay for them.
+
 # Get the directory of the current script
 SCRIPT_DIR = Path(__file__).parent.absolute()
 MODEL_DIR = SCRIPT_DIR / "model"
@@ -23,10 +41,163 @@ MODEL_DIR = SCRIPT_DIR / "model"
 # Paths to the saved model files
 MODEL_PATH = MODEL_DIR / "mental_health_model.pkl"
 PREPROCESSOR_PATH = MODEL_DIR / "preprocessor.pkl"
+ARTIFACTS_DIR = MODEL_DIR / "artifacts"
+RULES_PATH = MODEL_DIR / "rules.json"
+
+# Serve the distilled rule set when it matches the current model (--rules)
+SERVE_RULES = os.environ.get('MENTAL_HEALTH_RULES') == '1'
+# Minimum test fidelity of the rules to the model (--rules-min-fidelity);
+# None keeps rule_distillation.DEFAULT_MIN_FIDELITY
+RULES_MIN_FIDELITY = os.environ.get('MENTAL_HEALTH_RULES_MIN_FIDELITY')
+
+# Columns the model expects (same list as selected_features in the training scripts)
+SELECTED_FEATURES = [
+    'Counseling_Service_Use', 'Stress_Level', 'Substance_Use', 'Age', 'Course',
+    'Financial_Stress', 'Physical_Activity', 'Extracurricular_Involvement',
+    'Semester_Credit_Load', 'Family_History', 'Chronic_Illness'
+]
+
+# Numeric coercion applied by the Node controller (parseFloat / parseInt)
+FLOAT_FEATURES = ('Stress_Level', 'Financial_Stress')
+INT_FEATURES = ('Age', 'Semester_Credit_Load')
+
+# Sample request used by --self-check-startup
+SAMPLE_REQUEST = {
+    "input_data": {
+        'Counseling_Service_Use': 'never',
+        'Stress_Level': 4,
+        'Substance_Use': 'never',
+        'Age': 22,
+        'Course': 'computer science',
+        'Financial_Stress': 3,
+        'Physical_Activity': 'low',
+        'Extracurricular_Involvement': 'low',
+        'Semester_Credit_Load': 18,
+        'Family_History': 'no',
+        'Chronic_Illness': 'no',
+        'Anxiety_Score': 3,
+        'Depression_Score': 2
+    },
+    "favorite_activities": []
+}
+
+# Activities recommended when the user has not chosen any
+DEFAULT_ACTIVITIES = (
+    "Méditation et pleine conscience",
+    "Exercice physique régulier",
+    "Yoga ou étirements",
+    "Lecture",
+    "Écouter de la musique",
+    "Passer du temps dans la nature",
+    "Tenir un journal",
+    "Peinture ou dessin",
+    "Rejoindre un club social",
+    "Faire du bénévolat"
+)
+
+# Overall score (anxiety + stress + depression, 0-15) from which each risk
+# level gets its more urgent tier
+SCORE_THRESHOLDS = {'High': 10, 'Low': 6}
+
+# Recommendation tiers, indexed by 2 * (risk is High) + (score >= threshold):
+# (professional help, number of activities or None for all, daily practices)
+RECOMMENDATION_TIERS = (
+    # Low risk with low score
+    (None, None, (
+        "Continuer à maintenir un mode de vie équilibré",
+        "Pratiquer des activités qui vous apportent de la joie régulièrement"
+    )),
+    # Low risk with moderate score
+    ("Envisager de consulter un conseiller en bien-être.", 7, (
+        "Pratiquer une activité relaxante chaque jour",
+        "Maintenir un équilibre entre travail et loisirs"
+    )),
+    # High risk with moderate score
+    ("Consulter un psychologue pour une évaluation.", 5, (
+        "Pratiquer la pleine conscience pendant 10 minutes chaque jour",
+        "Faire de l'exercice physique modéré 3 fois par semaine",
+        "Maintenir des contacts sociaux réguliers"
+    )),
+    # High risk with high score
+    ("Consulter un psychiatre dès que possible.", 3, (
+        "Pratiquer des exercices de respiration profonde plusieurs fois par jour",
+        "Maintenir une routine de sommeil régulière",
+        "Limiter la consommation de caféine et d'alcool",
+        "Prendre des pauses régulières pendant les périodes de travail intense"
+    ))
+)
+
+# Response per (tier, risk level) with the default activities, copied for
+# each answer; the lists inside are shared
+_RESPONSE_TEMPLATES = {}
+
+def _response_template(tier, mental_health_risk):
+    key = (tier, mental_health_risk)
+    template = _RESPONSE_TEMPLATES.get(key)
+    if template is None:
+        professional_help, count, daily_practices = RECOMMENDATION_TIERS[tier]
+        template = _RESPONSE_TEMPLATES[key] = {
+            "risk_level": mental_health_risk,
+            "mental_health_score": None,
+            "professional_help": professional_help,
+            "activities": DEFAULT_ACTIVITIES[:count],
+            "daily_practices": daily_practices
+        }
+    return template
+
+def recommendation_tier(mental_health_risk, mental_health_score):
+    """
+    Index of the recommendation tier for a risk level and overall score.
+
+    Args:
+        mental_health_risk (str): Risk level ('High' or 'Low')
+        mental_health_score (float): Anxiety + stress + depression scores
+
+    Returns:
+        int: Index into RECOMMENDATION_TIERS
+    """
+    high = mental_health_risk == 'High'
+    threshold = SCORE_THRESHOLDS['High'] if high else SCORE_THRESHOLDS['Low']
+    return 2 * high + (mental_health_score >= threshold)
+
+def recommendation_tiers(risk_levels, mental_health_scores):
+    """
+    Vectorized recommendation_tier() over a batch.
+
+    Args:
+        risk_levels (array-like): Risk levels
+        mental_health_scores (array-like): Overall scores
+
+    Returns:
+        np.ndarray: Tier index per row
+
+    Raises:
+        TypeError, ValueError: If a score is not a number
+    """
+    import numpy as np
+
+    high = np.asarray(risk_levels, dtype=object) == 'High'
+    scores = np.asarray(mental_health_scores)
+    # Numeric strings would convert; generate_recommendations() rejects them
+    if scores.dtype.kind not in 'biuf':
+        raise TypeError("Scores must be numbers")
+    threshold = np.where(high, SCORE_THRESHOLDS['High'], SCORE_THRESHOLDS['Low'])
+    return 2 * high.astype(np.intp) + (scores >= threshold)
+
+def _tier_response(tier, mental_health_risk, mental_health_score, favorite_activities):
+    response = _response_template(tier, mental_health_risk).copy()
+    response["mental_health_score"] = mental_health_score
+    if favorite_activities:
+        count = RECOMMENDATION_TIERS[tier][1]
+        response["activities"] = favorite_activities[:count] if count is not None else favorite_activities
+    return response
 
 def generate_recommendations(mental_health_risk, anxiety_score, stress_level, depression_score, favorite_activities=None):
     """
     Generate personalized recommendations based on mental health risk level.
+
+    The activity and daily practice lists come from RECOMMENDATION_TIERS
+    and are shared (immutable tuples) between responses.
     
     Args:
         mental_health_risk (str): Risk level ('High' or 'Low')
@@ -40,115 +211,927 @@ def generate_recommendations(mental_health_risk, anxiety_score, stress_level, de
     """
     # Calculate overall mental health score (0-15)
     mental_health_score = anxiety_score + stress_level + depression_score
-    
-    # Define default activities if none are provided
-    default_activities = [
-        "Méditation et pleine conscience",
-        "Exercice physique régulier",
-        "Yoga ou étirements",
-        "Lecture",
-        "Écouter de la musique",
-        "Passer du temps dans la nature",
-        "Tenir un journal",
-        "Peinture ou dessin",
-        "Rejoindre un club social",
-        "Faire du bénévolat"
+    tier = recommendation_tier(mental_health_risk, mental_health_score)
+    return _tier_response(tier, mental_health_risk, mental_health_score, favorite_activities)
+
+def generate_recommendations_batch(risk_levels, inputs, favorite_activities_list):
+    """
+    generate_recommendations() for a batch, with one vectorized tier assignment.
+
+    Args:
+        risk_levels (list): Predicted risk levels
+        inputs (list): Input data dicts (scores are read from them)
+        favorite_activities_list (list): Favorite activities per row
+
+    Returns:
+        list: Recommendation dicts, in input order
+
+    Raises:
+        TypeError, ValueError: If a score is not a number
+    """
+    scores = [
+        input_data.get('Anxiety_Score', 0) + input_data.get('Stress_Level', 0) + input_data.get('Depression_Score', 0)
+        for input_data in inputs
     ]
-    
-    activities = favorite_activities if favorite_activities else default_activities
-    
-    # Initialize recommendations
-    recommendations = {
-        "risk_level": mental_health_risk,
-        "mental_health_score": mental_health_score,
-        "professional_help": None,
+    tiers = recommendation_tiers(risk_levels, scores).tolist()
+    return [
+        _tier_response(tier, risk_level, score, favorite_activities)
+        for tier, risk_level, score, favorite_activities in zip(tiers, risk_levels, scores, favorite_activities_list)
+    ]
+
+def load_model():
+    """
+    Load the trained model from disk.
+
+    With --rules (or MENTAL_HEALTH_RULES=1), the distilled rule set
+    (rule_distillation.py) comes first when it was distilled from the
+    current pickle and its fidelity to it reaches the floor
+    (RULES_MIN_FIDELITY). The published artifact (compiled NumPy scorer, see
+    model_artifact.py) is preferred when it was exported from the current
+    pickle; otherwise the sklearn pipeline is unpickled.
+
+    Returns:
+        RuleSet, CompiledScorer or Pipeline: Model exposing predict()
+    """
+    if SERVE_RULES:
+        try:
+            from rule_distillation import DEFAULT_MIN_FIDELITY, load_rules
+            min_fidelity = DEFAULT_MIN_FIDELITY if RULES_MIN_FIDELITY is None else float(RULES_MIN_FIDELITY)
+            rules = load_rules(RULES_PATH, MODEL_PATH, min_fidelity)
+        except Exception:
+            rules = None
+        if rules is not None:
+            return rules
+
+    try:
+        from model_artifact import load_current
+        scorer = load_current(ARTIFACTS_DIR, MODEL_PATH)
+    except Exception:
+        scorer = None
+    if scorer is not None:
+        return scorer
+
+    import joblib
+    return joblib.load(MODEL_PATH)
+
+# Model shared by every request of this process, reloaded when model/ changes
+MODEL_REGISTRY = ModelRegistry(load_model, [MODEL_PATH, ARTIFACTS_DIR / "CURRENT", RULES_PATH])
+
+def get_model():
+    """
+    Return the process-wide model, loading or reloading it if needed.
+
+    Returns:
+        RuleSet, CompiledScorer or Pipeline: Model exposing predict()
+    """
+    return MODEL_REGISTRY.get()
+
+def load_pipeline():
+    """
+    Unpickle the sklearn pipeline, for the inputs the served model rejects.
+
+    Returns:
+        tuple: (pipeline, SHA-256 of the pickle)
+    """
+    import joblib
+    from model_artifact import file_sha256
+    return joblib.load(MODEL_PATH), file_sha256(MODEL_PATH)
+
+# Pickle answering inputs the compiled scorer or the rule set reject, loaded on first use
+PIPELINE_REGISTRY = ModelRegistry(load_pipeline, [MODEL_PATH])
+
+def fallback_pipeline(model):
+    """
+    The sklearn pipeline the served compiled scorer or rule set was built from.
+
+    Args:
+        model (CompiledScorer or RuleSet): Served model
+
+    Returns:
+        Pipeline: The unpickled pipeline, or None when the pickle on disk is not
+            the model's source (e.g. the online model, which has no pickle)
+    """
+    spec = model.meta if type(model).__name__ == 'CompiledScorer' else model.spec
+    source = spec.get("source_sha256")
+    if source is None:
+        return None
+    try:
+        pipeline, digest = PIPELINE_REGISTRY.get()
+    except Exception:
+        return None
+    return pipeline if digest == source else None
+
+# Risk levels of recently seen feature vectors, dropped when the model changes
+PREDICTION_CACHE = PredictionCache()
+
+# Stage timings, outcomes and errors of the requests answered by this process
+METRICS = InferenceMetrics()
+
+def normalize_input(input_data):
+    """
+    Canonicalize model features the way the training data and the Node controller do.
+
+    Categorical values are stripped and lower-cased; numerical values are
+    coerced like parseFloat / parseInt. Values that cannot be coerced are
+    left untouched for the model to accept or reject.
+
+    Args:
+        input_data (dict): Input data for prediction
+
+    Returns:
+        dict: Copy of input_data with normalized model features
+    """
+    normalized = dict(input_data)
+    for feature in SELECTED_FEATURES:
+        value = normalized.get(feature)
+        try:
+            if feature in FLOAT_FEATURES:
+                normalized[feature] = float(value)
+            elif feature in INT_FEATURES:
+                normalized[feature] = int(float(value))
+            elif isinstance(value, str):
+                normalized[feature] = value.strip().lower()
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return normalized
+
+def cache_key(record):
+    """
+    Build the cache key of a normalized input.
+
+    Args:
+        record (dict): Output of normalize_input()
+
+    Returns:
+        tuple: Model feature values, or None if they cannot be hashed
+    """
+    key = tuple(record.get(feature) for feature in SELECTED_FEATURES)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def lookup_risk_levels(records, model=None, timings=None):
+    """
+    Predict risk levels, answering repeated feature vectors from the cache.
+
+    The cache is only used with the process-wide model, whose version
+    invalidates it; an explicitly passed model is always evaluated.
+
+    Args:
+        records (list): Normalized input dicts
+        model (Pipeline, optional): Model to use instead of the process-wide one
+        timings (RequestTimings, optional): Receives the stage durations
+
+    Returns:
+        list: Predicted risk levels, in input order
+    """
+    if timings is None:
+        timings = UNTIMED
+    if model is not None:
+        return list(predict_risk_levels(model, records, timings))
+
+    with timings.stage('model_load'):
+        model, version = MODEL_REGISTRY.get_versioned()
+    with timings.stage('cache_lookup'):
+        keys = [cache_key(record) for record in records]
+        levels = [PREDICTION_CACHE.get(key, version) if key is not None else None for key in keys]
+
+    missing = [i for i, level in enumerate(levels) if level is None]
+    if missing:
+        computed = predict_risk_levels(model, [records[i] for i in missing], timings)
+        for i, level in zip(missing, computed):
+            levels[i] = level
+            if keys[i] is not None:
+                PREDICTION_CACHE.put(keys[i], version, level)
+    return levels
+
+def predict_risk_levels(model, records, timings=None):
+    """
+    Predict the risk level of each input dict.
+
+    Args:
+        model (RuleSet, CompiledScorer or Pipeline): Model returned by load_model()
+        records (list): Input data dicts
+        timings (RequestTimings, optional): Receives the frame, preprocess and classifier stages
+
+    Returns:
+        np.ndarray: Predicted risk levels, in input order
+    """
+    if timings is None:
+        timings = UNTIMED
+
+    if type(model).__name__ in ('CompiledScorer', 'RuleSet'):
+        recorded_errors = len(timings.errors)
+        try:
+            return model.predict(records, timings)
+        except (ValueError, TypeError, KeyError):
+            # Inputs the compiled scorer (or rule set) rejects get the sklearn pipeline's own answer
+            # or error, from the pickle it was built from; without one, the input is rejected
+            with timings.stage('model_load'):
+                pipeline = fallback_pipeline(model)
+            if pipeline is None:
+                raise
+            del timings.errors[recorded_errors:]
+            model = pipeline
+
+    with timings.stage('frame'):
+        import pandas as pd
+        frame = pd.DataFrame(records)
+
+    steps = getattr(model, 'steps', None)
+    if not steps:
+        with timings.stage('classifier'):
+            return model.predict(frame)
+
+    # Same as Pipeline.predict, one step at a time
+    X = frame
+    with timings.stage('preprocess'):
+        for _, step in steps[:-1]:
+            # Samplers (SMOTE) only act while fitting
+            if step is None or step == 'passthrough' or hasattr(step, 'fit_resample'):
+                continue
+            X = step.transform(X)
+    with timings.stage('classifier'):
+        return steps[-1][1].predict(X)
+
+def error_result(message):
+    """
+    Build the response returned when a prediction cannot be made.
+
+    Args:
+        message (str): Error message
+
+    Returns:
+        dict: Error response with the same keys as a successful prediction
+    """
+    return {
+        "error": message,
+        "risk_level": "Unknown",
+        "mental_health_score": 0,
+        "professional_help": "Error occurred during prediction. Please try again.",
         "activities": [],
         "daily_practices": []
     }
-    
-    # Generate recommendations based on risk level
-    if mental_health_risk == 'High':
-        if mental_health_score >= 10:
-            # High risk with high score
-            recommendations["professional_help"] = "Consulter un psychiatre dès que possible."
-            recommendations["activities"] = activities[:3]  # Select first 3 activities
-            recommendations["daily_practices"] = [
-                "Pratiquer des exercices de respiration profonde plusieurs fois par jour",
-                "Maintenir une routine de sommeil régulière",
-                "Limiter la consommation de caféine et d'alcool",
-                "Prendre des pauses régulières pendant les périodes de travail intense"
-            ]
-        else:
-            # High risk with moderate score
-            recommendations["professional_help"] = "Consulter un psychologue pour une évaluation."
-            recommendations["activities"] = activities[:5]  # Select first 5 activities
-            recommendations["daily_practices"] = [
-                "Pratiquer la pleine conscience pendant 10 minutes chaque jour",
-                "Faire de l'exercice physique modéré 3 fois par semaine",
-                "Maintenir des contacts sociaux réguliers"
-            ]
-    else:  # Low risk
-        if mental_health_score >= 6:
-            # Low risk with moderate score
-            recommendations["professional_help"] = "Envisager de consulter un conseiller en bien-être."
-            recommendations["activities"] = activities[:7]  # Select first 7 activities
-            recommendations["daily_practices"] = [
-                "Pratiquer une activité relaxante chaque jour",
-                "Maintenir un équilibre entre travail et loisirs"
-            ]
-        else:
-            # Low risk with low score
-            recommendations["professional_help"] = None
-            recommendations["activities"] = activities
-            recommendations["daily_practices"] = [
-                "Continuer à maintenir un mode de vie équilibré",
-                "Pratiquer des activités qui vous apportent de la joie régulièrement"
-            ]
-    
-    return recommendations
 
-def predict(input_data, favorite_activities=None):
+def validate_input(input_data):
+    """
+    Check that a request has every model feature, without loading the model.
+
+    Args:
+        input_data (dict): Input data for prediction
+
+    Returns:
+        str: Error message, or None if the input can be scored
+    """
+    if not isinstance(input_data, dict):
+        return "input_data must be an object"
+    missing = {feature for feature in SELECTED_FEATURES if feature not in input_data}
+    if missing:
+        return f"columns are missing: {missing}"
+    return None
+
+def predict(input_data, favorite_activities=None, model=None, timings=None):
     """
     Make a prediction using the trained model.
     
     Args:
         input_data (dict): Input data for prediction
         favorite_activities (list, optional): User's favorite activities
+        model (Pipeline, optional): Model to use instead of the process-wide one
+        timings (RequestTimings, optional): Receives the duration of each stage
+            and the stage and type of the error, if any
         
     Returns:
         dict: Prediction result with recommendations
     """
+    if timings is None:
+        timings = UNTIMED
+
+    # Reject incomplete input before paying for the model and its imports
+    with timings.stage('validate'):
+        invalid = validate_input(input_data)
+        record = normalize_input(input_data) if not invalid else None
+    if invalid:
+        timings.error('validate', 'InvalidInput')
+        return error_result(invalid)
+
     try:
-        # Load the model and preprocessor
-        model = joblib.load(MODEL_PATH)
-        
-        # Convert input data to DataFrame
-        df = pd.DataFrame([input_data])
-        
-        # Make prediction
-        risk_level = model.predict(df)[0]
+        # Make prediction (process-wide model and cache unless the caller passes a model)
+        risk_level = lookup_risk_levels([record], model, timings)[0]
         
         # Generate recommendations
-        recommendations = generate_recommendations(
-            risk_level,
-            input_data.get('Anxiety_Score', 0),
-            input_data.get('Stress_Level', 0),
-            input_data.get('Depression_Score', 0),
-            favorite_activities
-        )
+        with timings.stage('recommend'):
+            recommendations = generate_recommendations(
+                risk_level,
+                input_data.get('Anxiety_Score', 0),
+                input_data.get('Stress_Level', 0),
+                input_data.get('Depression_Score', 0),
+                favorite_activities
+            )
         
         return recommendations
     except Exception as e:
-        return {
-            "error": str(e),
-            "risk_level": "Unknown",
-            "mental_health_score": 0,
-            "professional_help": "Error occurred during prediction. Please try again.",
-            "activities": [],
-            "daily_practices": []
-        }
+        return error_result(str(e))
+
+def predict_timed(input_data, favorite_activities=None):
+    """
+    Run predict() and return its timings with the result, for pool workers.
+
+    Args:
+        input_data (dict): Input data for prediction
+        favorite_activities (list, optional): User's favorite activities
+
+    Returns:
+        tuple: (result, RequestTimings)
+    """
+    timings = RequestTimings()
+    return predict(input_data, favorite_activities, timings=timings), timings
+
+def parse_request(line):
+    """
+    Parse one newline-delimited JSON request in server mode.
+
+    The request has the same shape as the one-shot stdin payload, plus an
+    optional "id" that is echoed back so callers can match responses, an
+    optional "command" for control requests and an optional
+    "include_timings" flag.
+
+    Args:
+        line (str): Raw JSON request
+
+    Returns:
+        tuple: (request_id, input_data, favorite_activities, command, include_timings)
+    """
+    data = json.loads(line)
+    return (data.get('id'), data.get('input_data', {}), data.get('favorite_activities', []), data.get('command'),
+            bool(data.get('include_timings')))
+
+def format_response(result, request_id):
+    """
+    Serialize a result for server mode, tagging it with the request id.
+
+    Args:
+        result (dict): Prediction or error result
+        request_id: Id sent by the caller, or None
+
+    Returns:
+        str: JSON response (without trailing newline)
+    """
+    if request_id is not None:
+        result["id"] = request_id
+    return json.dumps(result)
+
+def with_timings(response, timings, serialize_seconds, total_seconds=None, failed=False):
+    """
+    Append a "timings_ms" block to a serialized response.
+
+    The block is spliced into the already serialized object so that it can
+    report the serialization time itself. In micro-batches the stages are
+    those of the whole batch.
+
+    Args:
+        response (str): Output of format_response()
+        timings (RequestTimings): Stages of the prediction
+        serialize_seconds (float): Time format_response() took
+        total_seconds (float, optional): End-to-end time, defaults to the time since timings started
+        failed (bool): The response is an error; the stage that raised it is added as "error_stage"
+
+    Returns:
+        str: JSON response with the timing block
+    """
+    block = timings.as_dict(total_seconds, serialize=serialize_seconds)
+    if failed and timings.errors:
+        block["error_stage"] = timings.errors[-1][0]
+    return response[:-1] + ', "timings_ms": ' + json.dumps(block) + '}'
+
+def predict_batch(inputs, favorite_activities_list=None, model=None, timings=None):
+    """
+    Make predictions for many assessments with a single pass through the model.
+
+    The whole batch goes through one preprocessing pass and one
+    model.predict call. Rows missing a model feature, or a batch the model
+    rejects, fall back to predict() row by row so each row gets the same
+    result (or error) it would get on its own.
+
+    Args:
+        inputs (list): Input data dicts, one per assessment
+        favorite_activities_list (list, optional): Favorite activities per assessment
+        model (Pipeline, optional): Model to use instead of the process-wide one
+        timings (RequestTimings, optional): Receives the stage durations of the whole batch
+
+    Returns:
+        list: Prediction results with recommendations, in input order
+    """
+    if favorite_activities_list is None:
+        favorite_activities_list = [None] * len(inputs)
+    if timings is None:
+        timings = UNTIMED
+
+    try:
+        with timings.stage('model_load'):
+            served = model if model is not None else get_model()
+    except Exception as e:
+        return [error_result(str(e)) for _ in inputs]
+
+    recorded_errors = len(timings.errors)
+    results = [None] * len(inputs)
+
+    try:
+        with timings.stage('validate'):
+            required = getattr(served, 'feature_names_in_', [])
+            complete = [i for i, input_data in enumerate(inputs)
+                        if isinstance(input_data, dict) and all(f in input_data for f in required)]
+            records = [normalize_input(inputs[i]) for i in complete]
+
+        if complete:
+            risk_levels = lookup_risk_levels(records, model, timings)
+
+            with timings.stage('recommend'):
+                recommendations = generate_recommendations_batch(
+                    risk_levels,
+                    [inputs[i] for i in complete],
+                    [favorite_activities_list[i] for i in complete]
+                )
+            for i, recommendation in zip(complete, recommendations):
+                results[i] = recommendation
+    except Exception:
+        # Isolate the offending rows instead of failing the whole batch;
+        # their own errors are recorded by predict()
+        del timings.errors[recorded_errors:]
+        results = [None] * len(inputs)
+
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = predict(inputs[i], favorite_activities_list[i], model=model, timings=timings)
+
+    return results
+
+def predict_batch_timed(inputs, favorite_activities_list=None):
+    """
+    Run predict_batch() for the micro-batcher and record the batch in METRICS.
+
+    Args:
+        inputs (list): Input data dicts
+        favorite_activities_list (list, optional): Favorite activities per assessment
+
+    Returns:
+        list: (result, RequestTimings) per input, all sharing the batch timings
+    """
+    timings = RequestTimings()
+    results = predict_batch(inputs, favorite_activities_list, timings=timings)
+    METRICS.record(timings)
+    return [(result, timings) for result in results]
+
+def run_batch(input_stream, output_stream, batch_size):
+    """
+    Score newline-delimited JSON requests in batches.
+
+    Each line has the same shape as a server request; results are written
+    one per line, in input order, tagged with the request id if given.
+
+    Args:
+        input_stream (file): Source of JSON lines
+        output_stream (file): Destination for JSON lines
+        batch_size (int): Number of requests scored per model call
+    """
+    def flush(batch):
+        parsed = [request for request in batch if not isinstance(request, Exception)]
+        results = iter(predict_batch(
+            [request[1] for request in parsed],
+            [request[2] for request in parsed]
+        ))
+        for request in batch:
+            if isinstance(request, Exception):
+                output_stream.write(format_response(error_result(str(request)), None) + "\n")
+            else:
+                output_stream.write(format_response(next(results), request[0]) + "\n")
+        output_stream.flush()
+
+    batch = []
+    for line in input_stream:
+        if not line.strip():
+            continue
+        try:
+            batch.append(parse_request(line))
+        except Exception as e:
+            batch.append(e)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+def metrics_text(batcher=None):
+    """
+    Render the server metrics in the Prometheus text format.
+
+    Stage histograms and counters come from METRICS; model registry,
+    prediction cache and micro-batching counters are added as plain samples.
+    With --workers, model loads and cache lookups happen in the workers and
+    are not included.
+
+    Args:
+        batcher (MicroBatcher, optional): Micro-batching scheduler
+
+    Returns:
+        str: Exposition text
+    """
+    model = MODEL_REGISTRY.stats()
+    cache = PREDICTION_CACHE.stats()
+    extra = [
+        ("mental_health_model_load_seconds", "gauge", "Duration of the last model load.", model["load_seconds"]),
+        ("mental_health_model_reloads_total", "counter", "Model reloads after a retrain.", model["reloads"]),
+        ("mental_health_model_failed_reloads_total", "counter", "Model reloads that failed.",
+         model["failed_reloads"]),
+        ("mental_health_prediction_cache_hits_total", "counter", "Prediction cache hits.", cache["hits"]),
+        ("mental_health_prediction_cache_misses_total", "counter", "Prediction cache misses.", cache["misses"]),
+        ("mental_health_prediction_cache_entries", "gauge", "Feature vectors in the prediction cache.", cache["size"])
+    ]
+    if batcher is not None:
+        batching = batcher.stats()
+        extra += [
+            ("mental_health_micro_batches_total", "counter", "Micro-batches scored.", batching["batches"]),
+            ("mental_health_micro_batched_requests_total", "counter", "Requests scored in micro-batches.",
+             batching["requests"])
+        ]
+    return METRICS.render(extra)
+
+def make_dispatcher(pool=None, batcher=None, include_timings=False):
+    """
+    Build the function that answers server requests.
+
+    Without a pool or batcher, requests are predicted in the calling thread.
+    With a batcher, they are coalesced with other requests arriving in the
+    same window. With a pool, they are handed to a worker and answered when
+    it finishes, or rejected right away with "busy": true when the pool is
+    saturated.
+
+    A request {"command": "stats"} returns the server statistics instead of
+    a prediction, and {"command": "metrics"} the Prometheus text of
+    metrics_text(). Every answered request is recorded in METRICS; requests
+    with "include_timings": true (or all of them with include_timings) get a
+    "timings_ms" block.
+
+    Args:
+        pool (InferencePool, optional): Pre-forked workers running predict_timed()
+        batcher (MicroBatcher, optional): Micro-batching scheduler running predict_batch_timed()
+        include_timings (bool): Add the timing block to every response
+
+    Returns:
+        callable: dispatch(line, respond) where respond(str) sends one response line
+    """
+    def stats():
+        # Pool workers reload on their own; refresh this process's view too
+        get_model()
+        summary = {"model": MODEL_REGISTRY.stats(), "cache": PREDICTION_CACHE.stats(), "inference": METRICS.stats()}
+        if pool is not None:
+            summary["pool"] = {"size": pool.size, "max_inflight": pool.max_inflight}
+        if batcher is not None:
+            summary["micro_batching"] = batcher.stats()
+        return summary
+
+    def answer(respond, result, request_id, received, outcome, timings=None, timed=False):
+        started = time.perf_counter()
+        response = format_response(result, request_id)
+        finished = time.perf_counter()
+        METRICS.observe('serialize', finished - started)
+        METRICS.observe_request(finished - received, outcome)
+        if timed and timings is not None:
+            response = with_timings(response, timings, finished - started, finished - received, outcome == 'error')
+        respond(response)
+
+    def dispatch(line, respond):
+        received = time.perf_counter()
+        try:
+            request_id, input_data, favorite_activities, command, timed = parse_request(line)
+        except Exception as e:
+            answer(respond, error_result(str(e)), None, received, 'error')
+            return
+
+        if command == 'stats':
+            respond(format_response({"stats": stats()}, request_id))
+            return
+        if command == 'metrics':
+            respond(format_response({"metrics": metrics_text(batcher)}, request_id))
+            return
+
+        timed = timed or include_timings
+
+        def on_result(outcome):
+            result, timings = outcome
+            answer(respond, result, request_id, received, 'error' if 'error' in result else 'ok', timings, timed)
+
+        def on_error(error):
+            answer(respond, error_result(str(error)), request_id, received, 'error')
+
+        if batcher is not None:
+            batcher.submit(input_data, favorite_activities, on_result, on_error)
+            return
+
+        if pool is None:
+            outcome = predict_timed(input_data, favorite_activities)
+            METRICS.record(outcome[1])
+            on_result(outcome)
+            return
+
+        def on_worker_result(outcome):
+            # Timings measured in the worker are aggregated here
+            METRICS.record(outcome[1])
+            on_result(outcome)
+
+        if not pool.submit(input_data, favorite_activities, on_worker_result, on_error):
+            busy = error_result("Inference pool saturated. Please retry later.")
+            busy["busy"] = True
+            answer(respond, busy, request_id, received, 'busy')
+
+    return dispatch
+
+def serve_metrics(port, render, host='127.0.0.1'):
+    """
+    Expose GET /metrics over HTTP from a background thread, for Prometheus to scrape.
+
+    Args:
+        port (int): TCP port
+        render (callable): Returns the exposition text
+        host (str): Address to bind
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # stdout/stderr belong to the prediction protocol
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def serve_stdio(dispatch):
+    """
+    Serve predictions over stdin/stdout, one JSON document per line.
+
+    Args:
+        dispatch (callable): Request handler from make_dispatcher()
+    """
+    import threading
+
+    write_lock = threading.Lock()
+
+    def respond(response):
+        with write_lock:
+            sys.stdout.write(response + "\n")
+            sys.stdout.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        dispatch(line, respond)
+
+def serve_unix_socket(socket_path, dispatch):
+    """
+    Serve predictions over a local Unix socket, one JSON document per line.
+
+    Each connection may send any number of requests; each is answered on
+    the same connection, possibly out of order when a pool is used.
+
+    Args:
+        socket_path (str): Filesystem path of the socket to create
+        dispatch (callable): Request handler from make_dispatcher()
+    """
+    import signal
+    import socketserver
+    import threading
+
+    class PredictionHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            write_lock = threading.Lock()
+            answered = threading.Condition()
+            pending = [0]
+
+            def respond(response):
+                try:
+                    with write_lock:
+                        self.wfile.write((response + "\n").encode('utf-8'))
+                        self.wfile.flush()
+                finally:
+                    # A failed write (client gone) still counts as answered
+                    with answered:
+                        pending[0] -= 1
+                        answered.notify_all()
+
+            for raw in self.rfile:
+                line = raw.decode('utf-8')
+                if not line.strip():
+                    continue
+                with answered:
+                    pending[0] += 1
+                dispatch(line, respond)
+
+            # Keep the connection open until every request has been answered
+            with answered:
+                answered.wait_for(lambda: pending[0] == 0)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    # Make SIGTERM unwind normally so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    with socketserver.ThreadingUnixStreamServer(socket_path, PredictionHandler) as server:
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+def startup_report(runs=3, top=15):
+    """
+    Measure how long the one-shot CLI takes to answer, and where startup goes.
+
+    The script is run as Node.js runs it (a fresh interpreter per request)
+    with a valid sample request and with invalid JSON. The slowest run is
+    repeated under python -X importtime to break import cost down by module.
+
+    Args:
+        runs (int): Number of runs per case; the median is reported
+        top (int): Number of modules listed in the import breakdown
+
+    Returns:
+        dict: Timings in milliseconds
+    """
+    import subprocess
+    import statistics
+
+    def time_run(payload, extra_args=()):
+        durations = []
+        completed = None
+        for _ in range(runs):
+            started = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, *extra_args, str(Path(__file__).absolute())],
+                input=payload, capture_output=True, text=True
+            )
+            durations.append((time.perf_counter() - started) * 1000.0)
+        return statistics.median(durations), completed
+
+    sample = json.dumps(SAMPLE_REQUEST)
+    prediction_ms, _ = time_run(sample)
+    invalid_ms, _ = time_run("not json")
+    incomplete_ms, _ = time_run(json.dumps({"input_data": {}}))
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    _, traced = time_run(sample, ('-X', 'importtime'))
+    imports = []
+    for line in traced.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if name.startswith(' ') and not name.startswith('  '):
+            imports.append({
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000.0,
+                "cumulative_ms": int(cumulative_us) / 1000.0
+            })
+    imports.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+
+    return {
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "time_to_first_byte_ms": {
+            "prediction": round(prediction_ms, 1),
+            "invalid_json": round(invalid_ms, 1),
+            "missing_features": round(incomplete_ms, 1)
+        },
+        "compiled_scorer": (ARTIFACTS_DIR / "CURRENT").exists(),
+        "top_level_imports": imports[:top]
+    }
+
+def parse_args(argv=None):
+    """
+    Parse command line options.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+
+    Returns:
+        argparse.Namespace: Parsed options
+    """
+    parser = argparse.ArgumentParser(description="Mental health risk prediction")
+    parser.add_argument('--serve', action='store_true',
+                        help="Keep the model loaded and answer newline-delimited JSON requests")
+    parser.add_argument('--socket', metavar='PATH',
+                        help="With --serve, listen on this Unix socket instead of stdin/stdout")
+    parser.add_argument('--batch', action='store_true',
+                        help="Score newline-delimited JSON requests from stdin in batches")
+    parser.add_argument('--batch-size', type=int, default=1024, metavar='N',
+                        help="With --batch, number of requests scored per model call (default: 1024)")
+    parser.add_argument('--reload-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="With --serve, how often to check model/ for a retrained model (default: 1)")
+    parser.add_argument('--cache-size', type=int, default=10000, metavar='N',
+                        help="Remember the risk level of the last N distinct feature vectors (0 disables, default: 10000)")
+    parser.add_argument('--cache-ttl', type=float, metavar='SECONDS',
+                        help="Forget cached risk levels after SECONDS (default: until evicted or the model changes)")
+    parser.add_argument('--self-check-startup', action='store_true',
+                        help="Time the one-shot CLI and report its slowest imports")
+    parser.add_argument('--workers', type=int, default=0, metavar='N',
+                        help="With --serve, pre-fork N worker processes (default: predict in-process)")
+    parser.add_argument('--batch-window-ms', type=float, metavar='MS',
+                        help="With --serve, coalesce requests arriving within MS milliseconds into one batch")
+    parser.add_argument('--max-batch-size', type=int, default=64, metavar='N',
+                        help="With --batch-window-ms, score a batch as soon as it has N requests (default: 64)")
+    parser.add_argument('--max-inflight', type=int, metavar='N',
+                        help="With --workers, reject requests beyond N in flight (default: 4 per worker)")
+    parser.add_argument('--include-timings', action='store_true',
+                        help="Add a \"timings_ms\" block with the duration of each stage to every response")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="With --serve, expose Prometheus metrics on http://HOST:PORT/metrics")
+    parser.add_argument('--metrics-host', default='127.0.0.1', metavar='HOST',
+                        help="With --metrics-port, address to bind (default: 127.0.0.1)")
+    parser.add_argument('--rules', action='store_true',
+                        help="Predict with the distilled rule set (model/rules.json) when it matches the "
+                             "current model (also MENTAL_HEALTH_RULES=1)")
+    parser.add_argument('--rules-min-fidelity', type=float, metavar='F',
+                        help="With --rules, refuse rule sets agreeing with the model on less than this "
+                             "fraction of the test split (also MENTAL_HEALTH_RULES_MIN_FIDELITY, default 0.95)")
+    args = parser.parse_args(argv)
+    if args.batch_window_ms is not None and args.workers:
+        parser.error("--batch-window-ms cannot be combined with --workers")
+    if args.metrics_port is not None and not args.serve:
+        parser.error("--metrics-port requires --serve")
+    return args
+
+def main(argv=None):
+    """
+    Entry point: one-shot prediction from stdin, batch scoring, or resident server mode.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    global SERVE_RULES, RULES_MIN_FIDELITY
+    args = parse_args(argv)
+
+    SERVE_RULES = SERVE_RULES or args.rules
+    if args.rules_min_fidelity is not None:
+        RULES_MIN_FIDELITY = args.rules_min_fidelity
+    PREDICTION_CACHE.maxsize = args.cache_size
+    PREDICTION_CACHE.ttl = args.cache_ttl
+
+    if args.batch:
+        run_batch(sys.stdin, sys.stdout, args.batch_size)
+        return
+
+    if args.self_check_startup:
+        print(json.dumps(startup_report(), indent=2))
+        return
+
+    if args.serve:
+        from inference_pool import InferencePool
+        from micro_batcher import MicroBatcher
+
+        # Load before forking so workers start with the model in shared pages
+        MODEL_REGISTRY.check_interval = args.reload_interval
+        PIPELINE_REGISTRY.check_interval = args.reload_interval
+        get_model()
+        pool = InferencePool(predict_timed, args.workers, args.max_inflight) if args.workers else None
+        batcher = None
+        if args.batch_window_ms is not None:
+            batcher = MicroBatcher(predict_batch_timed, args.batch_window_ms, args.max_batch_size)
+        dispatch = make_dispatcher(pool, batcher, args.include_timings)
+        metrics_server = None
+        if args.metrics_port is not None:
+            metrics_server = serve_metrics(args.metrics_port, lambda: metrics_text(batcher), args.metrics_host)
+        try:
+            if args.socket:
+                serve_unix_socket(args.socket, dispatch)
+            else:
+                serve_stdio(dispatch)
+        finally:
+            if metrics_server is not None:
+                metrics_server.shutdown()
+            if batcher is not None:
+                batcher.close()
+            if pool is not None:
+                pool.close()
+        return
 
-if __name__ == "__main__":
     # Read input from stdin
     input_json = sys.stdin.read()
     
@@ -159,18 +1142,18 @@ if __name__ == "__main__":
         favorite_activities = data.get('favorite_activities', [])
         
         # Make prediction
-        result = predict(input_data, favorite_activities)
+        timings = RequestTimings()
+        result = predict(input_data, favorite_activities, timings=timings)
         
         # Output result as JSON
-        print(json.dumps(result))
+        started = time.perf_counter()
+        response = json.dumps(result)
+        if args.include_timings or data.get('include_timings'):
+            response = with_timings(response, timings, time.perf_counter() - started, failed='error' in result)
+        print(response)
     except Exception as e:
         # Handle errors
-        error_result = {
-            "error": str(e),
-            "risk_level": "Unknown",
-            "mental_health_score": 0,
-            "professional_help": "Error occurred during prediction. Please try again.",
-            "activities": [],
-            "daily_practices": []
-        }
-        print(json.dumps(error_result))
+        print(json.dumps(error_result(str(e))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Prediction Memoization Cache
+
+The model only sees 11 features, mostly low-cardinality categoricals and
+0-5 scores, so many students submit exactly the same feature vector. This
+bounded LRU cache (with an optional time-to-live) remembers the predicted
+risk level per canonical feature tuple.
+
+Entries are tied to the model version they were computed with: when the
+served model changes, the whole cache is dropped.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class PredictionCache:
+    """
+    Thread-safe LRU/TTL cache of risk levels keyed by feature tuple.
+
+    Args:
+        maxsize (int): Maximum number of entries (0 disables the cache)
+        ttl (float, optional): Seconds an entry stays valid; None keeps entries until evicted
+    """
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """
+        Look up a cached risk level.
+
+        Args:
+            key (tuple): Canonical feature tuple
+            version: Version of the model that would answer the request
+
+        Returns:
+            object: Cached risk level, or None on a miss
+        """
+        if not self.maxsize:
+            return None
+
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, version, value):
+        """
+        Remember a risk level computed with a given model version.
+
+        Args:
+            key (tuple): Canonical feature tuple
+            version: Version of the model that computed the value
+            value (object): Risk level
+        """
+        if not self.maxsize:
+            return
+
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every entry (counters are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Describe cache usage since startup.
+
+        Returns:
+            dict: Size, hit rate and eviction/expiration/invalidation counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
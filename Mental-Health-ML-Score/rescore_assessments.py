@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Bulk Re-scoring of Stored Assessments
+
+When a new model is published, the MentalHealth documents keep the
+riskLevel and recommendations computed by the model of their time. This
+job re-scores a JSON-lines export of the collection with the current model
+and writes the new results as update files:
+
+- the export is cut into parts of --batch-size lines; the parent only
+  scans for line boundaries and hands (file, byte range) to the workers,
+- the workers are forked after the model is loaded (like the server pool)
+  and score each part with one predict_batch() call,
+- every part is written atomically as part-NNNNN.jsonl, one
+  {"_id", riskLevel, mentalHealthScore, professionalHelp,
+  recommendedActivities, dailyPractices, updatedAt} document per line
+  (only for documents whose results changed, unless --all); documents that
+  cannot be scored go to part-NNNNN.errors.jsonl,
+- checkpoint.json records the parts already written, the input files and
+  the model version. Running the same command again resumes after the last
+  finished part; a changed input or model is refused unless --restart.
+
+The documents are mapped to model inputs like submitAssessment does
+(parseFloat / parseInt, lower-cased categories). Favorite activities are
+read from a "favoriteActivities" field when the export has one (e.g. an
+aggregation joined with users), or from a users export given with --users.
+
+Usage:
+    mongoexport --collection mentalhealths --out assessments.jsonl
+    python rescore_assessments.py assessments.jsonl --out rescore/ [--workers 4] [--users users.jsonl]
+    mongoimport --collection mentalhealths --mode merge --file rescore/part-00000.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+CHECKPOINT_FILE = "checkpoint.json"
+DEFAULT_BATCH_SIZE = 5000
+
+# MentalHealth document fields -> (model column, coercion applied by submitAssessment)
+ASSESSMENT_INPUTS = {
+    'counselingServiceUse': ('Counseling_Service_Use', 'str'),
+    'stressLevel': ('Stress_Level', 'float'),
+    'substanceUse': ('Substance_Use', 'str'),
+    'age': ('Age', 'int'),
+    'course': ('Course', 'lower'),
+    'financialStress': ('Financial_Stress', 'float'),
+    'physicalActivity': ('Physical_Activity', 'lower'),
+    'extracurricularInvolvement': ('Extracurricular_Involvement', 'lower'),
+    'semesterCreditLoad': ('Semester_Credit_Load', 'int'),
+    'familyHistory': ('Family_History', 'lower'),
+    'chronicIllness': ('Chronic_Illness', 'lower'),
+    'anxietyScore': ('Anxiety_Score', 'float'),
+    'depressionScore': ('Depression_Score', 'float')
+}
+
+# Prediction result keys -> MentalHealth document fields
+RESULT_FIELDS = {
+    'risk_level': 'riskLevel',
+    'mental_health_score': 'mentalHealthScore',
+    'professional_help': 'professionalHelp',
+    'activities': 'recommendedActivities',
+    'daily_practices': 'dailyPractices'
+}
+
+# State inherited by the forked workers (set in the parent before forking)
+_worker_state = {}
+
+def _plain(value):
+    # mongoexport writes ObjectIds, dates and (in canonical mode) numbers as
+    # {"$oid": ...}, {"$date": ...}, {"$numberInt": ...}
+    while isinstance(value, dict) and len(value) == 1 and next(iter(value)).startswith('$'):
+        value = next(iter(value.values()))
+    return value
+
+def _js_number(value):
+    # parseFloat, then JSON.stringify: integral numbers reach Python as int
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+def _coerce(value, kind):
+    value = _plain(value)
+    try:
+        if kind == 'float':
+            return _js_number(value)
+        if kind == 'int':
+            return int(float(value))
+        if kind == 'lower':
+            return value.lower()
+    except (TypeError, ValueError, AttributeError, OverflowError):
+        pass
+    return value
+
+def assessment_input(document):
+    """
+    Build the model input of a stored assessment like submitAssessment does.
+
+    Args:
+        document (dict): MentalHealth document (camelCase fields)
+
+    Returns:
+        dict: input_data for predict_batch(); missing fields stay missing
+    """
+    input_data = {}
+    for field, (column, kind) in ASSESSMENT_INPUTS.items():
+        if field in document:
+            input_data[column] = _coerce(document[field], kind)
+    return input_data
+
+def update_document(document, result, updated_at):
+    """
+    Build the update of one document from its new prediction.
+
+    Args:
+        document (dict): MentalHealth document as exported
+        result (dict): predict_batch() result
+        updated_at (str): ISO timestamp of the run
+
+    Returns:
+        dict: Extended JSON document for mongoimport --mode merge
+    """
+    update = {"_id": document.get('_id')}
+    for key, field in RESULT_FIELDS.items():
+        value = result[key]
+        update[field] = list(value) if isinstance(value, tuple) else value
+    update["updatedAt"] = {"$date": updated_at}
+    return update
+
+def is_unchanged(document, update):
+    """
+    Tell whether a document already holds the results of an update.
+
+    Args:
+        document (dict): MentalHealth document as exported
+        update (dict): Output of update_document()
+
+    Returns:
+        bool: True if every result field is equal
+    """
+    for field in RESULT_FIELDS.values():
+        stored, value = _plain(document.get(field)), update[field]
+        if field == 'mentalHealthScore':
+            try:
+                if float(stored) != float(value):
+                    return False
+            except (TypeError, ValueError):
+                return False
+        elif isinstance(value, list):
+            if not isinstance(stored, list) or [_plain(item) for item in stored] != value:
+                return False
+        elif stored != value:
+            return False
+    return True
+
+def load_favorite_activities(paths):
+    """
+    Read the favorite activities of every user from users exports.
+
+    Args:
+        paths (list): JSONL exports of the users collection
+
+    Returns:
+        dict: User id (string) -> list of favorite activities
+    """
+    favorites = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                user = json.loads(line)
+                activities = user.get('favoriteActivities')
+                if activities:
+                    favorites[str(_plain(user.get('_id')))] = [_plain(activity) for activity in activities]
+    return favorites
+
+def scan_parts(paths, batch_size, start=None):
+    """
+    Cut the exports into parts of batch_size non-empty lines, without parsing them.
+
+    Parts never span two files.
+
+    Args:
+        paths (list): JSONL exports
+        batch_size (int): Lines per part
+        start (dict, optional): {"file", "offset", "part"} to resume from
+
+    Yields:
+        dict: {"part", "file", "path", "start", "end"} with byte offsets
+    """
+    start = start or {"file": 0, "offset": 0, "part": 0}
+    part = start["part"]
+    for file_index in range(start["file"], len(paths)):
+        path = str(paths[file_index])
+        with open(path, 'rb') as f:
+            offset = start["offset"] if file_index == start["file"] else 0
+            f.seek(offset)
+            part_start, lines = offset, 0
+            for raw in f:
+                offset += len(raw)
+                if raw.strip():
+                    lines += 1
+                if lines >= batch_size:
+                    yield {"part": part, "file": file_index, "path": path, "start": part_start, "end": offset}
+                    part += 1
+                    part_start, lines = offset, 0
+            if lines:
+                yield {"part": part, "file": file_index, "path": path, "start": part_start, "end": offset}
+                part += 1
+
+def part_path(out_dir, part, suffix=".jsonl"):
+    """
+    Path of the update file of a part.
+
+    Args:
+        out_dir (Path): Output directory
+        part (int): Part number
+        suffix (str): ".jsonl" or ".errors.jsonl"
+
+    Returns:
+        Path: File path
+    """
+    return Path(out_dir) / f"part-{part:05d}{suffix}"
+
+def _write_lines(path, documents):
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for document in documents:
+                f.write(json.dumps(document, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def score_part(task):
+    """
+    Re-score one part of an export and write its update file.
+
+    Runs in a worker; the model, favorites and options come from _worker_state.
+
+    Args:
+        task (dict): Part from scan_parts()
+
+    Returns:
+        dict: Part number and its counters
+    """
+    from predict_mental_health import predict_batch
+
+    state = _worker_state
+    with open(task["path"], 'rb') as f:
+        f.seek(task["start"])
+        lines = f.read(task["end"] - task["start"]).decode('utf-8').splitlines()
+
+    documents, errors = [], []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            document = json.loads(line)
+        except ValueError as e:
+            errors.append({"_id": None, "error": f"invalid JSON: {e}"})
+            continue
+        documents.append(document)
+
+    inputs = [assessment_input(document) for document in documents]
+    favorites = []
+    for document in documents:
+        activities = document.get('favoriteActivities')
+        if activities is None:
+            activities = state["favorites"].get(str(_plain(document.get('userId'))))
+        favorites.append([_plain(activity) for activity in activities] if activities else [])
+    results = predict_batch(inputs, favorites, model=state["model"])
+
+    updates = []
+    counters = {"records": len(documents) + len(errors), "updated": 0, "unchanged": 0, "risk_changed": 0,
+                "errors": len(errors)}
+    for document, result in zip(documents, results):
+        if "error" in result:
+            errors.append({"_id": document.get('_id'), "error": result["error"]})
+            counters["errors"] += 1
+            continue
+        update = update_document(document, result, state["updated_at"])
+        if is_unchanged(document, update):
+            counters["unchanged"] += 1
+            if not state["all"]:
+                continue
+        else:
+            counters["updated"] += 1
+            if _plain(document.get('riskLevel')) != update["riskLevel"]:
+                counters["risk_changed"] += 1
+        updates.append(update)
+
+    out_dir = Path(state["out_dir"])
+    _write_lines(part_path(out_dir, task["part"]), updates)
+    if errors:
+        _write_lines(part_path(out_dir, task["part"], ".errors.jsonl"), errors)
+    return {"part": task["part"], "counters": counters}
+
+def _fingerprint(paths):
+    inputs = []
+    for path in paths:
+        stat = os.stat(path)
+        inputs.append({"path": str(Path(path).absolute()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+    return inputs
+
+def load_checkpoint(out_dir):
+    """
+    Read the checkpoint of an output directory.
+
+    Args:
+        out_dir (Path): Output directory
+
+    Returns:
+        dict: Checkpoint, or None if there is none
+    """
+    path = Path(out_dir) / CHECKPOINT_FILE
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_checkpoint(out_dir, checkpoint):
+    """
+    Atomically replace the checkpoint of an output directory.
+
+    Args:
+        out_dir (Path): Output directory
+        checkpoint (dict): Checkpoint to write
+    """
+    path = Path(out_dir) / CHECKPOINT_FILE
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{CHECKPOINT_FILE}.", dir=out_dir)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def clear_output(out_dir):
+    """
+    Delete the part files and checkpoint of a previous run.
+
+    Args:
+        out_dir (Path): Output directory
+    """
+    for path in Path(out_dir).glob("part-*.jsonl"):
+        path.unlink()
+    (Path(out_dir) / CHECKPOINT_FILE).unlink(missing_ok=True)
+
+def rescore(paths, out_dir, workers=1, batch_size=DEFAULT_BATCH_SIZE, users=(), write_all=False, restart=False):
+    """
+    Re-score assessment exports with the current model, resuming a previous run if possible.
+
+    Args:
+        paths (list): JSONL exports of the MentalHealth collection
+        out_dir (Path): Directory receiving the update files and the checkpoint
+        workers (int): Worker processes (1 scores in this process)
+        batch_size (int): Documents per part (one predict_batch() call each)
+        users (list): JSONL exports of the users collection, for favorite activities
+        write_all (bool): Write an update for every document, changed or not
+        restart (bool): Discard the previous run in out_dir
+
+    Returns:
+        dict: Final checkpoint, with the run totals
+
+    Raises:
+        ValueError: If out_dir holds a run on other inputs, options or model version
+    """
+    from predict_mental_health import MODEL_REGISTRY, get_model
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if restart:
+        clear_output(out_dir)
+
+    # Load before forking so workers start with the model in shared pages; the
+    # same model object scores the whole run even if model/ changes meanwhile
+    model = get_model()
+    options = {
+        "inputs": _fingerprint(paths),
+        "model_version": MODEL_REGISTRY.version,
+        "batch_size": batch_size,
+        "all": write_all
+    }
+
+    checkpoint = load_checkpoint(out_dir)
+    if checkpoint is not None:
+        mismatched = [key for key, value in options.items() if checkpoint.get(key) != value]
+        if mismatched:
+            raise ValueError(f"{out_dir} holds a run with different {', '.join(mismatched)}; "
+                             f"use --restart to discard it")
+        if checkpoint["finished"]:
+            return checkpoint
+        print(f"Resuming at part {checkpoint['next']['part']} ({len(checkpoint['done'])} later parts already written)")
+    else:
+        checkpoint = dict(options, started_at=datetime.now(timezone.utc).isoformat(), finished=False,
+                          next={"file": 0, "offset": 0, "part": 0}, done=[],
+                          totals={"records": 0, "updated": 0, "unchanged": 0, "risk_changed": 0, "errors": 0})
+        save_checkpoint(out_dir, checkpoint)
+
+    _worker_state.update(model=model, favorites=load_favorite_activities(users), all=write_all,
+                         out_dir=str(out_dir), updated_at=checkpoint["started_at"])
+
+    done = set(checkpoint["done"])
+    # Where each part ends, to move checkpoint["next"] past contiguous finished parts
+    ends = {}
+
+    def pending():
+        for task in scan_parts(paths, batch_size, checkpoint["next"]):
+            ends[task["part"]] = {"file": task["file"], "offset": task["end"], "part": task["part"] + 1}
+            if task["part"] not in done:
+                yield task
+
+    def finish(outcome):
+        done.add(outcome["part"])
+        for key, count in outcome["counters"].items():
+            checkpoint["totals"][key] += count
+        while checkpoint["next"]["part"] in done:
+            part = checkpoint["next"]["part"]
+            done.discard(part)
+            checkpoint["next"] = ends.pop(part)
+        checkpoint["done"] = sorted(done)
+        save_checkpoint(out_dir, checkpoint)
+
+    started = time.perf_counter()
+    if workers > 1:
+        import multiprocessing
+
+        with multiprocessing.get_context('fork').Pool(processes=workers) as pool:
+            for outcome in pool.imap_unordered(score_part, pending()):
+                finish(outcome)
+                _progress(checkpoint, started)
+    else:
+        for task in pending():
+            finish(score_part(task))
+            _progress(checkpoint, started)
+
+    checkpoint["finished"] = True
+    save_checkpoint(out_dir, checkpoint)
+    return checkpoint
+
+def _progress(checkpoint, started):
+    totals = checkpoint["totals"]
+    print(f"{totals['records']} records scored ({totals['updated']} updated, {totals['errors']} errors) "
+          f"in {time.perf_counter() - started:.1f}s", flush=True)
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Re-score stored assessments with the current model")
+    parser.add_argument('paths', nargs='+', help="JSONL exports of the MentalHealth collection")
+    parser.add_argument('--out', required=True, help="Directory receiving the update files and the checkpoint")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Documents per part and per model call (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--users', nargs='*', default=[], help="JSONL exports of the users collection")
+    parser.add_argument('--all', action='store_true', help="Write an update for every document, changed or not")
+    parser.add_argument('--restart', action='store_true', help="Discard a previous run in --out")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        checkpoint = rescore(args.paths, args.out, args.workers, args.batch_size, args.users, args.all, args.restart)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps({"model_version": checkpoint["model_version"], **checkpoint["totals"]}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
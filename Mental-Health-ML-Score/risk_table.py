@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Precomputed Risk Table
+
+The classifier only sees 11 discrete features: 7 categoricals with a few
+levels each, two 0-5 scores, and Age / Semester_Credit_Load in narrow
+integer ranges. The whole input domain can therefore be enumerated once
+at training time and the predicted class stored in a dense table (one bit
+per cell for a two-class model), so that serving a request is a single
+array index.
+
+Numerical axes cover the integer range seen in the training data. Values
+beyond that range are clamped to the edge only when this provably cannot
+change the answer (every tree threshold on the feature lies inside the
+range); otherwise, like non-integer values, they fall back to the model.
+Unknown categories take the slot of the dropped first category, which the
+one-hot encoder encodes identically (all zeros).
+
+Building walks every leaf of every tree over the domain: a second or two
+for a single decision tree, but over a second per tree for a random
+forest (about 4 minutes for the 200 trees of the training scripts), so
+the training scripts only build it for forests when asked to.
+"""
+
+import numpy as np
+
+# Cells accumulated at once while building the table
+BUILD_SLAB_CELLS = 1 << 22
+# Below this many rows, a plain Python loop beats per-column NumPy calls
+SCALAR_LOOKUP_ROWS = 16
+
+def cheap_to_build(model):
+    """
+    Whether the table of a fitted pipeline builds in seconds: a single decision tree.
+
+    Args:
+        model (Pipeline): Fitted pipeline with a 'classifier' step
+
+    Returns:
+        bool: True for a single tree, False for forests and non-tree models
+    """
+    return hasattr(model.named_steps['classifier'], 'tree_')
+
+def build_risk_table(model, domain_data, slab_cells=BUILD_SLAB_CELLS):
+    """
+    Evaluate a fitted pipeline over the Cartesian product of its input domain.
+
+    Args:
+        model (Pipeline): Fitted tree pipeline supported by compile_pipeline()
+        domain_data (pd.DataFrame): Training inputs; numerical axes span their integer min..max
+        slab_cells (int): Maximum number of cells accumulated at once
+
+    Returns:
+        tuple: (spec, table) where spec describes the axes (JSON-serializable)
+            and table is the packed class index array
+
+    Raises:
+        ValueError: If the classifier is not a tree model
+    """
+    from compiled_scorer import compile_pipeline
+
+    compiled = compile_pipeline(model)
+    meta = compiled["meta"]
+    if meta["model_type"] != "trees":
+        raise ValueError(f"Risk tables are only built for tree models, not {meta['classifier']}")
+    encoder = model.named_steps['preprocessor'].named_transformers_['cat']
+    numerical_cols = meta["numerical_cols"]
+    categorical_cols = meta["categorical_cols"]
+
+    axes = []
+    for feature in meta["feature_names"]:
+        if feature in numerical_cols:
+            j = numerical_cols.index(feature)
+            low = int(np.floor(domain_data[feature].min()))
+            high = int(np.ceil(domain_data[feature].max()))
+            column = meta["numerical_offset"] + j
+            mean, scale = compiled["scaler_mean"][j], compiled["scaler_scale"][j]
+            axes.append({
+                "feature": feature,
+                "kind": "integer",
+                "min": low,
+                "max": high,
+                "clamp": _clamp_is_exact(compiled, column, mean, scale, low, high),
+                "column": column,
+                "mean": float(mean),
+                "scale": float(scale)
+            })
+        else:
+            j = categorical_cols.index(feature)
+            values = [str(v) for v in encoder.categories_[j]]
+            mapping = meta["categories"][feature]
+            zero_index = None
+            if encoder.handle_unknown == 'ignore':
+                zero_index = next((k for k, v in enumerate(values) if v not in mapping), None)
+            axes.append({
+                "feature": feature,
+                "kind": "categorical",
+                "values": values,
+                "unknown_index": zero_index,
+                "columns": [mapping.get(v, -1) for v in values]
+            })
+
+    shape = tuple(_axis_size(axis) for axis in axes)
+    classes = _evaluate_domain(compiled, axes, shape, slab_cells)
+
+    two_classes = len(meta["classes"]) <= 2
+    spec = {
+        "classes": meta["classes"],
+        "shape": list(shape),
+        "encoding": "bits" if two_classes else "uint8",
+        "axes": [{key: value for key, value in axis.items() if key not in ("column", "mean", "scale", "columns")}
+                 for axis in axes]
+    }
+    table = np.packbits(classes) if two_classes else classes
+    return spec, table
+
+def _evaluate_domain(compiled, axes, shape, slab_cells):
+    # Each tree leaf covers a box of the domain: along every axis, the codes
+    # whose encoded value passes the splits on the way down. Adding the leaf
+    # distributions box by box, tree after tree, gives the same float64 sums
+    # as CompiledScorer.predict_proba_transformed() without visiting cells.
+    column_axis, column_values = {}, {}
+    for a, axis in enumerate(axes):
+        if axis["kind"] == "integer":
+            codes = np.arange(axis["min"], axis["max"] + 1, dtype=np.float64)
+            column_axis[axis["column"]] = a
+            column_values[axis["column"]] = ((codes - axis["mean"]) / axis["scale"]).astype(np.float32)
+        else:
+            columns = np.asarray(axis["columns"])
+            for column in columns[columns >= 0]:
+                column_axis[int(column)] = a
+                column_values[int(column)] = (columns == column).astype(np.float32)
+
+    left, right = compiled["children_left"], compiled["children_right"]
+    feature, threshold, value = compiled["feature"], compiled["threshold"], compiled["value"]
+
+    # Slabs fix the codes of the leading axes so the accumulator stays small
+    lead = 0
+    while lead < len(shape) and int(np.prod(shape[lead:])) > slab_cells:
+        lead += 1
+    tail_shape = shape[lead:]
+    classes = []
+
+    for prefix in np.ndindex(*shape[:lead]):
+        start = []
+        for a, size in enumerate(shape):
+            mask = np.zeros(size, dtype=bool) if a < lead else np.ones(size, dtype=bool)
+            if a < lead:
+                mask[prefix[a]] = True
+            start.append(mask)
+
+        proba = np.zeros(tail_shape + (value.shape[1],), dtype=np.float64)
+        for root in compiled["roots"]:
+            stack = [(int(root), start)]
+            while stack:
+                node, masks = stack.pop()
+                if left[node] == -1:
+                    box = np.ix_(*[np.flatnonzero(mask) for mask in masks[lead:]])
+                    proba[box] += value[node]
+                    continue
+                a = column_axis[int(feature[node])]
+                goes_left = column_values[int(feature[node])] <= threshold[node]
+                for child, side in ((left[node], goes_left), (right[node], ~goes_left)):
+                    mask = masks[a] & side
+                    if mask.any():
+                        stack.append((int(child), masks[:a] + [mask] + masks[a + 1:]))
+
+        classes.append(np.argmax(proba, axis=-1).astype(np.uint8).ravel())
+
+    return np.concatenate(classes)
+
+def _axis_size(axis):
+    if axis["kind"] == "integer":
+        return axis["max"] - axis["min"] + 1
+    return len(axis["values"])
+
+def _clamp_is_exact(compiled, column, mean, scale, low, high):
+    # Splits compare float32 inputs with the thresholds; values beyond the
+    # edges land on the same side of every split as the edge itself when
+    # no threshold on this column lies outside [edge(low), edge(high)).
+    internal = compiled["children_left"] != -1
+    thresholds = compiled["threshold"][internal & (compiled["feature"] == column)]
+    if thresholds.size == 0:
+        return True
+    z_low = np.float32((float(low) - mean) / scale)
+    z_high = np.float32((float(high) - mean) / scale)
+    return bool((thresholds >= z_low).all() and (thresholds < z_high).all())
+
+class RiskTable:
+    """
+    O(1) lookup of predicted classes in a precomputed table.
+
+    Args:
+        spec (dict): Axis description returned by build_risk_table()
+        table (np.ndarray): Packed class indices (may be memory-mapped)
+    """
+
+    def __init__(self, spec, table):
+        self.spec = spec
+        self._table = table
+        self._bits = spec["encoding"] == "bits"
+        self._shape = tuple(spec["shape"])
+        self._axes = []
+        for axis in spec["axes"]:
+            if axis["kind"] == "categorical":
+                index = {value: k for k, value in enumerate(axis["values"])}
+                self._axes.append((axis["feature"], "categorical", index, axis["unknown_index"]))
+            else:
+                self._axes.append((axis["feature"], "integer", (axis["min"], axis["max"]), axis["clamp"]))
+
+    def lookup(self, records):
+        """
+        Look up the class index of each input dict.
+
+        Args:
+            records (list): Normalized input dicts
+
+        Returns:
+            tuple: (class_indices, found) arrays; rows with found=False must
+                be answered by the model
+        """
+        n = len(records)
+        codes = np.zeros((len(self._axes), n), dtype=np.int64)
+        found = np.ones(n, dtype=bool)
+
+        if n < SCALAR_LOOKUP_ROWS:
+            for i, record in enumerate(records):
+                for a, axis in enumerate(self._axes):
+                    code = self._code(axis, record.get(axis[0]))
+                    if code is None:
+                        found[i] = False
+                        break
+                    codes[a, i] = code
+            return self._classes(codes), found
+
+        for a, (feature, kind, domain, fallback) in enumerate(self._axes):
+            column = [record.get(feature) for record in records]
+            if kind == "categorical":
+                missing = -1 if fallback is None else fallback
+                code = np.array([domain.get(v, missing) if isinstance(v, str) else missing for v in column],
+                                dtype=np.int64)
+            else:
+                low, high = domain
+                numbers = np.array([_as_number(v) for v in column], dtype=np.float64)
+                integral = np.isfinite(numbers) & (numbers == np.floor(numbers))
+                if fallback:
+                    numbers = np.clip(numbers, low, high)
+                in_range = integral & (numbers >= low) & (numbers <= high)
+                code = np.where(in_range, numbers - low, -1).astype(np.int64)
+            found &= code >= 0
+            codes[a] = np.where(found, code, 0)
+        return self._classes(codes), found
+
+    def _code(self, axis, value):
+        _, kind, domain, fallback = axis
+        if kind == "categorical":
+            code = domain.get(value) if isinstance(value, str) else None
+            return fallback if code is None else code
+
+        number = _as_number(value)
+        if not np.isfinite(number) or number != int(number):
+            return None
+        low, high = domain
+        number = int(number)
+        if fallback:
+            number = min(max(number, low), high)
+        return number - low if low <= number <= high else None
+
+    def _classes(self, codes):
+        flat = np.ravel_multi_index(tuple(codes), self._shape)
+        if self._bits:
+            classes = (self._table[flat >> 3] >> (7 - (flat & 7))) & 1
+        else:
+            classes = self._table[flat]
+        return np.asarray(classes, dtype=np.int64)
+
+def _as_number(value):
+    # NaN marks values the table cannot answer (strings, booleans, None)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return np.nan
@@ -0,0 +1,578 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Rule Set Distillation
+
+The target Mental_Health_Risk is itself a threshold rule, and the
+classifier only sees 11 low-cardinality features, so a 200-tree forest (or
+a deep tree) spends most of its time rediscovering a handful of
+conditions. This module distills the trained model (the teacher) into an
+ordered rule list that a few lines of pure Python can evaluate:
+
+1. the teacher labels the training inputs plus a uniform sample of the
+   input domain (the integer ranges and categories seen in training, like
+   risk_table.py);
+2. shallow surrogate trees (max_depth 1, 2, ...) are fitted to those
+   labels on the raw features, each category one-hot encoded without a
+   dropped level; the shallowest one whose fidelity on held-out rows is
+   within a tolerance of the best depth is kept;
+3. its leaves become rules: "IF Stress_Level > 2.5 AND Course IN {...}
+   THEN High", with the most frequent class as the default, so only the
+   leaves of the other classes are stored.
+
+Rules are saved as JSON (model/rules.json) with the hash of the pickle
+they were distilled from, and fidelity to the teacher on the held-out
+domain sample, on the training inputs and on the test split, plus
+accuracy against the true labels. RuleSet evaluates them with a plain Python loop
+for a few rows (microseconds per row) and with NumPy masks for batches;
+predict_mental_health.py --rules serves from it, unless their fidelity on
+the test split is below a floor (DEFAULT_MIN_FIDELITY).
+
+Usage:
+    python rule_distillation.py                 # distill model/mental_health_model.pkl into model/rules.json
+    python rule_distillation.py --max-depth 4 --tolerance 0.01
+    python rule_distillation.py --show          # print the current rules
+"""
+
+import os
+import sys
+import json
+import math
+import argparse
+import tempfile
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+MODEL_DIR = SCRIPT_DIR / "model"
+
+MODEL_PATH = MODEL_DIR / "mental_health_model.pkl"
+RULES_PATH = MODEL_DIR / "rules.json"
+
+FORMAT_NAME = "mental-health-rules"
+FORMAT_VERSION = 1
+
+DEFAULT_MAX_DEPTH = 8
+# Uniform domain rows labeled by the teacher, for fitting and for the held-out fidelity
+DEFAULT_DOMAIN_SAMPLES = 100000
+DEFAULT_HOLDOUT_SAMPLES = 50000
+# Accepted fidelity loss of a shallower surrogate with respect to the best depth
+DEFAULT_TOLERANCE = 0.005
+# Rules agreeing less often with the model on the test split are not served
+DEFAULT_MIN_FIDELITY = 0.95
+
+# Below this many rows, a plain Python loop beats per-column NumPy calls
+SCALAR_ROWS = 16
+
+def domain_features(model, X):
+    """
+    Describe the input domain of the teacher.
+
+    Args:
+        model (Pipeline): Fitted pipeline with a OneHotEncoder in its 'preprocessor' step
+        X (pd.DataFrame): Training inputs; numerical features span their integer min..max
+
+    Returns:
+        list: One dict per model input: name, kind ('numerical' or
+            'categorical'), min / max or values, and for categoricals the
+            value an unknown category is encoded like (None if like no category)
+    """
+    encoder = model.named_steps['preprocessor'].named_transformers_['cat']
+    categorical_cols = [str(c) for c in encoder.feature_names_in_]
+    drop_idx = getattr(encoder, 'drop_idx_', None)
+
+    features = []
+    for name in (str(f) for f in model.feature_names_in_):
+        if name in categorical_cols:
+            j = categorical_cols.index(name)
+            values = [str(v) for v in encoder.categories_[j]]
+            # Unknown categories encode as all zeros, like the dropped level
+            unknown = None
+            if encoder.handle_unknown == 'ignore' and drop_idx is not None and drop_idx[j] is not None:
+                unknown = values[int(drop_idx[j])]
+            features.append({"name": name, "kind": "categorical", "values": values, "unknown": unknown})
+        else:
+            features.append({
+                "name": name,
+                "kind": "numerical",
+                "min": int(np.floor(X[name].min())),
+                "max": int(np.ceil(X[name].max()))
+            })
+    return features
+
+def sample_domain(features, n, rng):
+    """
+    Draw input rows uniformly from the domain.
+
+    Args:
+        features (list): Output of domain_features()
+        n (int): Number of rows
+        rng (np.random.Generator): Random generator
+
+    Returns:
+        pd.DataFrame: Model input columns
+    """
+    import pandas as pd
+
+    columns = {}
+    for feature in features:
+        if feature["kind"] == "categorical":
+            columns[feature["name"]] = rng.choice(np.asarray(feature["values"], dtype=object), n)
+        else:
+            columns[feature["name"]] = rng.integers(feature["min"], feature["max"] + 1, n)
+    return pd.DataFrame(columns)
+
+def encode(frame, features):
+    """
+    Surrogate input matrix: raw numerical values, one column per category.
+
+    Args:
+        frame (pd.DataFrame): Model input columns
+        features (list): Output of domain_features()
+
+    Returns:
+        tuple: (matrix, columns) where columns[k] is (feature, category or None)
+    """
+    parts, columns = [], []
+    for feature in features:
+        values = frame[feature["name"]]
+        if feature["kind"] == "numerical":
+            parts.append(values.to_numpy(dtype=np.float64)[:, None])
+            columns.append((feature["name"], None))
+        else:
+            values = values.astype(object).to_numpy()
+            known = np.isin(values, feature["values"])
+            if feature["unknown"] is not None:
+                values = np.where(known, values, feature["unknown"])
+            parts.append((values[:, None] == np.asarray(feature["values"], dtype=object)[None, :]).astype(np.float64))
+            columns.extend((feature["name"], value) for value in feature["values"])
+    return np.hstack(parts), columns
+
+def tree_to_rules(surrogate, columns, features):
+    """
+    Turn the leaves of a fitted surrogate tree into an ordered rule list.
+
+    The class with the most leaves becomes the default; every leaf of
+    another class becomes one rule, ordered by the share of training
+    weight it covers. Leaves are disjoint, so the order only affects speed.
+
+    Args:
+        surrogate (DecisionTreeClassifier): Tree fitted on encode() columns
+        columns (list): Columns returned by encode()
+        features (list): Output of domain_features()
+
+    Returns:
+        tuple: (rules, default) rule dicts and the default class
+    """
+    tree = surrogate.tree_
+    classes = [str(c) for c in surrogate.classes_]
+    kinds = {feature["name"]: feature for feature in features}
+    total = tree.weighted_n_node_samples[0]
+
+    leaves = []
+    stack = [(0, {})]
+    while stack:
+        node, conditions = stack.pop()
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left == -1:
+            leaves.append((classes[int(np.argmax(tree.value[node, 0]))],
+                           float(tree.weighted_n_node_samples[node] / total), conditions))
+            continue
+        name, category = columns[tree.feature[node]]
+        threshold = float(tree.threshold[node])
+        for child, goes_left in ((left, True), (right, False)):
+            child_conditions = {key: {k: set(v) if k == "not" else v for k, v in value.items()}
+                                for key, value in conditions.items()}
+            condition = child_conditions.setdefault(name, {})
+            if category is None:
+                if goes_left:
+                    condition["le"] = min(condition.get("le", np.inf), threshold)
+                else:
+                    condition["gt"] = max(condition.get("gt", -np.inf), threshold)
+            elif goes_left:
+                condition.setdefault("not", set()).add(category)
+            else:
+                condition["is"] = category
+            stack.append((child, child_conditions))
+
+    counts = {label: sum(1 for leaf in leaves if leaf[0] == label) for label in classes}
+    default = max(classes, key=lambda label: (counts[label], sum(l[1] for l in leaves if l[0] == label)))
+
+    rules = []
+    for label, coverage, conditions in sorted(leaves, key=lambda leaf: -leaf[1]):
+        if label == default:
+            continue
+        when = {}
+        for name in (feature["name"] for feature in features):
+            if name not in conditions:
+                continue
+            condition = conditions[name]
+            if kinds[name]["kind"] == "numerical":
+                when[name] = {key: condition[key] for key in ("gt", "le") if key in condition}
+                continue
+            if "is" in condition:
+                allowed = [condition["is"]]
+            else:
+                allowed = [v for v in kinds[name]["values"] if v not in condition["not"]]
+                # Values encoded as no category pass every "is not" split
+                if kinds[name]["unknown"] is None:
+                    allowed.append(None)
+            when[name] = {"in": allowed}
+        rules.append({"class": label, "when": when, "coverage": round(coverage, 6)})
+    return rules, default
+
+class RuleSet:
+    """
+    Pure-Python evaluator of a distilled rule list.
+
+    Args:
+        spec (dict): Rule set written by distill_rules() / read by load_rules()
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.feature_names_in_ = [feature["name"] for feature in spec["features"]]
+        self.classes_ = np.asarray(spec["classes"], dtype=object)
+        self.default = spec["default"]
+        self._numerical = [f["name"] for f in spec["features"] if f["kind"] == "numerical"]
+        self._categorical = [(f["name"], frozenset(f["values"]), f["unknown"])
+                             for f in spec["features"] if f["kind"] == "categorical"]
+        # (class, ((feature, low, high, allowed), ...)): allowed is None for numerical checks
+        self._rules = []
+        for rule in spec["rules"]:
+            checks = []
+            for name, condition in rule["when"].items():
+                if "in" in condition:
+                    checks.append((name, None, None, frozenset(condition["in"])))
+                else:
+                    checks.append((name, condition.get("gt", -np.inf), condition.get("le", np.inf), None))
+            self._rules.append((rule["class"], tuple(checks)))
+
+    def _row(self, record):
+        # Same coercions as CompiledScorer.transform()
+        row = {}
+        for name in self._numerical:
+            value = float(record[name])
+            if not math.isfinite(value):
+                raise ValueError("Numerical features must be finite numbers")
+            row[name] = value
+        for name, values, unknown in self._categorical:
+            value = record[name]
+            row[name] = value if isinstance(value, str) and value in values else unknown
+        return row
+
+    def predict_one(self, row):
+        """
+        Class of one coerced row: the first matching rule, else the default.
+
+        Args:
+            row (dict): Feature values (numbers and known categories)
+
+        Returns:
+            str: Predicted class
+        """
+        for label, checks in self._rules:
+            for name, low, high, allowed in checks:
+                value = row[name]
+                if allowed is None:
+                    if not low < value <= high:
+                        break
+                elif value not in allowed:
+                    break
+            else:
+                return label
+        return self.default
+
+    def predict(self, records, timings=None):
+        """
+        Predict the risk level for input dicts.
+
+        Args:
+            records (list): Input data dicts
+            timings (RequestTimings, optional): Receives the 'preprocess' and 'classifier' stages
+
+        Returns:
+            np.ndarray: Predicted class labels
+
+        Raises:
+            ValueError: If a feature is missing or a numerical value is not a finite number
+        """
+        stage = timings.stage if timings is not None else _untimed
+        if len(records) < SCALAR_ROWS:
+            with stage('preprocess'):
+                try:
+                    rows = [self._row(record) for record in records]
+                except KeyError:
+                    # Reported below with every missing column
+                    rows = None
+            if rows is not None:
+                with stage('classifier'):
+                    return np.array([self.predict_one(row) for row in rows], dtype=object)
+
+        missing = {f for f in self.feature_names_in_ if any(f not in record for record in records)}
+        if missing:
+            raise ValueError(f"columns are missing: {missing}")
+
+        with stage('preprocess'):
+            columns = {}
+            for name in self._numerical:
+                values = np.array([float(record[name]) for record in records], dtype=np.float64)
+                if not np.isfinite(values).all():
+                    raise ValueError("Numerical features must be finite numbers")
+                columns[name] = values
+            for name, values, unknown in self._categorical:
+                columns[name] = np.array([record[name] if isinstance(record[name], str) and record[name] in values
+                                          else unknown for record in records], dtype=object)
+        with stage('classifier'):
+            labels = np.full(len(records), self.default, dtype=object)
+            # Later rules first, so the first matching rule is written last
+            for label, checks in reversed(self._rules):
+                mask = np.ones(len(records), dtype=bool)
+                for name, low, high, allowed in checks:
+                    values = columns[name]
+                    if allowed is None:
+                        mask &= (values > low) & (values <= high)
+                    else:
+                        mask &= np.fromiter((value in allowed for value in values), dtype=bool, count=len(values))
+                labels[mask] = label
+            return labels
+
+    def describe(self):
+        """
+        Human-readable rule list.
+
+        Returns:
+            str: One line per rule, then the default
+        """
+        lines = []
+        for rule in self.spec["rules"]:
+            terms = []
+            for name, condition in rule["when"].items():
+                if "in" in condition:
+                    values = ", ".join("(unknown)" if v is None else v for v in condition["in"])
+                    terms.append(f"{name} IN {{{values}}}")
+                else:
+                    if "gt" in condition:
+                        terms.append(f"{name} > {condition['gt']:g}")
+                    if "le" in condition:
+                        terms.append(f"{name} <= {condition['le']:g}")
+            lines.append(f"IF {' AND '.join(terms) or 'TRUE'} THEN {rule['class']}"
+                         f"   # {rule['coverage'] * 100:.2f}% of the training weight")
+        lines.append(f"ELSE {self.default}")
+        return "\n".join(lines)
+
+def _untimed(name):
+    return nullcontext()
+
+def _records(frame):
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+def _agreement(a, b):
+    return round(float(np.mean(np.asarray(a, dtype=object) == np.asarray(b, dtype=object))), 6)
+
+def distill_rules(model, X_train, X_test, y_test=None, max_depth=DEFAULT_MAX_DEPTH,
+                  domain_samples=DEFAULT_DOMAIN_SAMPLES, holdout_samples=DEFAULT_HOLDOUT_SAMPLES,
+                  tolerance=DEFAULT_TOLERANCE, random_state=42):
+    """
+    Distill a fitted pipeline into an ordered rule list.
+
+    Surrogates are fitted on the teacher's labels for X_train and a uniform
+    domain sample, the two weighted equally. Depth selection uses the mean
+    fidelity on a separate domain sample and on X_test.
+
+    Args:
+        model (Pipeline): Fitted teacher pipeline (any classifier)
+        X_train (pd.DataFrame): Training inputs, also defining the numerical ranges
+        X_test (pd.DataFrame): Held-out inputs
+        y_test (pd.Series, optional): Held-out labels, for the accuracy of teacher and rules
+        max_depth (int): Deepest surrogate tried
+        domain_samples (int): Uniform domain rows used for fitting
+        holdout_samples (int): Uniform domain rows used for fidelity
+        tolerance (float): Accepted fidelity loss of a shallower surrogate
+        random_state (int): Seed of the domain samples and surrogates
+
+    Returns:
+        dict: Rule set spec (JSON-serializable), with a "fidelity" report
+    """
+    import pandas as pd
+    from sklearn.tree import DecisionTreeClassifier
+
+    rng = np.random.default_rng(random_state)
+    features = domain_features(model, X_train)
+    domain = sample_domain(features, domain_samples, rng)
+    holdout = sample_domain(features, holdout_samples, rng)
+
+    fit_X = np.vstack([encode(domain, features)[0], encode(X_train, features)[0]])
+    columns = encode(domain.iloc[:1], features)[1]
+    teacher_train = model.predict(X_train).astype(str)
+    fit_y = np.concatenate([model.predict(domain).astype(str), teacher_train])
+    weights = np.concatenate([np.ones(len(domain)), np.full(len(X_train), len(domain) / max(len(X_train), 1))])
+
+    teacher_holdout = model.predict(holdout).astype(str)
+    teacher_test = model.predict(X_test).astype(str)
+    holdout_X = encode(holdout, features)[0]
+    test_X = encode(X_test, features)[0]
+
+    candidates = []
+    for depth in range(1, max_depth + 1):
+        surrogate = DecisionTreeClassifier(max_depth=depth, random_state=random_state)
+        surrogate.fit(fit_X, fit_y, sample_weight=weights)
+        fidelity = (np.mean(surrogate.predict(holdout_X) == teacher_holdout) +
+                    np.mean(surrogate.predict(test_X) == teacher_test)) / 2.0
+        candidates.append((depth, float(fidelity), surrogate))
+        # A surrogate that stopped growing will not change with a larger depth
+        if surrogate.get_depth() < depth:
+            break
+    best = max(fidelity for _, fidelity, _ in candidates)
+    depth, fidelity, surrogate = next(c for c in candidates if c[1] >= best - tolerance)
+
+    rules, default = tree_to_rules(surrogate, columns, features)
+    spec = {
+        "format": FORMAT_NAME,
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "teacher": type(model.steps[-1][1]).__name__ if hasattr(model, 'steps') else type(model).__name__,
+        "classes": [str(c) for c in surrogate.classes_],
+        "features": features,
+        "default": default,
+        "rules": rules
+    }
+
+    # Fidelity of the rules themselves (not of the sklearn surrogate)
+    rule_set = RuleSet(spec)
+    rules_test = rule_set.predict(_records(X_test))
+    report = {
+        "surrogate_depth": depth,
+        "depths_tried": [{"max_depth": d, "fidelity": round(f, 6), "leaves": int(s.get_n_leaves())}
+                         for d, f, s in candidates],
+        "rules": len(rules),
+        "domain_holdout": {"rows": len(holdout),
+                           "fidelity": _agreement(rule_set.predict(_records(holdout)), teacher_holdout)},
+        "train": {"rows": len(X_train),
+                  "fidelity": _agreement(rule_set.predict(_records(X_train)), teacher_train)},
+        "test": {"rows": len(X_test), "fidelity": _agreement(rules_test, teacher_test)}
+    }
+    if y_test is not None:
+        truth = pd.Series(y_test).astype(str).to_numpy()
+        report["test"]["teacher_accuracy"] = _agreement(teacher_test, truth)
+        report["test"]["rules_accuracy"] = _agreement(rules_test, truth)
+    spec["fidelity"] = report
+    return spec
+
+def write_rules(spec, path=RULES_PATH, source_path=MODEL_PATH):
+    """
+    Save a rule set as JSON, atomically.
+
+    Args:
+        spec (dict): Output of distill_rules()
+        path (Path): Destination file
+        source_path (Path, optional): Pickle of the teacher, hashed into the file
+    """
+    from model_artifact import file_sha256, make_readable
+
+    spec = dict(spec)
+    if source_path is not None:
+        spec["source_sha256"] = file_sha256(source_path)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(spec, f, indent=2, ensure_ascii=False)
+        make_readable(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def load_rules(path=RULES_PATH, source_path=MODEL_PATH, min_fidelity=DEFAULT_MIN_FIDELITY):
+    """
+    Load a saved rule set.
+
+    Args:
+        path (Path): Rule set file
+        source_path (Path, optional): Pickle the rules must have been distilled
+            from; rules recording a different hash are treated as stale
+        min_fidelity (float, optional): Minimum agreement with the model on the
+            test split; rules below it (or without a recorded fidelity) are
+            refused, with a message on stderr. None accepts any rule set
+
+    Returns:
+        RuleSet: Evaluator, or None if there is no file, it is stale or refused
+
+    Raises:
+        ValueError: If the file is not a supported rule set format
+    """
+    from model_artifact import file_sha256
+
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, encoding='utf-8') as f:
+        spec = json.load(f)
+    if spec.get("format") != FORMAT_NAME or spec.get("format_version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Unsupported rule set format in {path}")
+    expected = spec.get("source_sha256")
+    if source_path is not None and expected is not None:
+        if not Path(source_path).exists() or expected != file_sha256(source_path):
+            return None
+    if min_fidelity is not None:
+        fidelity = spec.get("fidelity", {}).get("test", {}).get("fidelity")
+        if fidelity is None or fidelity < min_fidelity:
+            print(f"Rule set {path} not served: test fidelity {fidelity} is below {min_fidelity}", file=sys.stderr)
+            return None
+    return RuleSet(spec)
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Distill the mental health model into an ordered rule list")
+    parser.add_argument('--model', default=str(MODEL_PATH), help="Fitted pipeline pickle (the teacher)")
+    parser.add_argument('--output', default=str(RULES_PATH), help="Rule set file")
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_MAX_DEPTH, help="Deepest surrogate tree tried")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Accepted fidelity loss of a shallower surrogate")
+    parser.add_argument('--samples', type=int, default=DEFAULT_DOMAIN_SAMPLES,
+                        help="Uniform domain rows labeled by the teacher for fitting")
+    parser.add_argument('--show', action='store_true', help="Print the saved rules instead of distilling")
+    args = parser.parse_args(argv)
+
+    if args.show:
+        try:
+            rule_set = load_rules(args.output, source_path=None)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        if rule_set is None:
+            print(f"No rule set in {args.output}", file=sys.stderr)
+            return 1
+        print(rule_set.describe())
+        return 0
+
+    import joblib
+    from sklearn.model_selection import train_test_split
+    from training_orchestrator import load_training_data
+
+    # Same held-out split as the training scripts
+    X, y = load_training_data()
+    X_train, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    model = joblib.load(args.model)
+    spec = distill_rules(model, X_train, X_test, y_test, max_depth=args.max_depth,
+                         domain_samples=args.samples, tolerance=args.tolerance)
+    write_rules(spec, args.output, args.model)
+    print(RuleSet(spec).describe())
+    print(json.dumps(spec["fidelity"], indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,77 +5,175 @@ Modified version with recommendation system and model saving capabilities.
 Simplified version with only Decision Tree model and no plots.
 
 ### Partie 1: Importation
+
+Exécution sans surveillance (agents de build) :
+    python students_mental_health.py --headless                 # entraînement + export uniquement
+    python students_mental_health.py --figures-dir figures      # graphiques enregistrés, EDA et clustering en parallèle
+    python students_mental_health.py --headless --profile cprofile   # + profil cProfile de chaque étape
+    python students_mental_health.py --headless --compress-rf        # forêt compressée (forest_compression.py)
+    python students_mental_health.py --headless --fast-svm           # SVM rapide sans calibration (fast_svm.py)
+
+Le modèle exporté est aussi distillé en liste de règles (model/rules.json, rule_distillation.py),
+sauf avec --no-rules.
+
+Durée, temps CPU et mémoire de chaque étape : model/training_profile.json (training_profiler.py).
 """
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.metrics import accuracy_score, classification_report, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, classification_report, f1_score, roc_auc_score, confusion_matrix
 from imblearn.over_sampling import SMOTE
 from tabulate import tabulate
 import os
+import json
+import argparse
+import multiprocessing
 import joblib
 from imblearn.pipeline import Pipeline as ImbPipeline
+from model_artifact import export_artifact
+from risk_table import cheap_to_build
+from model_search import run_search
+from training_profiler import StageProfiler, PROFILERS
+from training_cache import load_cached
+from rule_distillation import DEFAULT_MIN_FIDELITY, RuleSet, distill_rules, write_rules
+from forest_compression import DEFAULT_TOLERANCE, compress_forest, summary as compression_summary
+from model_definitions import (SELECTED_FEATURES, CATEGORICAL_COLS, get_definition, make_classifier,
+                               make_preprocessor, select_best)
+
+# Options d'exécution (les arguments inconnus, p. ex. ceux d'un noyau Jupyter, sont ignorés)
+parser = argparse.ArgumentParser(description="Entraînement du modèle de risque de santé mentale")
+parser.add_argument('--headless', action='store_true',
+                    help="Uniquement ce qui produit les artefacts : ni EDA, ni graphiques, ni clustering")
+parser.add_argument('--skip-eda', action='store_true', help="Ne pas lancer l'analyse exploratoire")
+parser.add_argument('--skip-plots', action='store_true', help="Ne pas tracer les graphiques des modèles")
+parser.add_argument('--skip-clustering', action='store_true', help="Ne pas lancer le clustering K-Means")
+parser.add_argument('--figures-dir', default=None,
+                    help="Enregistrer les graphiques dans ce dossier au lieu de les afficher ; "
+                         "l'EDA et le clustering tournent alors en parallèle de l'entraînement")
+risk_table_options = parser.add_mutually_exclusive_group()
+risk_table_options.add_argument('--risk-table', action='store_true',
+                                help="Précalculer aussi la table de risque d'une forêt aléatoire (environ "
+                                     "1 s par arbre, 4 min pour 200 arbres) ; celle d'un arbre de décision "
+                                     "seul est toujours calculée (quelques secondes)")
+risk_table_options.add_argument('--no-risk-table', action='store_true',
+                                help="Exporter l'artefact sans la table de risque précalculée")
+parser.add_argument('--compress-rf', action='store_true',
+                    help="Compresser la forêt aléatoire avant l'export (élagage, sélection d'arbres, "
+                         "types compacts, voir forest_compression.py)")
+parser.add_argument('--compress-tolerance', type=float, default=DEFAULT_TOLERANCE,
+                    help="Perte de précision et de F1 acceptée lors de la compression (hors sac pour "
+                         "la sélection, puis sur X_test pour la vérification finale)")
+parser.add_argument('--compress-max-kb', type=float, default=None,
+                    help="Budget de taille de l'artefact compressé (Ko)")
+parser.add_argument('--compress-max-latency-ms', type=float, default=None,
+                    help="Budget de latence par ligne du modèle compilé compressé (ms)")
+parser.add_argument('--fast-svm', action='store_true',
+                    help="SVM entraîné par un solveur linéaire (approximation du noyau RBF), "
+                         "sans la calibration des probabilités de SVC(probability=True), voir fast_svm.py")
+parser.add_argument('--no-rules', action='store_true',
+                    help="Ne pas distiller le modèle en liste de règles (rule_distillation.py)")
+parser.add_argument('--profile', choices=PROFILERS, default=None,
+                    help="Profiler aussi chaque étape (fichiers dans model/profiles/, "
+                         "par défaut MENTAL_HEALTH_PROFILE)")
+args, _ = parser.parse_known_args()
+
+# Durée, CPU et mémoire de chaque étape de l'entraînement
+profiler = StageProfiler(args.profile, os.path.join('model', 'profiles'))
+
+RUN_EDA = not (args.headless or args.skip_eda)
+RUN_PLOTS = not (args.headless or args.skip_plots)
+RUN_CLUSTERING = not (args.headless or args.skip_clustering)
+
+# matplotlib et seaborn ne sont importés que si une étape trace des graphiques
+if RUN_EDA or RUN_PLOTS or RUN_CLUSTERING:
+    import matplotlib
+    if args.figures_dir:
+        matplotlib.use('Agg')
+        os.makedirs(args.figures_dir, exist_ok=True)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+def show_figure(name):
+    """
+    Affiche la figure courante, ou l'enregistre dans --figures-dir.
+
+    Args:
+        name (str): Nom du fichier PNG (sans extension)
+    """
+    if args.figures_dir:
+        plt.savefig(os.path.join(args.figures_dir, f'{name}.png'), bbox_inches='tight')
+        plt.close('all')
+    else:
+        plt.show()
+
+# Étapes annexes (EDA, clustering) lancées dans des processus séparés pendant l'entraînement
+background_stages = []
+
+def run_stage(stage, *stage_args):
+    """
+    Lance une étape annexe : en parallèle (processus forké) quand les graphiques
+    sont enregistrés dans des fichiers, sinon directement.
+
+    Args:
+        stage (callable): Fonction de l'étape
+        *stage_args: Arguments de l'étape
+    """
+    if args.figures_dir:
+        process = multiprocessing.get_context('fork').Process(target=stage, args=stage_args, name=stage.__name__)
+        process.start()
+        background_stages.append(process)
+    else:
+        stage(*stage_args)
 
 # Vérifier l'existence du fichier
 file_path = 'students_mental_health_survey.csv'
 if not os.path.exists(file_path):
     raise FileNotFoundError(f"Le fichier {file_path} n'existe pas.")
 
-# Charger le fichier CSV
-df = pd.read_csv(file_path)
-
-# Afficher les colonnes
-print('Colonnes du dataset :', df.columns.tolist())
-
-# Afficher les 5 premières lignes
-print('\n5 premières lignes :')
-print(tabulate(df.head(), headers='keys', tablefmt='pretty'))
-
-# Statistiques descriptives
-print('\nStatistiques descriptives :')
-print(df.describe())
+# Variables catégoriques normalisées (ex. supprimer espaces, convertir en minuscules) ;
+# caractéristiques, préprocesseur, modèles et grilles viennent de model_definitions.py,
+# partagé avec training_orchestrator.py
+categorical_cols = CATEGORICAL_COLS
 
-# Informations sur les données
-print('\nInformations sur les données :')
-df.info()
+if RUN_EDA:
+    profiler.begin('eda:summary')
+    # Le fichier brut n'est chargé en entier que pour l'analyse exploratoire
+    raw_df = pd.read_csv(file_path)
 
-# Pourcentage de valeurs manquantes
-print('\nPourcentage de valeurs manquantes par colonne :')
-print((df.isnull().sum() / len(df) * 100).round(2))
+    # Afficher les colonnes
+    print('Colonnes du dataset :', raw_df.columns.tolist())
 
-"""### Partie 2: Nettoyage de données"""
+    # Afficher les 5 premières lignes
+    print('\n5 premières lignes :')
+    print(tabulate(raw_df.head(), headers='keys', tablefmt='pretty'))
 
-# Supprimer les doublons
-print('\nNombre de doublons :', df.duplicated().sum())
-df.drop_duplicates(inplace=True)
-print('Nombre de doublons après suppression :', df.duplicated().sum())
+    # Statistiques descriptives
+    print('\nStatistiques descriptives :')
+    print(raw_df.describe())
 
-# Vérifier les valeurs manquantes
-print('\nValeurs manquantes par colonne :\n', df.isnull().sum())
+    # Informations sur les données
+    print('\nInformations sur les données :')
+    raw_df.info()
 
-# Imputer CGPA avec la médiane
-if df['CGPA'].isnull().sum() > 0:
-    df['CGPA'].fillna(df['CGPA'].median(), inplace=True)
+    # Pourcentage de valeurs manquantes
+    print('\nPourcentage de valeurs manquantes par colonne :')
+    print((raw_df.isnull().sum() / len(raw_df) * 100).round(2))
+    del raw_df
 
-# Imputer Substance_Use avec le mode
-if df['Substance_Use'].isnull().sum() > 0:
-    df['Substance_Use'].fillna(df['Substance_Use'].mode()[0], inplace=True)
+"""### Partie 2: Nettoyage de données"""
 
-# Explorer les colonnes avec valeurs manquantes restantes
-print('\nColonnes avec valeurs manquantes restantes :\n', df.isnull().sum())
-# Supprimer les lignes avec des valeurs manquantes uniquement si nécessaire
-df = df.dropna()
+# Lecture par blocs : doublons, imputation (médiane de CGPA, mode de Substance_Use),
+# lignes incomplètes et normalisation des catégories (voir ingest.py) ; le résultat
+# est mis en cache et relu directement tant que le CSV ne change pas (training_cache.py)
+profiler.begin('load_clean')
+df, ingest_report = load_cached(file_path, normalize_cols=categorical_cols)
 
-# Standardiser les variables catégoriques (ex. supprimer espaces, convertir en minuscules)
-categorical_cols = ['Course', 'Substance_Use', 'Counseling_Service_Use', 'Physical_Activity',
-                    'Extracurricular_Involvement', 'Family_History', 'Chronic_Illness']
-for col in categorical_cols:
-    if df[col].dtype == 'object':
-        df[col] = df[col].str.strip().str.lower()
+print('\nNombre de doublons :', ingest_report['duplicates'])
+print('\nValeurs manquantes par colonne :\n', pd.Series(ingest_report['missing']))
+print('\nValeurs imputées :', ingest_report['imputed'])
+print('Lignes incomplètes supprimées :', ingest_report['rows_dropped'])
 
 # Vérifier les valeurs uniques pour détecter les incohérences
 print('\nValeurs uniques par colonne :')
@@ -87,48 +185,86 @@ print('Valeurs manquantes après traitement :\n', df.isnull().sum())
 
 """#### Visualisation de données"""
 
-# Matrice de corrélation
-plt.figure(figsize=(10, 8))
-numerical_cols = ['Stress_Level', 'Depression_Score', 'Anxiety_Score', 'CGPA', 'Semester_Credit_Load', 'Age']
-sns.heatmap(df[numerical_cols].corr(), annot=True, cmap='coolwarm', fmt='.2f')
-plt.title('Matrice de corrélation des variables numériques')
-plt.show()
-
-# Histogrammes
-df[numerical_cols].hist(figsize=(20, 15), bins=20)
-plt.suptitle('Distribution des variables numériques', fontsize=16)
-plt.tight_layout()
-plt.show()
-
-# Distribution des scores de stress, anxiété et dépression
-fig, axes = plt.subplots(1, 3, figsize=(18, 5))
-sns.histplot(df['Stress_Level'], bins=6, kde=True, ax=axes[0], color='blue')
-axes[0].set_title('Distribution du Niveau de Stress (0-5)')
-sns.histplot(df['Depression_Score'], bins=6, kde=True, ax=axes[1], color='red')
-axes[1].set_title('Distribution du Score de Dépression (0-5)')
-sns.histplot(df['Anxiety_Score'], bins=6, kde=True, ax=axes[2], color='green')
-axes[2].set_title('Distribution du Score d\'Anxiété (0-5)')
-plt.tight_layout()
-plt.show()
-
-# Corrélation entre Soutien Social et Dépression
-plt.figure(figsize=(8, 6))
-sns.boxplot(x=df['Social_Support'], y=df['Depression_Score'])
-plt.title('Score de Dépression par Niveau de Soutien Social')
-plt.xlabel('Soutien Social (Low, Moderate, High)')
-plt.ylabel('Score de Dépression (0-5)')
-plt.show()
-
-# Test statistique pour la corrélation
-from scipy.stats import pearsonr
-corr, p_value = pearsonr(df['Stress_Level'], df['Depression_Score'])
-print(f'Corrélation entre Stress_Level et Depression_Score : {corr:.4f}, p-value : {p_value:.4f}')
+def run_eda(df):
+    """
+    Graphiques exploratoires et test de corrélation (étape optionnelle, sans effet sur le modèle).
+
+    Args:
+        df (pd.DataFrame): Données nettoyées
+    """
+    from scipy.stats import pearsonr
+
+    # Matrice de corrélation
+    plt.figure(figsize=(10, 8))
+    numerical_cols = ['Stress_Level', 'Depression_Score', 'Anxiety_Score', 'CGPA', 'Semester_Credit_Load', 'Age']
+    sns.heatmap(df[numerical_cols].corr(), annot=True, cmap='coolwarm', fmt='.2f')
+    plt.title('Matrice de corrélation des variables numériques')
+    show_figure('correlation_matrix')
+
+    # Histogrammes
+    df[numerical_cols].hist(figsize=(20, 15), bins=20)
+    plt.suptitle('Distribution des variables numériques', fontsize=16)
+    plt.tight_layout()
+    show_figure('numerical_histograms')
+
+    # Distribution des scores de stress, anxiété et dépression
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    sns.histplot(df['Stress_Level'], bins=6, kde=True, ax=axes[0], color='blue')
+    axes[0].set_title('Distribution du Niveau de Stress (0-5)')
+    sns.histplot(df['Depression_Score'], bins=6, kde=True, ax=axes[1], color='red')
+    axes[1].set_title('Distribution du Score de Dépression (0-5)')
+    sns.histplot(df['Anxiety_Score'], bins=6, kde=True, ax=axes[2], color='green')
+    axes[2].set_title('Distribution du Score d\'Anxiété (0-5)')
+    plt.tight_layout()
+    show_figure('score_distributions')
+
+    # Corrélation entre Soutien Social et Dépression
+    plt.figure(figsize=(8, 6))
+    sns.boxplot(x=df['Social_Support'], y=df['Depression_Score'])
+    plt.title('Score de Dépression par Niveau de Soutien Social')
+    plt.xlabel('Soutien Social (Low, Moderate, High)')
+    plt.ylabel('Score de Dépression (0-5)')
+    show_figure('depression_by_social_support')
+
+    # Test statistique pour la corrélation
+    corr, p_value = pearsonr(df['Stress_Level'], df['Depression_Score'])
+    print(f'Corrélation entre Stress_Level et Depression_Score : {corr:.4f}, p-value : {p_value:.4f}')
+
+    # Impact de l'Activité Physique sur le Stress
+    plt.figure(figsize=(8, 6))
+    sns.boxplot(x=df['Physical_Activity'], y=df['Stress_Level'])
+    plt.title('Influence de l\'Activité Physique sur le Stress')
+    show_figure('stress_by_physical_activity')
+
+    # Visualisation de l'impact du genre
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    sns.boxplot(x='Gender', y='Stress_Level', data=df, ax=axes[0], palette='Blues')
+    axes[0].set_title('Niveau de Stress par Genre')
+    sns.boxplot(x='Gender', y='Depression_Score', data=df, ax=axes[1], palette='Reds')
+    axes[1].set_title('Score de Dépression par Genre')
+    sns.boxplot(x='Gender', y='Anxiety_Score', data=df, ax=axes[2], palette='Greens')
+    axes[2].set_title('Score d\'Anxiété par Genre')
+    plt.tight_layout()
+    show_figure('scores_by_gender')
+
+    # Impact du type de résidence sur le stress
+    plt.figure(figsize=(10, 6))
+    sns.boxplot(x='Residence_Type', y='Stress_Level', data=df, palette='coolwarm')
+    plt.title('Niveau de Stress en Fonction du Type de Résidence')
+    plt.xticks(rotation=45)
+    show_figure('stress_by_residence')
+
+profiler.begin('eda')
+if RUN_EDA:
+    run_stage(run_eda, df)
 
 """### Partie 3: Transformation de données
 
 #### Séparation des Données et Préparation
 """
 
+profiler.begin('split')
+
 # Définir Mental_Health_Risk (exemple : basé sur les scores)
 df['Mental_Health_Risk'] = np.where(
     (df['Stress_Level'] >= 3) | (df['Depression_Score'] >= 3) | (df['Anxiety_Score'] >= 3),
@@ -136,32 +272,19 @@ df['Mental_Health_Risk'] = np.where(
 )
 
 # Définir les caractéristiques et la cible
-selected_features = [
-    'Counseling_Service_Use', 'Stress_Level', 'Substance_Use', 'Age', 'Course',
-    'Financial_Stress', 'Physical_Activity', 'Extracurricular_Involvement',
-    'Semester_Credit_Load', 'Family_History', 'Chronic_Illness'
-]
+selected_features = SELECTED_FEATURES
 X = df[selected_features]
 y = df['Mental_Health_Risk']
 
-# Définir les colonnes catégoriques et numériques
-categorical_cols = [
-    'Counseling_Service_Use', 'Substance_Use', 'Course', 'Physical_Activity',
-    'Extracurricular_Involvement', 'Family_History', 'Chronic_Illness'
-]
-numerical_cols = ['Stress_Level', 'Age', 'Financial_Stress', 'Semester_Credit_Load']
-
-# Créer un préprocesseur
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numerical_cols),
-        ('cat', OneHotEncoder(drop='first', sparse_output=False, handle_unknown='ignore'), categorical_cols)
-    ])
+# Créer un préprocesseur (standardisation des colonnes numériques, one-hot des catégoriques)
+preprocessor = make_preprocessor()
 
 # Séparer les données
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
 print('\nDimensions X_train, X_test :', X_train.shape, X_test.shape)
 
+profiler.begin('resample')
+
 # Créer un pipeline avec SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 pipeline = ImbPipeline(steps=[
@@ -178,30 +301,6 @@ X_train_resampled, y_train_resampled = pipeline.named_steps['smote'].fit_resampl
 print('\nDistribution des classes après SMOTE :')
 print(pd.Series(y_train_resampled).value_counts(normalize=True))
 
-# Impact de l'Activité Physique sur le Stress
-plt.figure(figsize=(8, 6))
-sns.boxplot(x=df['Physical_Activity'], y=df['Stress_Level'])
-plt.title('Influence de l\'Activité Physique sur le Stress')
-plt.show()
-
-# Visualisation de l'impact du genre
-fig, axes = plt.subplots(1, 3, figsize=(18, 5))
-sns.boxplot(x='Gender', y='Stress_Level', data=df, ax=axes[0], palette='Blues')
-axes[0].set_title('Niveau de Stress par Genre')
-sns.boxplot(x='Gender', y='Depression_Score', data=df, ax=axes[1], palette='Reds')
-axes[1].set_title('Score de Dépression par Genre')
-sns.boxplot(x='Gender', y='Anxiety_Score', data=df, ax=axes[2], palette='Greens')
-axes[2].set_title('Score d\'Anxiété par Genre')
-plt.tight_layout()
-plt.show()
-
-# Impact du type de résidence sur le stress
-plt.figure(figsize=(10, 6))
-sns.boxplot(x='Residence_Type', y='Stress_Level', data=df, palette='coolwarm')
-plt.title('Niveau de Stress en Fonction du Type de Résidence')
-plt.xticks(rotation=45)
-plt.show()
-
 # Vérifier la distribution de Mental_Health_Risk
 print('\nDistribution de Mental_Health_Risk :')
 print(df['Mental_Health_Risk'].value_counts(normalize=True))
@@ -212,21 +311,21 @@ print(df['Mental_Health_Risk'].value_counts(normalize=True))
 """
 
 # Créer un pipeline pour KNN
+# (run_search calcule préprocesseur et SMOTE une seule fois par pli pour tous les modèles ;
+# MENTAL_HEALTH_SEARCH=halving active la recherche par divisions successives)
 knn_pipeline = ImbPipeline(steps=[
     ('preprocessor', preprocessor),
     ('smote', SMOTE(random_state=42)),
-    ('classifier', KNeighborsClassifier())
+    ('classifier', make_classifier('knn'))
 ])
 
 # Optimiser les hyperparamètres
-param_grid = {
-    'classifier__n_neighbors': range(3, 21, 2),
-    'classifier__metric': ['euclidean', 'manhattan']
-}
-grid_search = GridSearchCV(knn_pipeline, param_grid, cv=5, scoring='f1_weighted', n_jobs=-1)
-grid_search.fit(X_train, y_train)
+param_grid = get_definition('knn')['param_grid']
+profiler.begin('search:knn')
+grid_search = run_search(knn_pipeline, param_grid, X_train, y_train)
 
 # Meilleur modèle
+profiler.begin('evaluate:knn')
 best_knn = grid_search.best_estimator_
 y_pred_knn = best_knn.predict(X_test)
 
@@ -245,31 +344,31 @@ print(f'Meilleurs hyperparamètres : {grid_search.best_params_}')
 print('Rapport :\n', report_knn)
 
 # Matrice de confusion
-plt.figure(figsize=(8, 6))
-sns.heatmap(confusion_matrix(y_test, y_pred_knn), annot=True, fmt='d', cmap='Blues')
-plt.title('KNN Classifier Confusion Matrix')
-plt.xlabel('Prédit')
-plt.ylabel('Réel')
-plt.show()
+if RUN_PLOTS:
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(confusion_matrix(y_test, y_pred_knn), annot=True, fmt='d', cmap='Blues')
+    plt.title('KNN Classifier Confusion Matrix')
+    plt.xlabel('Prédit')
+    plt.ylabel('Réel')
+    show_figure('knn_confusion_matrix')
 
 """### 2. Modèle SVM (Support Vector Machine Classifier)"""
 
-# Créer un pipeline pour SVM
+# Créer un pipeline pour SVM (seul predict() sert à l'évaluation : le mode rapide
+# se passe de la calibration interne de probability=True)
 svm_pipeline = ImbPipeline(steps=[
     ('preprocessor', preprocessor),
     ('smote', SMOTE(random_state=42)),
-    ('classifier', SVC(probability=True, random_state=42))
+    ('classifier', make_classifier('svm_fast' if args.fast_svm else 'svm'))
 ])
 
 # Optimiser les hyperparamètres
-param_grid = {
-    'classifier__C': [0.1, 1, 10],
-    'classifier__kernel': ['linear', 'rbf']
-}
-grid_search_svm = GridSearchCV(svm_pipeline, param_grid, cv=5, scoring='f1_weighted', n_jobs=-1)
-grid_search_svm.fit(X_train, y_train)
+param_grid = get_definition('svm')['param_grid']
+profiler.begin('search:svm')
+grid_search_svm = run_search(svm_pipeline, param_grid, X_train, y_train)
 
 # Meilleur modèle
+profiler.begin('evaluate:svm')
 best_svm = grid_search_svm.best_estimator_
 y_pred_svm = best_svm.predict(X_test)
 
@@ -288,12 +387,13 @@ print(f'Meilleurs hyperparamètres : {grid_search_svm.best_params_}')
 print('Rapport :\n', report_svm)
 
 # Matrice de confusion
-plt.figure(figsize=(8, 6))
-sns.heatmap(confusion_matrix(y_test, y_pred_svm), annot=True, fmt='d', cmap='Greens')
-plt.title('SVM Classifier Confusion Matrix')
-plt.xlabel('Prédit')
-plt.ylabel('Réel')
-plt.show()
+if RUN_PLOTS:
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(confusion_matrix(y_test, y_pred_svm), annot=True, fmt='d', cmap='Greens')
+    plt.title('SVM Classifier Confusion Matrix')
+    plt.xlabel('Prédit')
+    plt.ylabel('Réel')
+    show_figure('svm_confusion_matrix')
 
 """### 3. Modèle Arbre de Décision (Decision Tree Classifier)"""
 
@@ -301,18 +401,16 @@ plt.show()
 dt_pipeline = ImbPipeline(steps=[
     ('preprocessor', preprocessor),
     ('smote', SMOTE(random_state=42)),
-    ('classifier', DecisionTreeClassifier(random_state=42))
+    ('classifier', make_classifier('dt'))
 ])
 
 # Optimiser les hyperparamètres
-param_grid = {
-    'classifier__max_depth': [3, 5, 7, None],
-    'classifier__min_samples_split': [2, 5, 10]
-}
-grid_search_dt = GridSearchCV(dt_pipeline, param_grid, cv=5, scoring='f1_weighted', n_jobs=-1)
-grid_search_dt.fit(X_train, y_train)
+param_grid = get_definition('dt')['param_grid']
+profiler.begin('search:dt')
+grid_search_dt = run_search(dt_pipeline, param_grid, X_train, y_train)
 
 # Meilleur modèle
+profiler.begin('evaluate:dt')
 best_dt = grid_search_dt.best_estimator_
 y_pred_dt = best_dt.predict(X_test)
 
@@ -331,15 +429,18 @@ print(f'Meilleurs hyperparamètres : {grid_search_dt.best_params_}')
 print('Rapport :\n', report_dt)
 
 # Matrice de confusion
-plt.figure(figsize=(8, 6))
-sns.heatmap(confusion_matrix(y_test, y_pred_dt), annot=True, fmt='d', cmap='Reds')
-plt.title('Decision Tree Classifier Confusion Matrix')
-plt.xlabel('Prédit')
-plt.ylabel('Réel')
-plt.show()
+if RUN_PLOTS:
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(confusion_matrix(y_test, y_pred_dt), annot=True, fmt='d', cmap='Reds')
+    plt.title('Decision Tree Classifier Confusion Matrix')
+    plt.xlabel('Prédit')
+    plt.ylabel('Réel')
+    show_figure('dt_confusion_matrix')
 
 """### Comparaison des modèles"""
 
+profiler.begin('comparison')
+
 # Création d’un tableau récapitulatif
 performance_summary = pd.DataFrame({
     'Modèle': ['KNN Classifier', 'SVM Classifier', 'Arbre de Décision Classifier'],
@@ -353,69 +454,84 @@ print('\n🔍 Comparaison des performances des trois modèles :')
 print(tabulate(performance_summary, headers='keys', tablefmt='pretty'))
 
 # Visualisation : Graphique en barres pour les métriques
-fig, axes = plt.subplots(1, 3, figsize=(18, 6))
-sns.barplot(x='Modèle', y='Précision', data=performance_summary, palette='viridis', ax=axes[0])
-axes[0].set_title('Comparaison des précisions')
-axes[0].set_ylim(0, 1)
-for i, v in enumerate(performance_summary['Précision']):
-    axes[0].text(i, v + 0.02, f'{v:.4f}', ha='center')
-
-sns.barplot(x='Modèle', y='F1-Score', data=performance_summary, palette='viridis', ax=axes[1])
-axes[1].set_title('Comparaison des F1-Scores')
-axes[1].set_ylim(0, 1)
-for i, v in enumerate(performance_summary['F1-Score']):
-    axes[1].text(i, v + 0.02, f'{v:.4f}', ha='center')
-
-sns.barplot(x='Modèle', y='AUC-ROC', data=performance_summary, palette='viridis', ax=axes[2])
-axes[2].set_title('Comparaison des AUC-ROC')
-axes[2].set_ylim(0, 1)
-for i, v in enumerate(performance_summary['AUC-ROC']):
-    axes[2].text(i, v + 0.02, f'{v:.4f}', ha='center')
-
-plt.tight_layout()
-plt.show()
+if RUN_PLOTS:
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+    sns.barplot(x='Modèle', y='Précision', data=performance_summary, palette='viridis', ax=axes[0])
+    axes[0].set_title('Comparaison des précisions')
+    axes[0].set_ylim(0, 1)
+    for i, v in enumerate(performance_summary['Précision']):
+        axes[0].text(i, v + 0.02, f'{v:.4f}', ha='center')
+
+    sns.barplot(x='Modèle', y='F1-Score', data=performance_summary, palette='viridis', ax=axes[1])
+    axes[1].set_title('Comparaison des F1-Scores')
+    axes[1].set_ylim(0, 1)
+    for i, v in enumerate(performance_summary['F1-Score']):
+        axes[1].text(i, v + 0.02, f'{v:.4f}', ha='center')
+
+    sns.barplot(x='Modèle', y='AUC-ROC', data=performance_summary, palette='viridis', ax=axes[2])
+    axes[2].set_title('Comparaison des AUC-ROC')
+    axes[2].set_ylim(0, 1)
+    for i, v in enumerate(performance_summary['AUC-ROC']):
+        axes[2].text(i, v + 0.02, f'{v:.4f}', ha='center')
+
+    plt.tight_layout()
+    show_figure('model_comparison')
 
 """#### Clustering"""
 
-# Sélection des variables pour le clustering
-X_clustering = df[['Stress_Level', 'Anxiety_Score', 'Depression_Score', 'Sleep_Quality', 'Social_Support']]
-
-# Encoder les variables catégoriques
-X_clustering = pd.get_dummies(X_clustering, columns=['Sleep_Quality', 'Social_Support'], drop_first=True)
-
-# Normaliser les données
-scaler = StandardScaler()
-X_clustering_scaled = scaler.fit_transform(X_clustering)
-
-# Méthode du coude pour déterminer le nombre de clusters
-inertias = []
-for k in range(1, 11):
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    kmeans.fit(X_clustering_scaled)
-    inertias.append(kmeans.inertia_)
-
-plt.figure(figsize=(8, 6))
-plt.plot(range(1, 11), inertias, marker='o')
-plt.title('Méthode du coude pour K-Means')
-plt.xlabel('Nombre de clusters')
-plt.ylabel('Inertie')
-plt.show()
-
-# Appliquer K-Means avec le nombre optimal de clusters (ex. 3)
-kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-df['Cluster'] = kmeans.fit_predict(X_clustering_scaled)
-
-# Calculer le Silhouette Score
-silhouette_avg = silhouette_score(X_clustering_scaled, df['Cluster'])
-print('Score de silhouette pour k=3 :', silhouette_avg)
-
-# Visualiser les clusters
-plt.figure(figsize=(8, 6))
-sns.scatterplot(x=df['Stress_Level'], y=df['Anxiety_Score'], hue=df['Cluster'], palette='coolwarm')
-plt.title('Segmentation des étudiants par Stress et Anxiété (K-Means, k=3)')
-plt.xlabel('Niveau de Stress (0-5)')
-plt.ylabel('Score d\'Anxiété (0-5)')
-plt.show()
+def run_clustering(df):
+    """
+    Segmentation K-Means des étudiants (étape optionnelle, sans effet sur le modèle).
+
+    Args:
+        df (pd.DataFrame): Données nettoyées
+    """
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+
+    # Sélection des variables pour le clustering
+    X_clustering = df[['Stress_Level', 'Anxiety_Score', 'Depression_Score', 'Sleep_Quality', 'Social_Support']]
+
+    # Encoder les variables catégoriques
+    X_clustering = pd.get_dummies(X_clustering, columns=['Sleep_Quality', 'Social_Support'], drop_first=True)
+
+    # Normaliser les données
+    scaler = StandardScaler()
+    X_clustering_scaled = scaler.fit_transform(X_clustering)
+
+    # Méthode du coude pour déterminer le nombre de clusters
+    inertias = []
+    for k in range(1, 11):
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+        kmeans.fit(X_clustering_scaled)
+        inertias.append(kmeans.inertia_)
+
+    plt.figure(figsize=(8, 6))
+    plt.plot(range(1, 11), inertias, marker='o')
+    plt.title('Méthode du coude pour K-Means')
+    plt.xlabel('Nombre de clusters')
+    plt.ylabel('Inertie')
+    show_figure('kmeans_elbow')
+
+    # Appliquer K-Means avec le nombre optimal de clusters (ex. 3)
+    kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
+    clusters = kmeans.fit_predict(X_clustering_scaled)
+
+    # Calculer le Silhouette Score
+    silhouette_avg = silhouette_score(X_clustering_scaled, clusters)
+    print('Score de silhouette pour k=3 :', silhouette_avg)
+
+    # Visualiser les clusters
+    plt.figure(figsize=(8, 6))
+    sns.scatterplot(x=df['Stress_Level'], y=df['Anxiety_Score'], hue=clusters, palette='coolwarm')
+    plt.title('Segmentation des étudiants par Stress et Anxiété (K-Means, k=3)')
+    plt.xlabel('Niveau de Stress (0-5)')
+    plt.ylabel('Score d\'Anxiété (0-5)')
+    show_figure('kmeans_clusters')
+
+profiler.begin('clustering')
+if RUN_CLUSTERING:
+    run_stage(run_clustering, df)
 
 """### Partie 5: Création d'un modèle de recommandation et sauvegarde"""
 
@@ -510,18 +626,16 @@ print("\n🔍 Création d'un modèle RandomForest pour la prédiction du risque
 rf_pipeline = ImbPipeline(steps=[
     ('preprocessor', preprocessor),
     ('smote', SMOTE(random_state=42)),
-    ('classifier', RandomForestClassifier(n_estimators=200, random_state=42))
+    ('classifier', make_classifier('rf'))
 ])
 
 # Optimiser les hyperparamètres
-param_grid = {
-    'classifier__max_depth': [10, 20, None],
-    'classifier__min_samples_split': [2, 5, 10]
-}
-grid_search_rf = GridSearchCV(rf_pipeline, param_grid, cv=5, scoring='f1_weighted', n_jobs=-1)
-grid_search_rf.fit(X_train, y_train)
+param_grid = get_definition('rf')['param_grid']
+profiler.begin('search:rf')
+grid_search_rf = run_search(rf_pipeline, param_grid, X_train, y_train)
 
 # Meilleur modèle
+profiler.begin('evaluate:rf')
 best_rf = grid_search_rf.best_estimator_
 y_pred_rf = best_rf.predict(X_test)
 
@@ -539,30 +653,62 @@ print(f'AUC-ROC : {roc_auc_rf:.4f}')
 print(f'Meilleurs hyperparamètres : {grid_search_rf.best_params_}')
 print('Rapport :\n', report_rf)
 
+# Compression de la forêt : élagage en profondeur et sélection gloutonne des arbres,
+# choisis sur les lignes hors sac (out-of-bag) de l'entraînement ; X_test ne sert
+# qu'à la vérification finale de la tolérance
+compression_report = None
+if args.compress_rf:
+    profiler.begin('compress:rf')
+    best_rf, compression_report = compress_forest(
+        best_rf, X_train, y_train, X_test, y_test,
+        accuracy_tolerance=args.compress_tolerance,
+        f1_tolerance=args.compress_tolerance,
+        max_artifact_kb=args.compress_max_kb,
+        max_row_latency_ms=args.compress_max_latency_ms
+    )
+    print('\n🔍 Compression de la forêt aléatoire :')
+    print(compression_summary(compression_report))
+    if not compression_report['budgets']['met']:
+        print("Aucun candidat dans la tolérance ne respecte les budgets : le plus petit est conservé")
+    if not compression_report['applied']:
+        print("La forêt compressée sort de la tolérance sur X_test : la forêt d'origine est conservée")
+
+    # Les métriques publiées sont celles du modèle compressé
+    y_pred_rf = best_rf.predict(X_test)
+    accuracy_rf = accuracy_score(y_test, y_pred_rf)
+    f1_rf = f1_score(y_test, y_pred_rf, average='weighted')
+    roc_auc_rf = roc_auc_score(pd.get_dummies(y_test), pd.get_dummies(y_pred_rf), multi_class='ovr')
+
 # Matrice de confusion
-plt.figure(figsize=(8, 6))
-sns.heatmap(confusion_matrix(y_test, y_pred_rf), annot=True, fmt='d', cmap='Blues')
-plt.title('RandomForest Classifier Confusion Matrix')
-plt.xlabel('Prédit')
-plt.ylabel('Réel')
-plt.savefig('rf_confusion_matrix.png')
-plt.show()
-
-# Mettre à jour le tableau de comparaison des modèles
+if RUN_PLOTS:
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(confusion_matrix(y_test, y_pred_rf), annot=True, fmt='d', cmap='Blues')
+    plt.title('RandomForest Classifier Confusion Matrix')
+    plt.xlabel('Prédit')
+    plt.ylabel('Réel')
+    plt.savefig('rf_confusion_matrix.png')
+    show_figure('rf_confusion_matrix')
+
+# Mettre à jour le tableau de comparaison des modèles, avec le F1-Score en validation croisée
+searches = [grid_search, grid_search_svm, grid_search_dt, grid_search_rf]
 performance_summary = pd.DataFrame({
-    'Modèle': ['KNN Classifier', 'SVM Classifier', 'Arbre de Décision Classifier', 'RandomForest Classifier'],
+    'Modèle': [get_definition(key)['name'] for key in ('knn', 'svm', 'dt', 'rf')],
     'Précision': [accuracy_knn, accuracy_svm, accuracy_dt, accuracy_rf],
     'F1-Score': [f1_knn, f1_svm, f1_dt, f1_rf],
-    'AUC-ROC': [roc_auc_knn, roc_auc_svm, roc_auc_dt, roc_auc_rf]
+    'AUC-ROC': [roc_auc_knn, roc_auc_svm, roc_auc_dt, roc_auc_rf],
+    'F1-Score (CV)': [search.best_score_ for search in searches]
 })
 
 # Afficher le tableau mis à jour
 print('\n🔍 Comparaison des performances des quatre modèles :')
 print(tabulate(performance_summary, headers='keys', tablefmt='pretty'))
 
-# Sélectionner le meilleur modèle (RandomForest généralement)
-best_model = best_rf
-print(f"\nLe meilleur modèle est : RandomForest Classifier")
+# Sélectionner le meilleur modèle comme training_orchestrator.py : le F1-Score en validation
+# croisée (model_definitions.select_best), X_test ne servant qu'au rapport
+best_index = select_best(performance_summary['F1-Score (CV)'])
+best_model = [best_knn, best_svm, best_dt, best_rf][best_index]
+best_metrics = performance_summary.iloc[best_index]
+print(f"\nLe meilleur modèle (F1-Score en validation croisée) est : {best_metrics['Modèle']}")
 
 # Créer une classe pour encapsuler le modèle et les fonctionnalités de recommandation
 class MentalHealthRecommender:
@@ -583,10 +729,9 @@ class MentalHealthRecommender:
         # Convertir les données utilisateur en DataFrame
         user_df = pd.DataFrame([user_data])
 
-        # Prédire le niveau de risque
+        # Prédire le niveau de risque (le modèle est le pipeline complet, préprocesseur inclus)
         X_user = user_df[selected_features]
-        X_user_processed = self.preprocessor.transform(X_user)
-        risk_level = self.model.predict(X_user_processed)[0]
+        risk_level = self.model.predict(X_user)[0]
 
         return risk_level
 
@@ -616,6 +761,7 @@ class MentalHealthRecommender:
         return recommendations
 
 # Créer une instance du recommandeur
+profiler.begin('recommender')
 recommender = MentalHealthRecommender(best_model, preprocessor)
 
 # Exemple d'utilisation
@@ -663,6 +809,7 @@ for practice in example_recommendations['daily_practices']:
     print(f"- {practice}")
 
 # Sauvegarder le modèle et le préprocesseur
+profiler.begin('dump')
 print("\n🔍 Sauvegarde du modèle et du préprocesseur...")
 model_dir = 'model'
 os.makedirs(model_dir, exist_ok=True)
@@ -671,8 +818,62 @@ os.makedirs(model_dir, exist_ok=True)
 joblib.dump(best_model, os.path.join(model_dir, 'mental_health_model.pkl'))
 # Sauvegarder le préprocesseur
 joblib.dump(preprocessor, os.path.join(model_dir, 'preprocessor.pkl'))
-# Sauvegarder le recommandeur
-joblib.dump(recommender, os.path.join(model_dir, 'recommender.pkl'))
+# Le recommandeur n'est plus sauvegardé : sa classe est définie dans __main__,
+# son pickle ne pouvait pas être rechargé ailleurs
+# Rapport de compression (taille, temps de chargement et latence avant / après)
+if compression_report is not None:
+    with open(os.path.join(model_dir, 'compression_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(compression_report, f, indent=2)
+profiler.begin('export_artifact')
+# Publier l'artefact versionné (manifest JSON + tableaux .npy) utilisé par predict_mental_health.py,
+# avec la table de risque précalculée sur tout le domaine des entrées (risk_table.py) : d'office pour
+# un arbre seul, sur demande (--risk-table) pour une forêt dont elle dominerait le temps d'entraînement
+build_risk_table = args.risk_table or (not args.no_risk_table and cheap_to_build(best_model))
+if not build_risk_table and not args.no_risk_table:
+    print("Table de risque non précalculée : d'office pour un arbre de décision seul, "
+          "avec --risk-table pour une forêt")
+export_artifact(best_model, os.path.join(model_dir, 'artifacts'),
+                os.path.join(model_dir, 'mental_health_model.pkl'),
+                training_metrics={
+                    'model': best_metrics['Modèle'],
+                    'accuracy': float(best_metrics['Précision']),
+                    'f1_weighted': float(best_metrics['F1-Score']),
+                    'roc_auc': float(best_metrics['AUC-ROC']),
+                    'cv_f1_weighted': float(best_metrics['F1-Score (CV)']),
+                    'best_params': searches[best_index].best_params_,
+                    'compression': None if best_model is not best_rf or compression_report is None
+                    or not compression_report['applied'] else {
+                        'trees': compression_report['after']['trees'],
+                        'max_depth': compression_report['after']['max_depth'],
+                        'tolerance': args.compress_tolerance
+                    }
+                },
+                risk_table_data=X if build_risk_table else None,
+                compact=args.compress_rf and best_model is best_rf)
+
+# Distiller le modèle en liste de règles ordonnée (rules.json, servie par predict_mental_health.py --rules),
+# avec la fidélité au modèle mesurée sur X_test et sur un échantillon du domaine des entrées
+if not args.no_rules:
+    profiler.begin('distill')
+    rules = distill_rules(best_model, X_train, X_test, y_test)
+    write_rules(rules, os.path.join(model_dir, 'rules.json'), os.path.join(model_dir, 'mental_health_model.pkl'))
+    print("\n🔍 Règles distillées :")
+    print(RuleSet(rules).describe())
+    print(f"Fidélité sur X_test : {rules['fidelity']['test']['fidelity']:.4f}")
+    if rules['fidelity']['test']['fidelity'] < DEFAULT_MIN_FIDELITY:
+        print(f"Fidélité inférieure à {DEFAULT_MIN_FIDELITY} : les règles ne seront pas servies par --rules")
 
 print(f"Modèle sauvegardé dans le dossier '{model_dir}'")
+
+# Attendre les étapes annexes lancées en parallèle
+profiler.begin('wait_background')
+for process in background_stages:
+    process.join()
+    if process.exitcode != 0:
+        print(f"L'étape {process.name} a échoué (code {process.exitcode})")
+
+# Rapport de profilage des étapes, à côté des fichiers du modèle
+profiler.write(os.path.join(model_dir, 'training_profile.json'))
+print('\n⏱️ Durée des étapes :')
+print(profiler.summary())
 print("Terminé !")
\ No newline at end of file
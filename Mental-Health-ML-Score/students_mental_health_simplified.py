@@ -4,62 +4,56 @@ Mental Health Classifier with Recommendation System
 
 This script builds a Decision Tree model to predict mental health risk levels
 and provides personalized recommendations based on the predictions.
+
+Stage timings and memory are written to model/training_profile.json;
+MENTAL_HEALTH_PROFILE=cprofile also profiles every stage (model/profiles/).
 """
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.tree import DecisionTreeClassifier
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, f1_score
 from imblearn.over_sampling import SMOTE
 import os
 import joblib
 from imblearn.pipeline import Pipeline as ImbPipeline
+from model_artifact import export_artifact
+from rule_distillation import DEFAULT_MIN_FIDELITY, RuleSet, distill_rules, write_rules
+from model_search import run_search
+from model_definitions import SELECTED_FEATURES, CATEGORICAL_COLS, get_definition, make_classifier, make_preprocessor
+from training_profiler import StageProfiler
+from training_cache import load_cached
 
 # Vérifier l'existence du fichier
 file_path = 'students_mental_health_survey.csv'
 if not os.path.exists(file_path):
     raise FileNotFoundError(f"Le fichier {file_path} n'existe pas.")
 
-# Charger le fichier CSV
+# Variables catégoriques normalisées (ex. supprimer espaces, convertir en minuscules) ;
+# caractéristiques, préprocesseur et grille viennent de model_definitions.py
+categorical_cols = CATEGORICAL_COLS
+
+# Durée, CPU et mémoire de chaque étape de l'entraînement
+profiler = StageProfiler(profile_dir=os.path.join('model', 'profiles'))
+
+# Charger et nettoyer le fichier CSV par blocs : doublons, imputation (médiane de CGPA,
+# mode de Substance_Use), lignes incomplètes, normalisation des catégories (voir ingest.py),
+# mis en cache tant que le CSV ne change pas (voir training_cache.py)
 print("Chargement des données...")
-df = pd.read_csv(file_path)
+profiler.begin('load_clean')
+df, ingest_report = load_cached(file_path, normalize_cols=categorical_cols)
 
 # Afficher les informations de base
-print(f"Dimensions du dataset: {df.shape}")
-print(f"Nombre de valeurs manquantes: {df.isnull().sum().sum()}")
+print(f"Dimensions du dataset: ({ingest_report['rows_read']}, {df.shape[1]})")
+print(f"Nombre de valeurs manquantes: {sum(ingest_report['missing'].values())}")
 
-# Nettoyage des données
 print("\nNettoyage des données...")
-
-# Supprimer les doublons
-df_size_before = df.shape[0]
-df.drop_duplicates(inplace=True)
-df_size_after = df.shape[0]
-print(f"Suppression de {df_size_before - df_size_after} doublons")
-
-# Imputer CGPA avec la médiane
-if df['CGPA'].isnull().sum() > 0:
-    df['CGPA'].fillna(df['CGPA'].median(), inplace=True)
-
-# Imputer Substance_Use avec le mode
-if df['Substance_Use'].isnull().sum() > 0:
-    df['Substance_Use'].fillna(df['Substance_Use'].mode()[0], inplace=True)
-
-# Supprimer les lignes avec des valeurs manquantes restantes
-df = df.dropna()
+print(f"Suppression de {ingest_report['duplicates']} doublons")
+print(f"Valeurs imputées: {ingest_report['imputed']}")
 print(f"Dimensions après nettoyage: {df.shape}")
 
-# Standardiser les variables catégoriques (ex. supprimer espaces, convertir en minuscules)
-categorical_cols = ['Course', 'Substance_Use', 'Counseling_Service_Use', 'Physical_Activity',
-                    'Extracurricular_Involvement', 'Family_History', 'Chronic_Illness']
-for col in categorical_cols:
-    if df[col].dtype == 'object':
-        df[col] = df[col].str.strip().str.lower()
-
 # Définir Mental_Health_Risk (basé sur les scores)
+profiler.begin('split')
 df['Mental_Health_Risk'] = np.where(
     (df['Stress_Level'] >= 3) | (df['Depression_Score'] >= 3) | (df['Anxiety_Score'] >= 3),
     'High', 'Low'
@@ -68,27 +62,12 @@ df['Mental_Health_Risk'] = np.where(
 print(f"Distribution de Mental_Health_Risk: {df['Mental_Health_Risk'].value_counts()}")
 
 # Définir les caractéristiques et la cible
-selected_features = [
-    'Counseling_Service_Use', 'Stress_Level', 'Substance_Use', 'Age', 'Course',
-    'Financial_Stress', 'Physical_Activity', 'Extracurricular_Involvement',
-    'Semester_Credit_Load', 'Family_History', 'Chronic_Illness'
-]
+selected_features = SELECTED_FEATURES
 X = df[selected_features]
 y = df['Mental_Health_Risk']
 
-# Définir les colonnes catégoriques et numériques
-categorical_cols = [
-    'Counseling_Service_Use', 'Substance_Use', 'Course', 'Physical_Activity',
-    'Extracurricular_Involvement', 'Family_History', 'Chronic_Illness'
-]
-numerical_cols = ['Stress_Level', 'Age', 'Financial_Stress', 'Semester_Credit_Load']
-
-# Créer un préprocesseur
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numerical_cols),
-        ('cat', OneHotEncoder(drop='first', sparse_output=False, handle_unknown='ignore'), categorical_cols)
-    ])
+# Créer un préprocesseur (standardisation des colonnes numériques, one-hot des catégoriques)
+preprocessor = make_preprocessor()
 
 # Séparer les données
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
@@ -99,18 +78,16 @@ print("\nEntraînement du modèle Arbre de Décision...")
 dt_pipeline = ImbPipeline(steps=[
     ('preprocessor', preprocessor),
     ('smote', SMOTE(random_state=42)),
-    ('classifier', DecisionTreeClassifier(random_state=42))
+    ('classifier', make_classifier('dt'))
 ])
 
 # Optimiser les hyperparamètres
-param_grid = {
-    'classifier__max_depth': [3, 5, 7, None],
-    'classifier__min_samples_split': [2, 5, 10]
-}
-grid_search_dt = GridSearchCV(dt_pipeline, param_grid, cv=5, scoring='f1_weighted', n_jobs=-1)
-grid_search_dt.fit(X_train, y_train)
+param_grid = get_definition('dt')['param_grid']
+profiler.begin('search:dt')
+grid_search_dt = run_search(dt_pipeline, param_grid, X_train, y_train)
 
 # Meilleur modèle
+profiler.begin('evaluate:dt')
 best_dt = grid_search_dt.best_estimator_
 y_pred_dt = best_dt.predict(X_test)
 
@@ -274,6 +251,7 @@ class MentalHealthRecommender:
 
         return recommendations
 
+profiler.begin('recommender')
 # Créer une instance du recommandeur avec le préprocesseur déjà ajusté
 # Nous utilisons le préprocesseur du pipeline qui a déjà été ajusté pendant l'entraînement
 fitted_preprocessor = best_dt.named_steps['preprocessor']
@@ -325,6 +303,7 @@ for practice in example_recommendations['daily_practices']:
     print(f"- {practice}")
 
 # Sauvegarder le modèle et le préprocesseur
+profiler.begin('dump')
 print("\nSauvegarde du modèle et du préprocesseur...")
 model_dir = 'model'
 os.makedirs(model_dir, exist_ok=True)
@@ -333,8 +312,36 @@ os.makedirs(model_dir, exist_ok=True)
 joblib.dump(best_dt, os.path.join(model_dir, 'mental_health_model.pkl'))
 # Sauvegarder le préprocesseur
 joblib.dump(preprocessor, os.path.join(model_dir, 'preprocessor.pkl'))
-# Sauvegarder le recommandeur
-joblib.dump(recommender, os.path.join(model_dir, 'recommender.pkl'))
+# Le recommandeur n'est plus sauvegardé : sa classe est définie dans __main__,
+# son pickle ne pouvait pas être rechargé ailleurs
+profiler.begin('export_artifact')
+# Publier l'artefact versionné (manifest JSON + tableaux .npy) utilisé par predict_mental_health.py,
+# avec la table de risque précalculée sur tout le domaine des entrées (risk_table.py)
+export_artifact(best_dt, os.path.join(model_dir, 'artifacts'),
+                os.path.join(model_dir, 'mental_health_model.pkl'),
+                training_metrics={
+                    'model': 'Arbre de Décision Classifier',
+                    'accuracy': accuracy_dt,
+                    'f1_weighted': f1_dt,
+                    'best_params': grid_search_dt.best_params_
+                },
+                risk_table_data=X)
+
+# Distiller le modèle en liste de règles ordonnée (rules.json, servie par predict_mental_health.py --rules),
+# avec la fidélité au modèle mesurée sur X_test et sur un échantillon du domaine des entrées
+profiler.begin('distill')
+rules = distill_rules(best_dt, X_train, X_test, y_test)
+write_rules(rules, os.path.join(model_dir, 'rules.json'), os.path.join(model_dir, 'mental_health_model.pkl'))
+print("\nRègles distillées:")
+print(RuleSet(rules).describe())
+print(f"Fidélité sur X_test: {rules['fidelity']['test']['fidelity']:.4f}")
+if rules['fidelity']['test']['fidelity'] < DEFAULT_MIN_FIDELITY:
+    print(f"Fidélité inférieure à {DEFAULT_MIN_FIDELITY}: les règles ne seront pas servies par --rules")
 
 print(f"Modèle sauvegardé dans le dossier '{model_dir}'")
+
+# Rapport de profilage des étapes, à côté des fichiers du modèle
+profiler.write(os.path.join(model_dir, 'training_profile.json'))
+print("\nDurée des étapes:")
+print(profiler.summary())
 print("Terminé!")
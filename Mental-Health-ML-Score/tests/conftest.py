@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared fixtures: the survey training split and the pipeline of the training scripts.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from compiled_scorer import SURVEY_PATH
+
+# Input columns and target of the training scripts
+CATEGORICAL_COLS = [
+    'Counseling_Service_Use', 'Substance_Use', 'Course', 'Physical_Activity',
+    'Extracurricular_Involvement', 'Family_History', 'Chronic_Illness'
+]
+NUMERICAL_COLS = ['Stress_Level', 'Age', 'Financial_Stress', 'Semester_Credit_Load']
+
+@pytest.fixture(scope='session')
+def training_split():
+    from compiled_scorer import load_survey_features
+    from sklearn.model_selection import train_test_split
+
+    X = load_survey_features(SURVEY_PATH, NUMERICAL_COLS + CATEGORICAL_COLS)
+    X = X.fillna(X.mode().iloc[0])
+    df = pd.read_csv(SURVEY_PATH)
+    y = pd.Series(np.where(
+        (df['Stress_Level'] >= 3) | (df['Depression_Score'] >= 3) | (df['Anxiety_Score'] >= 3), 'High', 'Low'
+    ), index=X.index, name='Mental_Health_Risk')
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    return X_train, y_train
+
+@pytest.fixture(scope='session')
+def make_pipeline():
+    """
+    Build the preprocessing + SMOTE + classifier pipeline of the training scripts.
+
+    Returns:
+        callable: make(classifier) -> unfitted ImbPipeline
+    """
+    return _pipeline
+
+@pytest.fixture(scope='session')
+def fit_pipeline(training_split):
+    """
+    Fit the preprocessing + SMOTE + classifier pipeline of the training scripts.
+
+    Returns:
+        callable: fit(classifier) -> fitted ImbPipeline on the training split
+    """
+    return lambda classifier: _pipeline(classifier).fit(*training_split)
+
+def _pipeline(classifier):
+    from imblearn.over_sampling import SMOTE
+    from imblearn.pipeline import Pipeline as ImbPipeline
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+
+    preprocessor = ColumnTransformer(transformers=[
+        ('num', StandardScaler(), NUMERICAL_COLS),
+        ('cat', OneHotEncoder(drop='first', sparse_output=False, handle_unknown='ignore'), CATEGORICAL_COLS)
+    ])
+    return ImbPipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('smote', SMOTE(random_state=42)),
+        ('classifier', classifier)
+    ])
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parity of the compiled NumPy scorer with the sklearn pipeline it was
+compiled from, on every row of the survey CSV.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from compiled_scorer import MODEL_PATH, SURVEY_PATH, CompiledScorer, check_parity, compile_pipeline
+
+def _classifier(key, params):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    if key == 'dt':
+        return DecisionTreeClassifier(random_state=42, **params)
+    if key == 'svm_fast':
+        from fast_svm import FastSVC
+        return FastSVC(random_state=42, **params)
+    return RandomForestClassifier(random_state=42, **params)
+
+@pytest.mark.skipif(not MODEL_PATH.exists(), reason="no trained model in model/")
+def test_shipped_model():
+    import joblib
+
+    model = joblib.load(MODEL_PATH)
+    assert check_parity(model, CompiledScorer(compile_pipeline(model)), SURVEY_PATH) == 0
+
+@pytest.mark.parametrize("key, params", [
+    ('dt', {'max_depth': None}),
+    ('dt', {'max_depth': 5}),
+    ('rf', {'n_estimators': 20, 'max_depth': 10}),
+    ('svm_fast', {'kernel': 'linear'})
+])
+@pytest.mark.parametrize("compact", [False, True])
+def test_parity(key, params, compact, fit_pipeline):
+    model = fit_pipeline(_classifier(key, params))
+    assert check_parity(model, CompiledScorer(compile_pipeline(model, compact=compact)), SURVEY_PATH) == 0
+
+def test_kernel_fast_svm_is_refused(fit_pipeline):
+    model = fit_pipeline(_classifier('svm_fast', {'kernel': 'rbf', 'n_components': 50}))
+    with pytest.raises(ValueError):
+        compile_pipeline(model)
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_artifact_round_trip(compact, fit_pipeline, tmp_path):
+    from model_artifact import read_artifact, write_artifact
+
+    model = fit_pipeline(_classifier('rf', {'n_estimators': 10}))
+    version = write_artifact(compile_pipeline(model, compact=compact), tmp_path, publish=False)
+    assert check_parity(model, CompiledScorer(read_artifact(tmp_path / version)), SURVEY_PATH) == 0
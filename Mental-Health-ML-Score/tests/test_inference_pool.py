@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""
+InferencePool keeps answering after a callback raises or a worker dies.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import queue
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from inference_pool import InferencePool
+
+def _predict(input_data, favorite_activities):
+    if input_data.get('die'):
+        os._exit(1)
+    return {'echo': input_data['value']}
+
+def _answer(pool, input_data):
+    answers = queue.Queue()
+    assert pool.submit(input_data, [], answers.put, answers.put)
+    return answers.get(timeout=30)
+
+def test_callback_failure_releases_the_slot():
+    pool = InferencePool(_predict, 1, max_inflight=1)
+    try:
+        def broken(result):
+            raise RuntimeError("callback failed")
+
+        done = queue.Queue()
+        assert pool.submit({'value': 1}, [], lambda r: (done.put(r), broken(r)), done.put)
+        assert done.get(timeout=30) == {'echo': 1}
+        assert _answer(pool, {'value': 2}) == {'echo': 2}
+    finally:
+        pool.close()
+
+def test_dead_worker_fails_the_request_and_pool_recovers():
+    pool = InferencePool(_predict, 2, max_inflight=2)
+    try:
+        assert isinstance(_answer(pool, {'die': True}), BrokenProcessPool)
+        # Both slots were given back and new workers answer
+        assert _answer(pool, {'value': 3}) == {'echo': 3}
+        assert _answer(pool, {'value': 4}) == {'echo': 4}
+    finally:
+        pool.close()
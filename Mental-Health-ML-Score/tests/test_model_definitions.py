@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared model definitions: the selection rule of both training paths.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from model_definitions import FAST_SVM_DEFINITION, MODEL_DEFINITIONS, get_definition, select_best
+
+def test_highest_cv_score_wins():
+    assert select_best([0.75, 0.80, 0.78]) == 1
+
+def test_first_candidate_wins_ties():
+    assert select_best([0.70, 0.80, 0.80]) == 1
+
+def test_failed_candidates_rank_last():
+    assert select_best([np.nan, 0.60, np.nan]) == 1
+    assert select_best([np.nan, np.nan]) == 0
+
+def test_fast_svm_shares_the_svm_grid():
+    assert get_definition('svm_fast') is FAST_SVM_DEFINITION
+    assert FAST_SVM_DEFINITION['param_grid'] == get_definition('svm')['param_grid']
+    assert [d['key'] for d in MODEL_DEFINITIONS] == ['knn', 'svm', 'dt', 'rf']
+    with pytest.raises(ValueError):
+        get_definition('xgboost')
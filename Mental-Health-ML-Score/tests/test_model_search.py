@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fold-cached search: every grid point gets a score, like GridSearchCV on the full pipeline.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from model_search import get_fold_data, run_search
+
+def test_knn_grid_has_no_nan_score(make_pipeline, training_split):
+    from sklearn.neighbors import KNeighborsClassifier
+
+    X_train, y_train = training_split
+    grid = {'classifier__n_neighbors': [3, 5], 'classifier__metric': ['euclidean', 'manhattan']}
+    search = run_search(make_pipeline(KNeighborsClassifier()), grid, X_train, y_train, n_jobs=1)
+    assert not np.isnan(search.cv_results_['mean_test_score']).any()
+    assert set(search.best_estimator_.classes_) == {'High', 'Low'}
+
+def test_fold_targets_decode_to_the_labels(make_pipeline, training_split):
+    from imblearn.over_sampling import SMOTE
+
+    X_train, y_train = training_split
+    pipeline = make_pipeline(None)
+    _, y_folds, splits, classes = get_fold_data(pipeline.named_steps['preprocessor'], SMOTE(random_state=42),
+                                                X_train, y_train)
+    assert list(classes) == ['High', 'Low']
+    # Validation rows are the original rows of each fold, in order
+    validation = np.concatenate([classes[y_folds[test_idx]] for _, test_idx in splits])
+    assert sorted(validation) == sorted(y_train)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+OnlineModel: rewriting the coefficients for new scaler statistics and new
+categories leaves the decision function unchanged.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from online_training import NUMERICAL_COLS, OnlineModel
+
+@pytest.fixture
+def seeded(training_split):
+    X_train, y_train = training_split
+    # 'law' is held back so the next chunk brings a new category
+    seen = (X_train['Course'] != 'law').to_numpy()
+    model = OnlineModel()
+    model.partial_fit(X_train[seen], y_train[seen].to_numpy())
+    return model, X_train
+
+def _learn_statistics(model, chunk):
+    # What partial_fit() does before the classifier learns from the chunk
+    for column, vocabulary in model.vocabularies.items():
+        for value in chunk[column].unique():
+            if value not in vocabulary:
+                vocabulary[value] = model.n_outputs
+                model.n_outputs += 1
+    old_mean, old_scale = model.scaler.mean_.copy(), model.scaler.scale_.copy()
+    model.scaler.partial_fit(chunk[NUMERICAL_COLS].to_numpy(dtype=np.float64))
+    model._rebase(old_mean, old_scale)
+
+def test_rebase_keeps_the_decision_function(seeded):
+    model, X_train = seeded
+    before = model.classifier.decision_function(model.transform(X_train))
+    old_mean = model.scaler.mean_.copy()
+
+    # A chunk of older, more stressed students with the unseen course moves every statistic
+    chunk = X_train.head(300).assign(Age=X_train['Age'].head(300) + 15, Stress_Level=5, Course='law')
+    _learn_statistics(model, chunk)
+
+    assert not np.allclose(model.scaler.mean_, old_mean)
+    assert model.classifier.coef_.shape[1] == model.n_outputs
+    np.testing.assert_allclose(model.classifier.decision_function(model.transform(X_train)), before,
+                               rtol=1e-9, atol=1e-9)
+
+def test_new_category_starts_with_a_zero_weight(seeded):
+    model, X_train = seeded
+    assert 'law' not in model.vocabularies['Course']
+
+    _learn_statistics(model, X_train[X_train['Course'] == 'law'])
+    column = model.vocabularies['Course']['law']
+    assert (model.classifier.coef_[:, column] == 0).all()
+
+def test_partial_fit_learns_from_the_rebased_model(seeded):
+    model, X_train = seeded
+    model.partial_fit(X_train.head(200), np.asarray(['High'] * 200))
+    assert model.updates == 2
+    assert model.classifier.coef_.shape[1] == model.n_outputs
+    assert set(model.predict(X_train)) <= {'High', 'Low'}
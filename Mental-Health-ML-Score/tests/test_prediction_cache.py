@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+PredictionCache: version invalidation, LRU eviction and TTL expiry.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import prediction_cache
+from prediction_cache import PredictionCache
+
+def test_new_model_version_drops_every_entry():
+    cache = PredictionCache()
+    cache.put(('a',), 'v1', 'High')
+    cache.put(('b',), 'v1', 'Low')
+    assert cache.get(('a',), 'v1') == 'High'
+
+    assert cache.get(('a',), 'v2') is None
+    assert cache.get(('b',), 'v1') is None
+    assert cache.stats()['invalidations'] == 1
+
+def test_value_is_not_served_to_another_version():
+    cache = PredictionCache()
+    cache.put(('a',), 'v1', 'High')
+    cache.put(('b',), 'v2', 'Low')
+    assert cache.get(('a',), 'v2') is None
+    assert cache.get(('b',), 'v2') == 'Low'
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(maxsize=2)
+    cache.put(('a',), 'v1', 'High')
+    cache.put(('b',), 'v1', 'Low')
+    cache.get(('a',), 'v1')
+    cache.put(('c',), 'v1', 'Low')
+
+    assert cache.get(('b',), 'v1') is None
+    assert cache.get(('a',), 'v1') == 'High'
+    assert cache.stats()['evictions'] == 1
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', lambda: now[0])
+    cache = PredictionCache(ttl=10)
+    cache.put(('a',), 'v1', 'High')
+
+    now[0] += 5
+    assert cache.get(('a',), 'v1') == 'High'
+    now[0] += 6
+    assert cache.get(('a',), 'v1') is None
+    assert cache.stats()['expirations'] == 1
+
+def test_zero_size_disables_the_cache():
+    cache = PredictionCache(maxsize=0)
+    cache.put(('a',), 'v1', 'High')
+    assert cache.get(('a',), 'v1') is None
+    assert cache.stats()['size'] == 0
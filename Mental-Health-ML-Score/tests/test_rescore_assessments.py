@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+Bulk re-scoring: an interrupted run resumes after its last finished part
+and ends with the same update files and totals as an uninterrupted one.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import rescore_assessments
+from rescore_assessments import load_checkpoint, part_path, rescore
+
+BATCH_SIZE = 3
+
+class Interrupted(Exception):
+    pass
+
+@pytest.fixture
+def export(tmp_path):
+    documents = [{
+        "_id": {"$oid": f"{i:024x}"}, "stressLevel": str(i % 6), "age": "20", "course": "Engineering",
+        "financialStress": "2", "physicalActivity": "Low", "extracurricularInvolvement": "Moderate",
+        "semesterCreditLoad": "18", "familyHistory": "No", "chronicIllness": "No", "anxietyScore": "1",
+        "depressionScore": "2", "counselingServiceUse": "never", "substanceUse": "never", "riskLevel": "Low"
+    } for i in range(10)]
+    path = tmp_path / "assessments.jsonl"
+    path.write_text("".join(json.dumps(document) + "\n" for document in documents), encoding='utf-8')
+    return path
+
+@pytest.fixture
+def scored_parts(monkeypatch):
+    # Record the parts scored, and fail once on the part listed in fail_on
+    scored, fail_on = [], set()
+    score_part = rescore_assessments.score_part
+
+    def recording(task):
+        if task["part"] in fail_on:
+            fail_on.discard(task["part"])
+            raise Interrupted
+        scored.append(task["part"])
+        return score_part(task)
+
+    monkeypatch.setattr(rescore_assessments, 'score_part', recording)
+    return scored, fail_on
+
+def _updates(out_dir):
+    # Update files without their timestamps (the run start differs between runs)
+    parts = {}
+    for path in sorted(Path(out_dir).glob("part-*.jsonl")):
+        documents = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        parts[path.name] = [{k: v for k, v in document.items() if k != "updatedAt"} for document in documents]
+    return parts
+
+def test_interrupted_run_resumes_after_the_last_finished_part(export, tmp_path, scored_parts):
+    scored, fail_on = scored_parts
+    fail_on.add(2)
+    with pytest.raises(Interrupted):
+        rescore([export], tmp_path / "out", batch_size=BATCH_SIZE)
+
+    checkpoint = load_checkpoint(tmp_path / "out")
+    assert not checkpoint["finished"]
+    assert checkpoint["next"]["part"] == 2
+    assert checkpoint["totals"]["records"] == 2 * BATCH_SIZE
+    assert not part_path(tmp_path / "out", 2).exists()
+
+    scored.clear()
+    resumed = rescore([export], tmp_path / "out", batch_size=BATCH_SIZE)
+    assert scored == [2, 3]
+    assert resumed["finished"]
+
+    uninterrupted = rescore([export], tmp_path / "reference", batch_size=BATCH_SIZE)
+    assert resumed["totals"] == uninterrupted["totals"]
+    assert resumed["totals"]["records"] == 10
+    assert _updates(tmp_path / "out") == _updates(tmp_path / "reference")
+
+def test_finished_run_is_not_scored_again(export, tmp_path, scored_parts):
+    scored, _ = scored_parts
+    first = rescore([export], tmp_path / "out", batch_size=BATCH_SIZE)
+    scored.clear()
+    assert rescore([export], tmp_path / "out", batch_size=BATCH_SIZE) == first
+    assert scored == []
+
+def test_changed_input_or_options_are_refused(export, tmp_path, scored_parts):
+    scored, fail_on = scored_parts
+    fail_on.add(1)
+    with pytest.raises(Interrupted):
+        rescore([export], tmp_path / "out", batch_size=BATCH_SIZE)
+
+    with pytest.raises(ValueError, match="batch_size"):
+        rescore([export], tmp_path / "out", batch_size=BATCH_SIZE + 1)
+    with export.open('a', encoding='utf-8') as f:
+        f.write(export.read_text(encoding='utf-8').splitlines()[0] + "\n")
+    with pytest.raises(ValueError, match="inputs"):
+        rescore([export], tmp_path / "out", batch_size=BATCH_SIZE)
+
+    scored.clear()
+    rescore([export], tmp_path / "out", batch_size=BATCH_SIZE, restart=True)
+    assert scored == [0, 1, 2, 3]
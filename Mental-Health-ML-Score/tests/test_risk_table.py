@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+Risk table: agreement with the model, clamping of out-of-range values and
+fallback to the model for inputs the table cannot answer.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from risk_table import RiskTable, SCALAR_LOOKUP_ROWS, build_risk_table, cheap_to_build
+
+# Two axes: score 0..3 (clamped), colour with 'red' as the dropped category
+SPEC = {
+    "classes": ["High", "Low"],
+    "shape": [4, 3],
+    "encoding": "uint8",
+    "axes": [
+        {"feature": "score", "kind": "integer", "min": 0, "max": 3, "clamp": True},
+        {"feature": "colour", "kind": "categorical", "values": ["red", "green", "blue"], "unknown_index": 0}
+    ]
+}
+TABLE = np.arange(12, dtype=np.uint8).reshape(4, 3).ravel() % 2
+
+def _lookup(table, records, vectorized):
+    # Below SCALAR_LOOKUP_ROWS rows lookup() takes the per-record path
+    padded = records * SCALAR_LOOKUP_ROWS if vectorized else records
+    classes, found = table.lookup(padded)
+    return classes[:len(records)].tolist(), found[:len(records)].tolist()
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_lookup_indexes_the_cell(vectorized):
+    classes, found = _lookup(RiskTable(SPEC, TABLE), [{"score": 2, "colour": "blue"}], vectorized)
+    assert found == [True]
+    assert classes == [TABLE[2 * 3 + 2]]
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_clamped_axis_uses_the_edge(vectorized):
+    table = RiskTable(SPEC, TABLE)
+    classes, found = _lookup(table, [{"score": 9, "colour": "green"}, {"score": -4, "colour": "green"}],
+                             vectorized)
+    assert found == [True, True]
+    assert classes == [TABLE[3 * 3 + 1], TABLE[0 * 3 + 1]]
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_unclamped_axis_falls_back(vectorized):
+    spec = {**SPEC, "axes": [{**SPEC["axes"][0], "clamp": False}, SPEC["axes"][1]]}
+    _, found = _lookup(RiskTable(spec, TABLE), [{"score": 4, "colour": "red"}, {"score": 3, "colour": "red"}],
+                       vectorized)
+    assert found == [False, True]
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_values_the_table_cannot_answer_fall_back(vectorized):
+    records = [{"score": 1.5, "colour": "red"}, {"score": "2", "colour": "red"},
+               {"score": True, "colour": "red"}, {"score": None, "colour": "red"}]
+    _, found = _lookup(RiskTable(SPEC, TABLE), records, vectorized)
+    assert found == [False] * len(records)
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_unknown_category_takes_the_dropped_slot(vectorized):
+    classes, found = _lookup(RiskTable(SPEC, TABLE), [{"score": 1, "colour": "purple"}], vectorized)
+    assert found == [True]
+    assert classes == [TABLE[1 * 3 + 0]]
+
+def test_packed_bits_match_uint8():
+    packed = RiskTable({**SPEC, "encoding": "bits"}, np.packbits(TABLE))
+    records = [{"score": s, "colour": c} for s in range(4) for c in ("red", "green", "blue")]
+    assert packed.lookup(records)[0].tolist() == TABLE.tolist()
+
+@pytest.fixture(scope='module')
+def tree(fit_pipeline):
+    from sklearn.tree import DecisionTreeClassifier
+
+    return fit_pipeline(DecisionTreeClassifier(max_depth=6, random_state=42))
+
+def test_table_agrees_with_the_model(tree, training_split):
+    X_train, _ = training_split
+    spec, table = build_risk_table(tree, X_train)
+    classes, found = RiskTable(spec, table).lookup(X_train.to_dict('records'))
+    assert found.all()
+    assert (np.asarray(spec["classes"])[classes] == tree.predict(X_train)).all()
+
+def test_clamped_values_agree_with_the_model(tree, training_split):
+    X_train, _ = training_split
+    spec, table = build_risk_table(tree, X_train)
+    risk_table = RiskTable(spec, table)
+    rows = X_train.head(50).copy()
+    for axis in spec["axes"]:
+        if axis["kind"] != "integer":
+            continue
+        for value in (axis["min"] - 5, axis["max"] + 5):
+            shifted = rows.assign(**{axis["feature"]: value})
+            classes, found = risk_table.lookup(shifted.to_dict('records'))
+            assert found.all() == axis["clamp"]
+            if axis["clamp"]:
+                assert (np.asarray(spec["classes"])[classes] == tree.predict(shifted)).all()
+
+def test_only_single_trees_are_cheap(tree, fit_pipeline):
+    from sklearn.ensemble import RandomForestClassifier
+
+    assert cheap_to_build(tree)
+    assert not cheap_to_build(fit_pipeline(RandomForestClassifier(n_estimators=2, random_state=42)))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+RuleSet: the per-record loop used for a few rows and the NumPy masks used
+for batches give the same classes and the same errors.
+
+Run from Mental-Health-ML-Score/:
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rule_distillation import SCALAR_ROWS, RuleSet, distill_rules
+
+@pytest.fixture(scope='module')
+def rule_set(fit_pipeline, training_split):
+    from sklearn.tree import DecisionTreeClassifier
+
+    X_train, _ = training_split
+    model = fit_pipeline(DecisionTreeClassifier(max_depth=6, random_state=42))
+    spec = distill_rules(model, X_train, X_train.head(500), domain_samples=5000, holdout_samples=2000)
+    assert spec["rules"]
+    return RuleSet(spec)
+
+def _edge_records(rule_set, base):
+    # Values on, just above and beyond every threshold, and categories the model never saw
+    records = []
+    for rule in rule_set.spec["rules"]:
+        for name, condition in rule["when"].items():
+            for bound in (condition.get("gt"), condition.get("le")):
+                if bound is not None:
+                    records.extend(dict(base, **{name: value}) for value in (bound, bound + 0.25, bound + 100))
+    for name, _, _ in rule_set._categorical:
+        records.extend(dict(base, **{name: value}) for value in ("unseen", None, 3))
+    return records
+
+def _scalar(rule_set, records):
+    return np.array([rule_set.predict([record])[0] for record in records], dtype=object)
+
+def test_scalar_and_vectorized_paths_agree(rule_set, training_split):
+    X_train, _ = training_split
+    records = X_train.head(400).to_dict('records')
+    records += _edge_records(rule_set, records[0])
+    assert len(records) >= SCALAR_ROWS
+
+    vectorized = rule_set.predict(records)
+    assert vectorized.tolist() == _scalar(rule_set, records).tolist()
+    assert set(vectorized) <= set(rule_set.classes_)
+
+def test_every_rule_is_reached(rule_set, training_split):
+    # Agreement only means something if the records exercise the rules, not just the default
+    X_train, _ = training_split
+    assert set(rule_set.predict(X_train.to_dict('records'))) == set(rule_set.classes_)
+
+@pytest.mark.parametrize("change", [
+    {"Age": float('nan')},
+    {"Age": float('inf')},
+    {"Age": "twenty"}
+])
+def test_both_paths_reject_the_same_values(rule_set, training_split, change):
+    X_train, _ = training_split
+    record = dict(X_train.iloc[0].to_dict(), **change)
+    for records in ([record], [record] * SCALAR_ROWS):
+        with pytest.raises(ValueError):
+            rule_set.predict(records)
+
+def test_both_paths_report_missing_columns(rule_set, training_split):
+    X_train, _ = training_split
+    record = X_train.iloc[0].to_dict()
+    del record["Course"]
+    for records in ([record], [record] * SCALAR_ROWS):
+        with pytest.raises(ValueError, match="Course"):
+            rule_set.predict(records)
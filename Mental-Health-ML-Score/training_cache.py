@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Columnar Training Cache
+
+ingest.py parses and cleans the survey CSV; this module keeps the cleaned
+result on disk so a retrain only re-parses when the source file changes:
+
+    model/cache/
+        <key>/manifest.json     # source hash, columns, dtypes, ingest report
+        <key>/<n>.npy           # one array per column: values, or category codes
+        <key>/<n>_categories.npy
+
+The key is the SHA-256 of the source file plus the ingest options. Columns
+keep the compact dtypes of ingest_csv() (category codes, int8/int16,
+float32 when exact) and are opened with np.load(mmap_mode='r'), so loading
+is zero-copy: the DataFrame columns are views on the page cache, like the
+model artifacts of model_artifact.py.
+
+Usage:
+    python training_cache.py [students_mental_health_survey.csv]   # build or reuse, print the report
+    python training_cache.py --clear
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ingest import SURVEY_PATH, DEFAULT_CHUNKSIZE, ingest_csv
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+CACHE_DIR = SCRIPT_DIR / "model" / "cache"
+MANIFEST_FILE = "manifest.json"
+
+# Bumped when ingest_csv() changes what it produces
+CACHE_FORMAT_VERSION = 1
+
+def source_key(csv_path, normalize_cols=None):
+    """
+    Cache key of a source file and the ingest options.
+
+    Args:
+        csv_path (Path): Survey CSV
+        normalize_cols (list, optional): Columns normalized by ingest_csv()
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    options = {"format": CACHE_FORMAT_VERSION, "normalize_cols": normalize_cols}
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+def write_cache(df, report, path):
+    """
+    Write a cleaned DataFrame as one .npy file per column.
+
+    Args:
+        df (pd.DataFrame): Output of ingest_csv()
+        report (dict): Ingest report, stored in the manifest
+        path (Path): Cache entry directory (written atomically)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    manifest = {"format_version": CACHE_FORMAT_VERSION, "rows": len(df), "report": report, "columns": []}
+
+    staging = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+    try:
+        np.save(staging / "index.npy", df.index.to_numpy(dtype=np.int64), allow_pickle=False)
+        for n, column in enumerate(df.columns):
+            values = df[column]
+            entry = {"name": column, "file": f"{n}.npy"}
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                entry["categories"] = f"{n}_categories.npy"
+                np.save(staging / entry["file"], values.cat.codes.to_numpy(), allow_pickle=False)
+                np.save(staging / entry["categories"], values.cat.categories.to_numpy(dtype=str),
+                        allow_pickle=False)
+            else:
+                np.save(staging / entry["file"], values.to_numpy(), allow_pickle=False)
+            manifest["columns"].append(entry)
+        with open(staging / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.rename(staging, path)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        # Another process wrote the same entry first
+        if not (path / MANIFEST_FILE).exists():
+            raise
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+def read_cache(path):
+    """
+    Open a cache entry with memory-mapped columns.
+
+    Args:
+        path (Path): Cache entry directory
+
+    Returns:
+        tuple: (df, report) like ingest_csv(); the columns share memory with the mapped files
+    """
+    path = Path(path)
+    with open(path / MANIFEST_FILE, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    columns = {}
+    for entry in manifest["columns"]:
+        values = np.load(path / entry["file"], mmap_mode='r', allow_pickle=False)
+        if "categories" in entry:
+            categories = np.load(path / entry["categories"], allow_pickle=False)
+            values = pd.Categorical.from_codes(values, pd.Index(categories), validate=False)
+        columns[entry["name"]] = pd.Series(values, copy=False)
+    df = pd.DataFrame(columns, copy=False)
+    df.index = pd.Index(np.load(path / "index.npy", mmap_mode='r', allow_pickle=False), copy=False)
+    return df, manifest["report"]
+
+def load_cached(csv_path=SURVEY_PATH, normalize_cols=None, cache_dir=CACHE_DIR, chunksize=DEFAULT_CHUNKSIZE,
+                keep=2):
+    """
+    Load the cleaned survey, ingesting the CSV only if it changed since the last run.
+
+    Args:
+        csv_path (Path): Survey CSV
+        normalize_cols (list, optional): Passed to ingest_csv()
+        cache_dir (Path): Directory holding the cache entries
+        chunksize (int): Rows parsed at once when the cache is rebuilt
+        keep (int): Number of most recent entries kept on disk
+
+    Returns:
+        tuple: (df, report) as returned by ingest_csv()
+    """
+    cache_dir = Path(cache_dir)
+    entry = cache_dir / source_key(csv_path, normalize_cols)
+    if (entry / MANIFEST_FILE).exists():
+        try:
+            return read_cache(entry)
+        except (OSError, ValueError, KeyError):
+            # Unreadable entry: rebuilt below
+            shutil.rmtree(entry, ignore_errors=True)
+
+    df, report = ingest_csv(csv_path, chunksize, normalize_cols)
+    write_cache(df, report, entry)
+    prune_cache(cache_dir, keep)
+    return read_cache(entry)
+
+def prune_cache(cache_dir=CACHE_DIR, keep=2):
+    """
+    Delete all but the most recently written cache entries.
+
+    Args:
+        cache_dir (Path): Directory holding the cache entries
+        keep (int): Number of entries kept
+    """
+    entries = [p for p in Path(cache_dir).iterdir() if p.is_dir() and not p.name.startswith('.')]
+    entries.sort(key=lambda p: p.stat().st_mtime)
+    for path in entries[:-keep] if keep > 0 else entries:
+        shutil.rmtree(path, ignore_errors=True)
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    import time
+
+    parser = argparse.ArgumentParser(description="Columnar cache of the cleaned survey")
+    parser.add_argument('csv', nargs='?', default=str(SURVEY_PATH), help="Survey CSV")
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR), help="Cache directory")
+    parser.add_argument('--clear', action='store_true', help="Delete every cache entry")
+    args = parser.parse_args(argv)
+
+    if args.clear:
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        print(f"Cache {args.cache_dir} cleared")
+        return 0
+
+    start = time.perf_counter()
+    df, report = load_cached(args.csv, cache_dir=args.cache_dir)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"{len(df)} rows, {df.memory_usage(deep=True).sum()} bytes, loaded in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Multi-model Training Orchestrator
+
+Trains the four model families of students_mental_health.py (KNN, SVM,
+Decision Tree, RandomForest) in a single pass. students_mental_health.py runs
+one n_jobs=-1 grid search after the other: each search grabs every core,
+waits for its slowest fold, and only then lets the next family start.
+
+Here every (model, parameters, fold) job goes to one shared process pool
+sized by a global core budget, and each job is single-threaded, so the
+machine never runs more than --cores busy threads. The most expensive
+families are queued first. As soon as all folds of a family are scored,
+its best parameters are refitted on the whole training set, in the same
+pool, while the other families keep training.
+
+Folds are preprocessed and resampled with SMOTE once (model_search.py) and
+inherited by the forked workers. Every finished job is appended to a CSV
+results table right away, so a long run can be followed (or analysed after
+a crash) with any CSV tool.
+
+The run ends with the performance_summary comparison of
+students_mental_health.py and exports the best model like the training
+scripts do. Features, grids and the selection rule (highest
+cross-validated F1-Score) come from model_definitions.py, shared with the
+training scripts.
+
+Usage:
+    python training_orchestrator.py [--cores N] [--models rf,dt] [--results PATH]
+                                    [--no-export] [--risk-table | --no-risk-table] [--fast-svm]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from model_definitions import (SELECTED_FEATURES, CATEGORICAL_COLS, MODEL_DEFINITIONS, FAST_SVM_DEFINITION,
+                               make_classifier, make_preprocessor, make_pipeline, select_best)
+
+# Get the directory of the current script
+SCRIPT_DIR = Path(__file__).parent.absolute()
+MODEL_DIR = SCRIPT_DIR / "model"
+
+SURVEY_PATH = SCRIPT_DIR / "students_mental_health_survey.csv"
+RESULTS_PATH = MODEL_DIR / "training_results.csv"
+
+RESULT_FIELDS = [
+    'stage', 'model', 'params', 'fold', 'f1_weighted', 'accuracy', 'roc_auc',
+    'fit_time_s', 'score_time_s', 'worker_pid', 'error'
+]
+
+def load_training_data(csv_path=SURVEY_PATH):
+    """
+    Load and clean the survey like students_mental_health.py (cached, see training_cache.py).
+
+    Args:
+        csv_path (Path): Survey CSV
+
+    Returns:
+        tuple: (X, y) model input columns and Mental_Health_Risk target
+    """
+    from training_cache import load_cached
+
+    df, _ = load_cached(csv_path, normalize_cols=CATEGORICAL_COLS)
+    y = pd.Series(np.where(
+        (df['Stress_Level'] >= 3) | (df['Depression_Score'] >= 3) | (df['Anxiety_Score'] >= 3),
+        'High', 'Low'
+    ), index=df.index, name='Mental_Health_Risk')
+    return df[SELECTED_FEATURES], y
+
+# State inherited by the forked workers (set in the parent before forking)
+_worker_state = {}
+
+def _init_worker():
+    # One thread per job: the core budget is the number of pool processes
+    from threadpoolctl import threadpool_limits
+    threadpool_limits(1)
+
+def _run_fold_job(key, params, fold):
+    """
+    Fit one grid point on one cached fold and score it.
+
+    Args:
+        key (str): Model key
+        params (dict): 'classifier__*' parameters
+        fold (int): Fold number
+
+    Returns:
+        dict: Result row (without model name)
+    """
+    from sklearn.metrics import get_scorer
+
+    X_folds, y_folds, splits, _ = _worker_state['folds']
+    train_idx, test_idx = splits[fold]
+    classifier = make_classifier(key).set_params(**{k.split('__', 1)[1]: v for k, v in params.items()})
+
+    start = time.perf_counter()
+    classifier.fit(X_folds[train_idx], y_folds[train_idx])
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    score = get_scorer('f1_weighted')(classifier, X_folds[test_idx], y_folds[test_idx])
+    return {
+        'stage': 'cv',
+        'params': params,
+        'fold': fold,
+        'f1_weighted': score,
+        'fit_time_s': fit_time,
+        'score_time_s': time.perf_counter() - start,
+        'worker_pid': os.getpid()
+    }
+
+def _run_refit_job(key, params):
+    """
+    Refit a model family with its best parameters on the whole training set and evaluate it.
+
+    Args:
+        key (str): Model key
+        params (dict): Best 'classifier__*' parameters
+
+    Returns:
+        tuple: (result row, fitted pipeline)
+    """
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+    X_train, y_train, X_test, y_test = _worker_state['split']
+    pipeline = make_pipeline(key).set_params(**params)
+
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = pipeline.predict(X_test)
+    row = {
+        'stage': 'refit',
+        'params': params,
+        'f1_weighted': f1_score(y_test, y_pred, average='weighted'),
+        'accuracy': accuracy_score(y_test, y_pred),
+        'roc_auc': roc_auc_score(pd.get_dummies(y_test), pd.get_dummies(y_pred), multi_class='ovr'),
+        'fit_time_s': fit_time,
+        'score_time_s': time.perf_counter() - start,
+        'worker_pid': os.getpid()
+    }
+    return row, pipeline
+
+def best_params(fold_scores):
+    """
+    Pick the parameters with the best mean fold score, like GridSearchCV: the first
+    candidate wins ties and candidates with a failed fold (NaN) rank last.
+
+    Args:
+        fold_scores (dict): JSON-encoded params -> array of fold scores, in grid order
+
+    Returns:
+        tuple: (params, mean score)
+    """
+    means = [np.mean(scores) for scores in fold_scores.values()]
+    ranked = [(-np.inf if np.isnan(mean) else mean, -index) for index, mean in enumerate(means)]
+    index = ranked.index(max(ranked))
+    return json.loads(list(fold_scores)[index]), float(means[index])
+
+def orchestrate(definitions, X_train, y_train, X_test, y_test, cores, results_path, cv=5):
+    """
+    Run every (model, params, fold) job and every refit on one process pool.
+
+    Args:
+        definitions (list): Entries of MODEL_DEFINITIONS to train
+        X_train, y_train, X_test, y_test: Train/test split
+        cores (int): Number of worker processes
+        results_path (Path): CSV file receiving one row per finished job
+        cv (int): Number of stratified folds
+
+    Returns:
+        dict: Model key -> {"params", "cv_score", "row", "pipeline"} of the refitted best
+            model, or {"params", "cv_score", "error"} when its refit failed
+    """
+    from imblearn.over_sampling import SMOTE
+    from sklearn.model_selection import ParameterGrid
+    from model_search import get_fold_data
+
+    _worker_state['folds'] = get_fold_data(make_preprocessor(), SMOTE(random_state=42), X_train, y_train, cv)
+    _worker_state['split'] = (X_train, y_train, X_test, y_test)
+    names = {d['key']: d['name'] for d in definitions}
+
+    # Grid order is kept per model so ties resolve like GridSearchCV
+    fold_scores = {d['key']: {json.dumps(p, sort_keys=True): np.full(cv, np.nan) for p in ParameterGrid(d['param_grid'])}
+                   for d in definitions}
+    remaining = {key: len(grid) * cv for key, grid in fold_scores.items()}
+    finished = {}
+
+    results_path = Path(results_path)
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    context = multiprocessing.get_context('fork')
+    with open(results_path, 'w', newline='', encoding='utf-8') as results_file, \
+            ProcessPoolExecutor(max_workers=cores, mp_context=context, initializer=_init_worker) as pool:
+        writer = csv.DictWriter(results_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+
+        pending = {}
+        for definition in sorted(definitions, key=lambda d: -d['cost']):
+            key = definition['key']
+            for params_key in fold_scores[key]:
+                for fold in range(cv):
+                    params = json.loads(params_key)
+                    pending[pool.submit(_run_fold_job, key, params, fold)] = (key, params, fold)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, params, fold = pending.pop(future)
+                if fold is None:
+                    # A failed refit leaves nothing to compare or export for that family
+                    try:
+                        row, pipeline = future.result()
+                        finished[key].update(row=row, pipeline=pipeline)
+                    except Exception as e:
+                        row = {'stage': 'refit', 'params': params, 'error': f"{type(e).__name__}: {e}"}
+                        finished[key]['error'] = row['error']
+                else:
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        row = {'stage': 'cv', 'params': params, 'fold': fold, 'f1_weighted': np.nan,
+                               'error': f"{type(e).__name__}: {e}"}
+                    fold_scores[key][json.dumps(params, sort_keys=True)][fold] = row['f1_weighted']
+                    remaining[key] -= 1
+                    if remaining[key] == 0:
+                        params, cv_score = best_params(fold_scores[key])
+                        finished[key] = {'params': params, 'cv_score': cv_score}
+                        pending[pool.submit(_run_refit_job, key, params)] = (key, params, None)
+
+                writer.writerow({**row, 'model': names[key], 'params': json.dumps(row['params'], sort_keys=True)})
+                results_file.flush()
+
+    return finished
+
+def performance_summary(definitions, finished):
+    """
+    Build the comparison table of students_mental_health.py.
+
+    Args:
+        definitions (list): Entries of MODEL_DEFINITIONS whose refit succeeded
+        finished (dict): Output of orchestrate()
+
+    Returns:
+        pd.DataFrame: Modèle, Précision, F1-Score and AUC-ROC on the test split,
+            and the cross-validated F1-Score, per model
+    """
+    return pd.DataFrame({
+        'Modèle': [d['name'] for d in definitions],
+        'Précision': [finished[d['key']]['row']['accuracy'] for d in definitions],
+        'F1-Score': [finished[d['key']]['row']['f1_weighted'] for d in definitions],
+        'AUC-ROC': [finished[d['key']]['row']['roc_auc'] for d in definitions],
+        'F1-Score (CV)': [finished[d['key']]['cv_score'] for d in definitions]
+    })
+
+def export_best_model(definition, result, X, model_dir=MODEL_DIR, risk_table=None):
+    """
+    Save the best model like the training scripts: pickles plus a published artifact.
+
+    Args:
+        definition (dict): Entry of MODEL_DEFINITIONS
+        result (dict): Entry of orchestrate() for that model
+        X (pd.DataFrame): Model inputs, used for the risk table domain
+        model_dir (Path): Output directory
+        risk_table (bool, optional): Precompute the risk table in the artifact; by default
+            only when it is cheap to build (a single decision tree, see risk_table.py)
+    """
+    import joblib
+    from model_artifact import export_artifact
+    from risk_table import cheap_to_build
+
+    model_dir = Path(model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    model_path = model_dir / 'mental_health_model.pkl'
+    pipeline = result['pipeline']
+
+    joblib.dump(pipeline, model_path)
+    joblib.dump(pipeline.named_steps['preprocessor'], model_dir / 'preprocessor.pkl')
+    if risk_table is None:
+        risk_table = cheap_to_build(pipeline)
+        if not risk_table:
+            print(f"No risk table for {definition['name']}: built by default for a single decision tree, "
+                  f"for a forest with --risk-table")
+
+    try:
+        version = export_artifact(pipeline, model_dir / 'artifacts', model_path, training_metrics={
+            'model': definition['name'],
+            'accuracy': result['row']['accuracy'],
+            'f1_weighted': result['row']['f1_weighted'],
+            'roc_auc': result['row']['roc_auc'],
+            'cv_f1_weighted': result['cv_score'],
+            'best_params': result['params']
+        }, risk_table_data=X if risk_table else None)
+        print(f"Artifact {version} published in {model_dir / 'artifacts'}")
+    except ValueError as e:
+        # The pickle is still served (predict_mental_health.py ignores stale artifacts)
+        print(f"Artifact not exported: {e}", file=sys.stderr)
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    keys = [d['key'] for d in MODEL_DEFINITIONS]
+    parser = argparse.ArgumentParser(description="Train every model family on one shared process pool")
+    parser.add_argument('--csv', default=str(SURVEY_PATH), help="Survey CSV")
+    parser.add_argument('--cores', type=int, default=os.cpu_count() or 1,
+                        help="Global core budget: number of single-threaded worker processes")
+    parser.add_argument('--models', default=','.join(keys),
+                        help=f"Comma-separated model families to train (default: {','.join(keys)})")
+    parser.add_argument('--results', default=str(RESULTS_PATH), help="CSV receiving one row per finished job")
+    parser.add_argument('--model-dir', default=str(MODEL_DIR), help="Where the best model is exported")
+    parser.add_argument('--no-export', action='store_true', help="Only print the comparison")
+    risk_table = parser.add_mutually_exclusive_group()
+    risk_table.add_argument('--risk-table', action='store_true',
+                            help="Also precompute the risk table of a random forest (about 1 s per tree, "
+                                 "4 min for 200 trees); a single decision tree always gets one (seconds)")
+    risk_table.add_argument('--no-risk-table', action='store_true',
+                            help="Export the artifact without the precomputed risk table")
+    parser.add_argument('--fast-svm', action='store_true',
+                        help="Train the SVM family with FastSVC (linear solver, RBF kernel approximation, "
+                             "no probability calibration)")
+    args = parser.parse_args(argv)
+
+    args.models = [key.strip() for key in args.models.split(',') if key.strip()]
+    unknown = set(args.models) - set(keys)
+    if unknown or not args.models:
+        parser.error(f"--models must be a subset of {','.join(keys)}")
+    if args.cores < 1:
+        parser.error("--cores must be at least 1")
+    return args
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Arguments to parse instead of sys.argv
+    """
+    args = parse_args(argv)
+
+    from sklearn.model_selection import train_test_split
+    from tabulate import tabulate
+
+    X, y = load_training_data(args.csv)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    definitions = [FAST_SVM_DEFINITION if args.fast_svm and d['key'] == 'svm' else d
+                   for d in MODEL_DEFINITIONS if d['key'] in args.models]
+
+    start = time.perf_counter()
+    finished = orchestrate(definitions, X_train, y_train, X_test, y_test, args.cores, args.results)
+    print(f"Trained {len(definitions)} model families on {args.cores} cores in "
+          f"{time.perf_counter() - start:.1f}s (per-job results: {args.results})")
+
+    for d in definitions:
+        if 'error' in finished[d['key']]:
+            print(f"{d['name']} : échec du réentraînement ({finished[d['key']]['error']})", file=sys.stderr)
+    trained = [d for d in definitions if 'row' in finished[d['key']]]
+    if not trained:
+        print("Aucun modèle entraîné", file=sys.stderr)
+        return 1
+
+    summary = performance_summary(trained, finished)
+    print('\n🔍 Comparaison des performances des modèles :')
+    print(tabulate(summary, headers='keys', tablefmt='pretty'))
+
+    # Same rule as students_mental_health.py: the test split is only reported
+    best = trained[select_best(summary['F1-Score (CV)'])]
+    print(f"\nLe meilleur modèle (F1-Score en validation croisée) est : {best['name']} "
+          f"{finished[best['key']]['params']}")
+
+    if not args.no_export:
+        export_best_model(best, finished[best['key']], X, args.model_dir,
+                          True if args.risk_table else False if args.no_risk_table else None)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
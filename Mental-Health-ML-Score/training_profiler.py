@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Training Stage Profiler
+
+Records, for each stage of a training script (load, clean, split,
+resample, every hyperparameter search, evaluation, artifact export...):
+
+- wall time,
+- CPU time of the process itself and of its worker processes (joblib /
+  multiprocessing children, live or already exited),
+- RSS at the start and end of the stage and its peak during the stage
+  (the kernel's high-water mark is reset at each stage on Linux; elsewhere
+  the process-wide peak so far is reported and flagged as such).
+
+The report is written as JSON next to the model files. Optionally every
+stage is also profiled with cProfile (.prof files, open them with pstats
+or snakeviz) or pyinstrument (.html), one file per stage.
+
+Stages are sequential: begin() closes the stage in progress, so a
+top-level script only needs one line per stage boundary; stage() is the
+context-manager form.
+
+Environment variables:
+    MENTAL_HEALTH_PROFILE   'cprofile' or 'pyinstrument' to profile every
+                            stage when the script does not choose
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+def _rss_kb(field):
+    try:
+        with open('/proc/self/status', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM (Linux 4.0+)
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='utf-8') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _children_cpu_seconds():
+    # Exited children (and what they waited for) are in RUSAGE_CHILDREN; live
+    # ones are read from /proc so long-lived worker pools are counted too
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    total = usage.ru_utime + usage.ru_stime
+    pid = os.getpid()
+    ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return total
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding='utf-8') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        # fields[1] is the parent pid; utime, stime, cutime, cstime follow at 11..14
+        if int(fields[1]) == pid:
+            total += sum(int(value) for value in fields[11:15]) / ticks
+    return total
+
+class StageProfiler:
+    """
+    Wall time, CPU time and memory of the sequential stages of a training run.
+
+    Args:
+        profile (str, optional): 'cprofile' or 'pyinstrument' to also profile every
+            stage; defaults to MENTAL_HEALTH_PROFILE
+        profile_dir (Path, optional): Where per-stage profiles are written
+
+    Raises:
+        ValueError: If the profiler is unknown or not installed
+    """
+
+    def __init__(self, profile=None, profile_dir=None):
+        profile = profile or os.environ.get('MENTAL_HEALTH_PROFILE') or None
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profile} (expected one of {PROFILERS})")
+        if profile == 'pyinstrument':
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                raise ValueError("pyinstrument is not installed (pip install pyinstrument)") from None
+        self.profile = profile
+        self.profile_dir = Path(profile_dir) if profile_dir is not None else None
+        if self.profile and self.profile_dir is None:
+            raise ValueError("profile_dir is required when profiling stages")
+        self.stages = []
+        self._current = None
+        self._started = time.perf_counter()
+        self._created_at = datetime.now(timezone.utc)
+
+    def begin(self, name):
+        """
+        Start a stage, ending the one in progress.
+
+        Args:
+            name (str): Stage name (e.g. 'search:rf')
+        """
+        self.end()
+        peak_is_stage = _reset_peak_rss()
+        current = {
+            "name": name,
+            "wall": time.perf_counter(),
+            "cpu": time.process_time(),
+            "children_cpu": _children_cpu_seconds(),
+            "rss_start_kb": _rss_kb('VmRSS'),
+            "peak_is_stage": peak_is_stage,
+            "profiler": None
+        }
+        if self.profile == 'cprofile':
+            import cProfile
+            current["profiler"] = cProfile.Profile()
+            current["profiler"].enable()
+        elif self.profile == 'pyinstrument':
+            from pyinstrument import Profiler
+            current["profiler"] = Profiler()
+            current["profiler"].start()
+        self._current = current
+
+    def end(self):
+        """
+        End the stage in progress, if any.
+        """
+        current, self._current = self._current, None
+        if current is None:
+            return
+
+        wall = time.perf_counter() - current["wall"]
+        cpu = time.process_time() - current["cpu"]
+        children_cpu = _children_cpu_seconds() - current["children_cpu"]
+        peak_kb = _rss_kb('VmHWM') if current["peak_is_stage"] else None
+        if peak_kb is None:
+            peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        record = {
+            "name": current["name"],
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "children_cpu_s": round(children_cpu, 4),
+            "rss_start_mb": _mb(current["rss_start_kb"]),
+            "rss_end_mb": _mb(_rss_kb('VmRSS')),
+            "peak_rss_mb": _mb(peak_kb),
+            "peak_scope": "stage" if current["peak_is_stage"] else "process"
+        }
+
+        profiler = current["profiler"]
+        if profiler is not None:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            stem = f"{len(self.stages):02d}_{current['name'].replace(':', '_').replace('/', '_')}"
+            if self.profile == 'cprofile':
+                profiler.disable()
+                path = self.profile_dir / f"{stem}.prof"
+                profiler.dump_stats(path)
+            else:
+                profiler.stop()
+                path = self.profile_dir / f"{stem}.html"
+                path.write_text(profiler.output_html(), encoding='utf-8')
+            record["profile"] = str(path)
+
+        self.stages.append(record)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context-manager form of begin() / end().
+
+        Args:
+            name (str): Stage name
+        """
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def report(self):
+        """
+        Build the profiling report.
+
+        Returns:
+            dict: Run metadata and one record per stage
+        """
+        self.end()
+        return {
+            "script": Path(sys.argv[0]).name if sys.argv and sys.argv[0] else None,
+            "created_at": self._created_at.isoformat(),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "total_wall_s": round(time.perf_counter() - self._started, 4),
+            "process_peak_rss_mb": _mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+            "profiler": self.profile,
+            "stages": self.stages
+        }
+
+    def write(self, path):
+        """
+        End the stage in progress and write the report as JSON.
+
+        Args:
+            path (Path): Report file
+
+        Returns:
+            dict: The written report
+        """
+        report = self.report()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+    def summary(self):
+        """
+        One line per stage, slowest first, for the console.
+
+        Returns:
+            str: Text table
+        """
+        lines = [f"{'stage':<24}{'wall s':>10}{'cpu s':>10}{'workers s':>11}{'peak MB':>10}"]
+        for record in sorted(self.stages, key=lambda r: r["wall_s"], reverse=True):
+            lines.append(f"{record['name']:<24}{record['wall_s']:>10.2f}{record['cpu_s']:>10.2f}"
+                         f"{record['children_cpu_s']:>11.2f}{record['peak_rss_mb'] or 0:>10.1f}")
+        return "\n".join(lines)
+
+def _mb(kb):
+    return None if kb is None else round(kb / 1024.0, 1)
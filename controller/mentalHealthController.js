@@ -8,6 +8,19 @@ const PYTHON_SCRIPT_PATH = path.join(__dirname, '..', 'Mental-Health-ML-Score',
 
 // Load Python child process for model inference
 const { spawn } = require('child_process');
+const readline = require('readline');
+
+// Keep one resident Python worker (predict_mental_health.py --serve) so the
+// model is loaded once instead of on every assessment.
+// Set MENTAL_HEALTH_WARM_WORKER=false to spawn one process per request.
+// MENTAL_HEALTH_POOL_SIZE=N makes the worker pre-fork N inference processes.
+// MENTAL_HEALTH_PREDICTION_TIMEOUT_MS bounds how long a request waits for its answer.
+const USE_WARM_WORKER = process.env.MENTAL_HEALTH_WARM_WORKER !== 'false';
+const PREDICTION_POOL_SIZE = parseInt(process.env.MENTAL_HEALTH_POOL_SIZE || '0', 10);
+const PREDICTION_TIMEOUT_MS = parseInt(process.env.MENTAL_HEALTH_PREDICTION_TIMEOUT_MS || '30000', 10);
+// { child, pending }: the resident process and the requests sent to it, by id
+let predictionWorker = null;
+let nextPredictionId = 1;
 
 /**
  * Submit a mental health assessment
@@ -189,12 +202,125 @@ exports.getAssessment = async (req, res) => {
 };
 
 /**
- * Helper function to predict mental health using Python script
+ * Start (or reuse) the resident Python prediction worker
+ * @returns {{child: ChildProcess, pending: Map}} - Worker process answering newline-delimited JSON,
+ *   and the requests waiting for its answers
+ */
+function getPredictionWorker() {
+  if (predictionWorker) {
+    return predictionWorker;
+  }
+
+  const args = [PYTHON_SCRIPT_PATH, '--serve'];
+  if (PREDICTION_POOL_SIZE > 0) {
+    args.push('--workers', String(PREDICTION_POOL_SIZE));
+  }
+  const child = spawn('python', args);
+  // Requests belong to the process they were written to, so a late 'exit'
+  // of a replaced worker cannot reject requests sent to its successor
+  const pending = new Map();
+  const worker = { child, pending };
+
+  // Each stdout line answers the request carrying the same id
+  readline.createInterface({ input: child.stdout }).on('line', (line) => {
+    let result;
+    try {
+      result = JSON.parse(line);
+    } catch (error) {
+      console.error(`Error parsing Python worker output: ${error.message}`);
+      return;
+    }
+
+    const request = pending.get(result.id);
+    if (!request) {
+      return;
+    }
+    pending.delete(result.id);
+    delete result.id;
+
+    // The worker pool is saturated: surface it instead of storing an "Unknown" result
+    if (result.busy) {
+      return request.reject(new Error(result.error));
+    }
+    request.resolve(result);
+  });
+
+  // Warnings (e.g. sklearn version notices) must not fail in-flight requests
+  child.stderr.on('data', (data) => {
+    console.error(`Python worker stderr: ${data}`);
+  });
+
+  const failPending = (error) => {
+    if (predictionWorker === worker) {
+      predictionWorker = null;
+    }
+    for (const request of pending.values()) {
+      request.reject(error);
+    }
+    pending.clear();
+  };
+
+  child.on('error', (error) => failPending(new Error(`Python worker error: ${error.message}`)));
+  child.on('exit', (code) => failPending(new Error(`Python worker exited with code ${code}`)));
+  // Writing to a worker that just died emits EPIPE here instead of crashing the server
+  child.stdin.on('error', (error) => failPending(new Error(`Python worker input error: ${error.message}`)));
+
+  predictionWorker = worker;
+  return worker;
+}
+
+/**
+ * Helper function to predict mental health using the resident Python worker
  * @param {Object} inputData - Input data for prediction
  * @param {Array} favoriteActivities - User's favorite activities
  * @returns {Promise<Object>} - Prediction result
  */
 function predictMentalHealth(inputData, favoriteActivities) {
+  if (!USE_WARM_WORKER) {
+    return predictMentalHealthOnce(inputData, favoriteActivities);
+  }
+
+  return new Promise((resolve, reject) => {
+    const worker = getPredictionWorker();
+    const { child, pending } = worker;
+    const id = nextPredictionId++;
+
+    // A hung worker must not leave the HTTP request pending forever, nor
+    // receive the next requests: it is killed and the next call starts a new one
+    const timer = setTimeout(() => {
+      pending.delete(id);
+      if (predictionWorker === worker) {
+        predictionWorker = null;
+      }
+      child.kill();
+      reject(new Error(`Python worker did not answer within ${PREDICTION_TIMEOUT_MS} ms`));
+    }, PREDICTION_TIMEOUT_MS);
+
+    pending.set(id, {
+      resolve: (result) => {
+        clearTimeout(timer);
+        resolve(result);
+      },
+      reject: (error) => {
+        clearTimeout(timer);
+        reject(error);
+      }
+    });
+    child.stdin.write(JSON.stringify({
+      id,
+      input_data: inputData,
+      favorite_activities: favoriteActivities
+    }) + '\n');
+  });
+}
+
+/**
+ * Helper function to predict mental health with a one-shot Python process
+ * @param {Object} inputData - Input data for prediction
+ * @param {Array} favoriteActivities - User's favorite activities
+ * @returns {Promise<Object>} - Prediction result
+ */
+function predictMentalHealthOnce(inputData, favoriteActivities) {
   return new Promise((resolve, reject) => {
     // Create a Python process
     const python = spawn('python', [PYTHON_SCRIPT_PATH]);